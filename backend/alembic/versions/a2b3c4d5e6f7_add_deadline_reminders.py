@@ -0,0 +1,43 @@
+"""Add deadline reminders and due_at index
+
+Revision ID: a2b3c4d5e6f7
+Revises: f1a2b3c4d5e6
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a2b3c4d5e6f7"
+down_revision: str | None = "f1a2b3c4d5e6"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # リマインダーの対象（締め切りが近い課題）を範囲検索するためのインデックス
+    op.create_index(op.f("ix_assignments_due_at"), "assignments", ["due_at"], unique=False)
+    op.create_table(
+        "deadline_reminders",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("assignment_id", sa.Uuid(), nullable=False),
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.Column("reminder_key", sa.String(length=20), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["assignment_id"], ["assignments.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("assignment_id", "user_id", "reminder_key", name="uq_deadline_reminder"),
+    )
+    op.create_index(op.f("ix_deadline_reminders_user_id"), "deadline_reminders", ["user_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_deadline_reminders_user_id"), table_name="deadline_reminders")
+    op.drop_table("deadline_reminders")
+    op.drop_index(op.f("ix_assignments_due_at"), table_name="assignments")
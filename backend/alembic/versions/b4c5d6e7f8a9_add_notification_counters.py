@@ -0,0 +1,50 @@
+"""Add notification counters and history keyset index
+
+Revision ID: b4c5d6e7f8a9
+Revises: a2b3c4d5e6f7
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b4c5d6e7f8a9"
+down_revision: str | None = "a2b3c4d5e6f7"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "notification_counters",
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.Column("unread_count", sa.Integer(), nullable=False),
+        sa.Column("total_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    # 既存の通知履歴から集計して初期値を入れる
+    op.execute(
+        """
+        INSERT INTO notification_counters (user_id, unread_count, total_count)
+        SELECT user_id, SUM(CASE WHEN is_read THEN 0 ELSE 1 END), COUNT(*)
+        FROM notification_history
+        GROUP BY user_id
+        """
+    )
+    op.create_index(
+        "ix_notification_history_user_created_id",
+        "notification_history",
+        ["user_id", "created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notification_history_user_created_id", table_name="notification_history")
+    op.drop_table("notification_counters")
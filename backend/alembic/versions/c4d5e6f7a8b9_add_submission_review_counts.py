@@ -0,0 +1,52 @@
+"""Add denormalized review counts to submissions
+
+Revision ID: c4d5e6f7a8b9
+Revises: a9b8c7d6e5f4
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4d5e6f7a8b9"
+down_revision: str | None = "a9b8c7d6e5f4"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("submissions", sa.Column("assigned_count", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("submissions", sa.Column("submitted_count", sa.Integer(), nullable=False, server_default="0"))
+
+    # 既存の割り当てからカウンタを埋める
+    op.execute(
+        """
+        UPDATE submissions SET
+            assigned_count = (
+                SELECT COUNT(*) FROM review_assignments ra
+                WHERE ra.submission_id = submissions.id
+            ),
+            submitted_count = (
+                SELECT COUNT(*) FROM review_assignments ra
+                WHERE ra.submission_id = submissions.id AND ra.status = 'submitted'
+            )
+        """
+    )
+
+    op.create_index(
+        "ix_submissions_assignment_assigned_count",
+        "submissions",
+        ["assignment_id", "assigned_count"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_submissions_assignment_assigned_count", table_name="submissions")
+    op.drop_column("submissions", "submitted_count")
+    op.drop_column("submissions", "assigned_count")
@@ -0,0 +1,33 @@
+"""Add credit history keyset index
+
+Revision ID: d6e7f8a9b0c1
+Revises: c5d6e7f8a9b0
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d6e7f8a9b0c1"
+down_revision: str | None = "c5d6e7f8a9b0"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_credit_histories_user_created_id",
+        "credit_histories",
+        ["user_id", "created_at", "id"],
+        unique=False,
+    )
+    # (user_id, created_at, id) の索引で賄えるため削除する
+    op.drop_index("ix_credit_histories_user_id", table_name="credit_histories")
+
+
+def downgrade() -> None:
+    op.create_index("ix_credit_histories_user_id", "credit_histories", ["user_id"], unique=False)
+    op.drop_index("ix_credit_histories_user_created_id", table_name="credit_histories")
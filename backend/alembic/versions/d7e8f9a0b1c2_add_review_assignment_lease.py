@@ -0,0 +1,35 @@
+"""Add lease expiry to review assignments
+
+Revision ID: d7e8f9a0b1c2
+Revises: c4d5e6f7a8b9
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d7e8f9a0b1c2"
+down_revision: str | None = "c4d5e6f7a8b9"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # 既存の割り当ては期限なし（NULL）のまま残す
+    op.add_column("review_assignments", sa.Column("lease_expires_at", sa.DateTime(timezone=True), nullable=True))
+    op.create_index(
+        op.f("ix_review_assignments_lease_expires_at"),
+        "review_assignments",
+        ["lease_expires_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_review_assignments_lease_expires_at"), table_name="review_assignments")
+    op.drop_column("review_assignments", "lease_expires_at")
@@ -0,0 +1,42 @@
+"""Add reviewer skill stats
+
+Revision ID: e8f9a0b1c2d3
+Revises: d7e8f9a0b1c2
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e8f9a0b1c2d3"
+down_revision: str | None = "d7e8f9a0b1c2"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # 既存データの集計は scripts/rebuild_reviewer_skill_stats.py で作成する（未作成の行は初回参照時に作られる）
+    op.create_table(
+        "reviewer_skill_stats",
+        sa.Column("reviewer_id", sa.Uuid(), nullable=False),
+        sa.Column("logic_sum", sa.Float(), server_default="0", nullable=False),
+        sa.Column("logic_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("specificity_sum", sa.Float(), server_default="0", nullable=False),
+        sa.Column("specificity_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("structure_sum", sa.Float(), server_default="0", nullable=False),
+        sa.Column("structure_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("evidence_sum", sa.Float(), server_default="0", nullable=False),
+        sa.Column("evidence_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["reviewer_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("reviewer_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("reviewer_skill_stats")
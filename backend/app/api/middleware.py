@@ -0,0 +1,186 @@
+import hmac
+import time
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.profiling import SamplingProfiler
+from app.core.profiling import new_profile_id
+from app.core.profiling import save_profile
+from app.core.profiling import toggle
+from app.db.query_stats import QueryStats
+from app.db.query_stats import track_queries
+from app.db.replica import bearer_subject
+from app.db.replica import pin_to_primary
+
+_SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+_QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template",
+)
+DB_QUERIES_PER_REQUEST = registry.histogram(
+    "db_queries_per_request",
+    "SQL statements executed per request",
+    buckets=_QUERY_COUNT_BUCKETS,
+)
+DB_TIME_PER_REQUEST = registry.histogram(
+    "db_query_seconds_per_request",
+    "Total time spent in SQL statements per request",
+)
+DB_SLOWEST_QUERY_PER_REQUEST = registry.histogram(
+    "db_slowest_query_seconds",
+    "Slowest SQL statement of each request",
+)
+
+
+class ReadAfterWriteMiddleware:
+    """書き込みリクエストが成功したユーザーの読み取りを一定時間プライマリに固定する
+
+    レプリカ遅延の間に、自分が送ったレビューや設定変更が一覧に出ない状態を防ぐ。
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in _SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                _pin_request_user(scope)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _pin_request_user(scope: Scope) -> None:
+    user_id = bearer_subject(_header(scope, b"authorization"))
+    if user_id is not None:
+        pin_to_primary(user_id)
+
+
+def _route_label(scope: Scope) -> str:
+    # 実パスではなくルートのテンプレート (/assignments/{assignment_id}/...) を使い、ラベル数を抑える
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return str(path) if path else "unmatched"
+
+
+def _server_timing(stats: QueryStats, elapsed: float) -> str:
+    return ", ".join(
+        [
+            f'db;dur={stats.total_seconds * 1000:.1f};desc="{stats.count} queries"',
+            f"db-slowest;dur={stats.slowest_seconds * 1000:.1f}",
+            f"app;dur={elapsed * 1000:.1f}",
+        ]
+    )
+
+
+class QueryInstrumentationMiddleware:
+    """リクエストごとの SQL 件数・DB 時間・最も遅い文を計測する
+
+    結果は /metrics のヒストグラム（route / method ラベル付き）に記録する。
+    ``server_timing`` が有効な場合（既定では APP_ENV=dev）は Server-Timing ヘッダーでも返す。
+    """
+
+    def __init__(self, app: ASGIApp, *, server_timing: bool = False) -> None:
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        with track_queries() as stats:
+
+            async def send_wrapper(message: Message) -> None:
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    if self.server_timing:
+                        headers = MutableHeaders(scope=message)
+                        headers.append("Server-Timing", _server_timing(stats, time.perf_counter() - started))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                labels = {"method": scope["method"], "route": _route_label(scope)}
+                HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, status=status_code, **labels)
+                DB_QUERIES_PER_REQUEST.observe(stats.count, **labels)
+                DB_TIME_PER_REQUEST.observe(stats.total_seconds, **labels)
+                DB_SLOWEST_QUERY_PER_REQUEST.observe(stats.slowest_seconds, **labels)
+
+
+def server_timing_enabled() -> bool:
+    if settings.server_timing is not None:
+        return settings.server_timing
+    return settings.app_env == "dev"
+
+
+def _header(scope: Scope, name: bytes) -> str | None:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class ProfilingMiddleware:
+    """指定されたリクエストをサンプリングプロファイラで計測し、結果の ID を X-Profile-Id で返す
+
+    対象は ``X-Profile: <PROFILING_TOKEN>`` を付けたリクエストと、管理画面から予約された件数分のリクエスト。
+    同時に処理中の他リクエストのスタックも混ざるため、負荷の低い時間帯に取得すること。
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    def _requested(self, scope: Scope) -> bool:
+        token = settings.profiling_token
+        header = _header(scope, b"x-profile")
+        if token and header is not None and hmac.compare_digest(header.encode(), token.encode()):
+            return True
+        return toggle.take_request(scope["path"])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = new_profile_id()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile-Id", profile_id)
+            await send(message)
+
+        profiler = SamplingProfiler()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # サンプリングスレッドの join とファイル書き込みはブロックするため、イベントループの外で行う
+            # （その間も同じワーカーの他のリクエストや通知ストリームを止めない）
+            await run_in_threadpool(
+                _finish_profile, profiler, label=f"request {scope['method']} {scope['path']}", profile_id=profile_id
+            )
+
+
+def _finish_profile(profiler: SamplingProfiler, *, label: str, profile_id: str) -> None:
+    profiler.stop()
+    save_profile(profiler, label=label, profile_id=profile_id)
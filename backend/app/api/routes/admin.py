@@ -3,20 +3,28 @@ from uuid import UUID
 from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import HTTPException
+from fastapi.responses import FileResponse
 from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
+from app.core import profiling
+from app.core.config import settings
 from app.db.session import get_db
 from app.models.assignment import Assignment
 from app.models.user import User
 from app.schemas.admin import AdminAssignmentUpdate
 from app.schemas.admin import AdminUserPublic
 from app.schemas.admin import AdminUserUpdate
+from app.schemas.admin import ProfileEntry
+from app.schemas.admin import ProfilingArm
+from app.schemas.admin import ProfilingStatus
 from app.schemas.admin import ReviewerSkillOverride
 from app.schemas.assignment import AssignmentPublic
 from app.services.auth import require_admin
+from app.services.course_catalog import invalidate_course_catalog
 from app.services.credits import CREDIT_REASON_ADMIN_ADJUSTMENT
 from app.services.credits import record_credit_history
+from app.services.user_cache import invalidate_user_cache
 
 router = APIRouter()
 db_dependency = Depends(get_db)
@@ -72,7 +80,8 @@ def update_user(
     db: Session = db_dependency,
     _admin: User = admin_dependency,
 ) -> AdminUserPublic:
-    user = db.query(User).filter(User.id == user_id).first()
+    # 管理者自身を編集する場合、セッション内のキャッシュ由来のインスタンスを DB の値で上書きする
+    user = db.query(User).filter(User.id == user_id).populate_existing().first()
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -87,6 +96,8 @@ def update_user(
 
     if "name" in fields and payload.name is not None:
         user.name = payload.name
+        # 講義カタログには講師名が含まれる
+        invalidate_course_catalog(db)
 
     if "role" in fields and payload.role is not None:
         user.role = payload.role
@@ -116,6 +127,7 @@ def update_user(
         user.reviewer_skill_override_overall = payload.reviewer_skill_override_overall
 
     db.add(user)
+    invalidate_user_cache(db, user.id)
     db.commit()
     db.refresh(user)
     return _admin_user_public(user)
@@ -166,3 +178,42 @@ def update_assignment(
     db.commit()
     db.refresh(assignment)
     return assignment
+
+
+def _profiling_status() -> ProfilingStatus:
+    toggle = profiling.toggle
+    return ProfilingStatus(
+        enabled=settings.profiling_enabled,
+        armed_requests=toggle.requests,
+        path_prefix=toggle.path_prefix,
+        armed_functions=dict(toggle.functions),
+        functions=sorted(profiling.PROFILED_FUNCTIONS),
+        profiles=[ProfileEntry(**vars(info)) for info in profiling.list_profiles()],
+    )
+
+
+@router.get("/profiling", response_model=ProfilingStatus)
+def profiling_status(_admin: User = admin_dependency) -> ProfilingStatus:
+    return _profiling_status()
+
+
+@router.post("/profiling", response_model=ProfilingStatus)
+def arm_profiling(payload: ProfilingArm, _admin: User = admin_dependency) -> ProfilingStatus:
+    """次の N 件のリクエスト、または指定した関数の次の N 回の呼び出しを計測する（このワーカーのみ）"""
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=409, detail="Profiling is disabled (PROFILING_ENABLED=false)")
+    if payload.target == "request":
+        profiling.toggle.arm_requests(payload.count, path_prefix=payload.path_prefix)
+    else:
+        if payload.function not in profiling.PROFILED_FUNCTIONS:
+            raise HTTPException(status_code=400, detail="Unknown profiled function")
+        profiling.toggle.arm_function(payload.function, payload.count)
+    return _profiling_status()
+
+
+@router.get("/profiling/profiles/{profile_id}")
+def download_profile(profile_id: str, _admin: User = admin_dependency) -> FileResponse:
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=path.name)
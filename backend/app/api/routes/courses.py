@@ -3,11 +3,18 @@ from uuid import UUID
 from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import HTTPException
+from fastapi import Query
+from fastapi import Request
+from fastapi import Response
+from sqlalchemy import exists
 from sqlalchemy import func
+from sqlalchemy import or_
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.core.config import COURSE_TITLE_CANDIDATES
 from app.db.session import get_db
+from app.db.session import get_read_db
 from app.models.assignment import Assignment
 from app.models.course import Course
 from app.models.course import CourseEnrollment
@@ -18,13 +25,25 @@ from app.models.user import UserRole
 from app.schemas.course import CourseCreate
 from app.schemas.course import CourseEnrollmentPublic
 from app.schemas.course import CoursePublic
+from app.schemas.course import CourseStudentReviewerSkill
 from app.schemas.user import UserPublic
 from app.services.auth import get_current_user
 from app.services.auth import require_teacher
+from app.services.course_catalog import catalog_etag
+from app.services.course_catalog import course_student_count
+from app.services.course_catalog import enrolled_course_ids
+from app.services.course_catalog import get_course_catalog
+from app.services.course_catalog import invalidate_course_catalog
+from app.services.pagination import NEXT_CURSOR_HEADER
+from app.services.pagination import InvalidCursorError
+from app.services.pagination import before_cursor
+from app.services.pagination import encode_cursor
+from app.services.reviewer_skill import calculate_reviewer_skills
 
 router = APIRouter()
 COURSE_THEME_OPTIONS = {"sky", "emerald", "amber", "rose", "slate", "violet"}
 db_dependency = Depends(get_db)
+read_db_dependency = Depends(get_read_db)
 current_user_dependency = Depends(get_current_user)
 teacher_dependency = Depends(require_teacher)
 
@@ -54,6 +73,7 @@ def create_course(
         theme=payload.theme or "sky",
     )
     db.add(course)
+    invalidate_course_catalog(db)
     db.commit()
     db.refresh(course)
     return CoursePublic(
@@ -70,39 +90,59 @@ def create_course(
 
 @router.get("", response_model=list[CoursePublic])
 def list_courses(
-    db: Session = db_dependency,
+    request: Request,
+    response: Response,
+    *,
+    q: str | None = Query(default=None, max_length=200, description="講義名・講師名の部分一致"),
+    limit: int | None = Query(default=None, ge=1, le=200, description="省略時は全件"),
+    cursor: str | None = Query(default=None, description="前のページの X-Next-Cursor"),
+    db: Session = read_db_dependency,
+    primary_db: Session = db_dependency,
     current_user: User = current_user_dependency,
-) -> list[CoursePublic]:
-    if current_user.role == UserRole.teacher:
-        courses = db.query(Course).filter(Course.teacher_id == current_user.id).order_by(Course.created_at.desc()).all()
-        counts: dict[UUID, int] = {}
-        if courses:
-            rows = (
-                db.query(CourseEnrollment.course_id, func.count(CourseEnrollment.id))
-                .filter(CourseEnrollment.course_id.in_([c.id for c in courses]))
-                .group_by(CourseEnrollment.course_id)
-                .all()
-            )
-            counts = {course_id: count for course_id, count in rows}
-
-        return [
-            CoursePublic(
-                id=course.id,
-                title=course.title,
-                description=course.description,
-                theme=course.theme,
-                teacher_id=course.teacher_id,
-                created_at=course.created_at,
-                teacher_name=current_user.name,
-                student_count=counts.get(course.id, 0),
-            )
-            for course in courses
-        ]
-
-    courses = db.query(Course).order_by(Course.created_at.desc()).all()
-    enrolled_ids = {
-        row[0] for row in db.query(CourseEnrollment.course_id).filter(CourseEnrollment.user_id == current_user.id).all()
-    }
+) -> list[CoursePublic] | Response:
+    """講義一覧を新しい順に返す（講師は担当講義のみ）
+
+    講師名・受講生数・自分の登録状況を 1 回のクエリで取得する。limit を指定した場合は
+    続きがあれば X-Next-Cursor ヘッダーを返すので、その値を cursor に渡す。
+    学生の全件取得はキャッシュ済みのカタログから返し、ETag が一致すれば 304 を返す
+    （カタログの作り直しだけはプライマリから読む）。
+    """
+    is_teacher = current_user.role == UserRole.teacher
+    if not is_teacher and not (q and q.strip()) and limit is None and not cursor:
+        return _catalog_response(request, response, db=db, primary_db=primary_db, user_id=current_user.id)
+
+    # 受講生数と登録状況は相関サブクエリにし、返すページの行についてだけ
+    # course_enrollments の索引（course_id / 一意制約 (course_id, user_id)）で求める
+    student_count = course_student_count()
+    is_enrolled = (
+        exists()
+        .where(CourseEnrollment.course_id == Course.id, CourseEnrollment.user_id == current_user.id)
+        .correlate(Course)
+    )
+    stmt = select(Course, User.name, student_count, is_enrolled).outerjoin(User, User.id == Course.teacher_id)
+    if is_teacher:
+        stmt = stmt.where(Course.teacher_id == current_user.id)
+    if q and q.strip():
+        keyword = q.strip()
+        stmt = stmt.where(
+            or_(Course.title.icontains(keyword, autoescape=True), User.name.icontains(keyword, autoescape=True))
+        )
+    if cursor:
+        try:
+            stmt = stmt.where(before_cursor(Course.created_at, Course.id, cursor))
+        except InvalidCursorError as exc:
+            raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+    stmt = stmt.order_by(Course.created_at.desc(), Course.id.desc())
+    if limit is not None:
+        # 1 件多く読み、次のページがあるかを判定する
+        stmt = stmt.limit(limit + 1)
+
+    rows = db.execute(stmt).all()
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+
     return [
         CoursePublic(
             id=course.id,
@@ -111,13 +151,35 @@ def list_courses(
             theme=course.theme,
             teacher_id=course.teacher_id,
             created_at=course.created_at,
-            teacher_name=course.teacher.name if course.teacher else None,
-            is_enrolled=course.id in enrolled_ids,
+            teacher_name=teacher_name,
+            is_enrolled=None if is_teacher else bool(enrolled),
+            student_count=count,
         )
-        for course in courses
+        for course, teacher_name, count, enrolled in rows
     ]
 
 
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _catalog_response(
+    request: Request, response: Response, *, db: Session, primary_db: Session, user_id: UUID
+) -> list[CoursePublic] | Response:
+    catalog = get_course_catalog(primary_db)
+    enrolled_ids = enrolled_course_ids(db, user_id)
+    # 受講登録はユーザーごとに異なるため、共有キャッシュには載せずブラウザで再検証させる
+    headers = {"ETag": catalog_etag(catalog, enrolled_ids), "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return [CoursePublic(**course, is_enrolled=course["id"] in enrolled_ids) for course in catalog["courses"]]
+
+
 @router.get("/{course_id}", response_model=CoursePublic)
 def get_course_detail(
     course_id: UUID,
@@ -181,6 +243,7 @@ def enroll_course(
 
     enrollment = CourseEnrollment(course_id=course_id, user_id=current_user.id)
     db.add(enrollment)
+    invalidate_course_catalog(db)
     db.commit()
     db.refresh(enrollment)
     return enrollment
@@ -221,6 +284,7 @@ def unenroll_course(
         raise HTTPException(status_code=404, detail="受講登録が見つかりません")
 
     db.delete(enrollment)
+    invalidate_course_catalog(db)
     db.commit()
 
 
@@ -244,3 +308,31 @@ def list_course_students(
         .order_by(User.created_at.asc())
         .all()
     )
+
+
+@router.get("/{course_id}/students/reviewer-skills", response_model=list[CourseStudentReviewerSkill])
+def list_course_student_reviewer_skills(
+    course_id: UUID,
+    db: Session = db_dependency,
+    current_user: User = teacher_dependency,
+) -> list[CourseStudentReviewerSkill]:
+    """受講生全員の、この講義でのレビュー能力（講師用。受講生数によらず固定回数のクエリで計算する）"""
+    course = db.query(Course).filter(Course.id == course_id).first()
+    if course is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    if course.teacher_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not allowed")
+
+    students = (
+        db.query(User)
+        .join(CourseEnrollment, CourseEnrollment.user_id == User.id)
+        .filter(CourseEnrollment.course_id == course_id)
+        .filter(User.role == UserRole.student)
+        .order_by(User.created_at.asc())
+        .all()
+    )
+    skills = calculate_reviewer_skills(db, course_id=course_id, reviewer_ids=[student.id for student in students])
+    return [
+        CourseStudentReviewerSkill(user_id=student.id, name=student.name, reviewer_skill=skills[student.id])
+        for student in students
+    ]
@@ -1,4 +1,8 @@
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import render_prometheus
+from app.db.pool import pool_metrics_snapshot
 
 router = APIRouter()
 
@@ -6,3 +10,15 @@ router = APIRouter()
 @router.get("/health")
 def health() -> dict:
     return {"status": "ok"}
+
+
+@router.get("/health/db-pool")
+def db_pool_health() -> dict:
+    """接続プールの使用状況とチェックアウト待ち時間（プールサイズ調整用）"""
+    return {"pools": pool_metrics_snapshot()}
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics() -> PlainTextResponse:
+    """Prometheus 形式のメトリクス（リクエストごとの SQL 件数・DB 時間、接続プールなど）"""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
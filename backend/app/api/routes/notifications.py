@@ -1,5 +1,8 @@
 """通知関連のAPIエンドポイント"""
 
+import asyncio
+import json
+from collections.abc import AsyncIterator
 from typing import Annotated
 from uuid import UUID
 
@@ -7,10 +10,18 @@ from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import HTTPException
 from fastapi import Query
+from fastapi import Request
 from fastapi import status
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.security import create_stream_token
+from app.core.security import decode_stream_token_subject
+from app.db.session import AsyncSessionLocal
+from app.db.session import get_async_read_db
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.notification import NotificationHistoryListResponse
@@ -18,15 +29,26 @@ from app.schemas.notification import NotificationHistoryResponse
 from app.schemas.notification import NotificationType
 from app.schemas.notification import PushSubscriptionCreate
 from app.schemas.notification import PushSubscriptionResponse
+from app.schemas.notification import StreamTokenResponse
 from app.services import notification_service
 from app.services.auth import get_current_user
-from app.services.notification_service import send_push_notification
+from app.services.auth import get_current_user_async
+from app.services.events import get_event_broker
+from app.services.events import user_channel
+from app.services.notification_service import schedule_push_notification
+from app.services.pagination import InvalidCursorError
+from app.services.pagination import encode_cursor
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
 # Annotated依存関係（B008対応）
 DbSession = Annotated[Session, Depends(get_db)]
 CurrentUser = Annotated[User, Depends(get_current_user)]
+AsyncReadDbSession = Annotated[AsyncSession, Depends(get_async_read_db)]
+AsyncCurrentUser = Annotated[User, Depends(get_current_user_async)]
+
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token", auto_error=False)
+STREAM_RETRY_MS = 5000
 
 
 @router.post("/subscribe", response_model=PushSubscriptionResponse, status_code=status.HTTP_201_CREATED)
@@ -70,30 +92,114 @@ def get_vapid_public_key():
     return {"publicKey": settings.vapid_public_key}
 
 
+# ==================== ライブ通知 ====================
+
+
+@router.post("/stream-token", response_model=StreamTokenResponse)
+def issue_stream_token(current_user: CurrentUser):
+    """通知ストリームに接続するための短命トークンを発行する
+
+    EventSource はヘッダーを付けられずトークンを URL に載せるため、アクセストークンの代わりに
+    ストリームにしか使えず STREAM_TOKEN_TTL_SECONDS で失効するトークンを渡す（アクセスログに残っても悪用しにくい）。
+    """
+    return StreamTokenResponse(
+        token=create_stream_token(current_user.id),
+        expires_in=settings.stream_token_ttl_seconds,
+    )
+
+
+async def _stream_user_id(bearer_token: str | None, stream_token: str | None) -> UUID:
+    """ストリーム用の認証。接続中は DB セッションを持たないよう、認証だけ短いセッションで行う"""
+    if bearer_token:
+        async with AsyncSessionLocal() as db:
+            user = await get_current_user_async(token=bearer_token, db=db)
+            return user.id
+    user_id = decode_stream_token_subject(stream_token) if stream_token else None
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user_id
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _event_stream(request: Request, user_id: UUID) -> AsyncIterator[str]:
+    async with get_event_broker().subscribe(user_channel(user_id)) as queue:
+        # 切断後の再接続間隔（ミリ秒）
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=settings.event_keepalive_seconds)
+            except TimeoutError:
+                # プロキシにアイドル接続として切られないよう、コメント行を送る
+                yield ": keepalive\n\n"
+                continue
+            yield _sse(event["type"], event["data"])
+
+
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    bearer_token: Annotated[str | None, Depends(optional_oauth2_scheme)],
+    token: str | None = Query(
+        default=None, description="POST /notifications/stream-token で発行したトークン（アクセストークンは不可）"
+    ),
+):
+    """新しい通知とレビューの到着を Server-Sent Events で配信する
+
+    認証は Authorization ヘッダーのアクセストークン、または ``token`` クエリのストリーム用トークン。
+    イベント: ``notification``（NotificationHistoryResponse）、``review_received``（assignment_id, review_id）
+    """
+    user_id = await _stream_user_id(bearer_token, token)
+    return StreamingResponse(
+        _event_stream(request, user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ==================== 通知履歴 ====================
 
 
 @router.get("/history", response_model=NotificationHistoryListResponse)
-def get_notification_history(
-    db: DbSession,
-    current_user: CurrentUser,
+async def get_notification_history(
+    db: AsyncReadDbSession,
+    current_user: AsyncCurrentUser,
     limit: int = Query(default=50, ge=1, le=100),
-    offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None, description="前のページの next_cursor"),
 ):
-    """通知履歴一覧を取得する"""
+    """通知履歴一覧を取得する（新しい順、キーセットページング）"""
+    try:
+        return await db.run_sync(_notification_history, current_user.id, limit, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from e
+
+
+def _notification_history(
+    db: Session, user_id: UUID, limit: int, cursor: str | None
+) -> NotificationHistoryListResponse:
+    # 1 件多く読み、次のページがあるかを判定する
     notifications = notification_service.get_notification_history(
         db=db,
-        user_id=current_user.id,
-        limit=limit,
-        offset=offset,
+        user_id=user_id,
+        limit=limit + 1,
+        cursor=cursor,
     )
-    unread_count = notification_service.get_unread_count(db=db, user_id=current_user.id)
-    total_count = notification_service.get_total_count(db=db, user_id=current_user.id)
+    has_next = len(notifications) > limit
+    notifications = notifications[:limit]
+    # 件数は通知の追加・既読化のたびに更新している集計値を使う（COUNT しない）
+    unread_count, total_count = notification_service.get_notification_counts(db=db, user_id=user_id)
 
     return NotificationHistoryListResponse(
         notifications=[NotificationHistoryResponse.model_validate(n) for n in notifications],
         unread_count=unread_count,
         total_count=total_count,
+        next_cursor=encode_cursor(notifications[-1].created_at, notifications[-1].id) if has_next else None,
     )
 
 
@@ -133,8 +239,8 @@ def send_test_notification(
     db: DbSession,
     current_user: CurrentUser,
 ):
-    """テスト通知を送信する"""
-    send_push_notification(
+    """テスト通知を送信する（送信は専用プールで行い、完了を待たない）"""
+    schedule_push_notification(
         user_id=current_user.id,
         notification_type=NotificationType.REVIEW_RECEIVED,
         context={
@@ -1,20 +1,26 @@
 from uuid import UUID
 
 from fastapi import APIRouter
-from fastapi import BackgroundTasks
 from fastapi import Depends
 from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import selectinload
 
 from app.core.config import settings
+from app.db.session import get_async_db
+from app.db.session import get_async_read_db
 from app.db.session import get_db
 from app.models.assignment import Assignment
+from app.models.assignment import RubricCriterion
 from app.models.review import MetaReview
 from app.models.review import Review
 from app.models.review import ReviewAssignment
 from app.models.review import ReviewAssignmentStatus
 from app.models.review import ReviewRubricScore
 from app.models.submission import Submission
+from app.models.submission import SubmissionRubricScore
 from app.models.ta_review_request import TAReviewRequest
 from app.models.ta_review_request import TAReviewRequestStatus
 from app.models.user import User
@@ -42,21 +48,32 @@ from app.services.ai import analyze_review_alignment
 from app.services.ai import polish_review
 from app.services.anonymize import alias_for_user
 from app.services.auth import get_current_user
+from app.services.auth import get_current_user_async
 from app.services.auth import require_teacher
 from app.services.credits import CREDIT_REASON_REVIEW_SUBMITTED
+from app.services.credits import CreditGainResult
 from app.services.credits import calculate_review_credit_gain
+from app.services.credits import credit_gain_from_alignment
 from app.services.credits import record_credit_history
 from app.services.credits import score_1_to_5_from_norm
 from app.services.duplicate import detect_duplicate_review
 from app.services.duplicate import hash_comment
+from app.services.events import publish_user_event
 from app.services.matching import get_or_assign_review_assignment
-from app.services.notification_service import send_push_notification
+from app.services.matching import increment_review_counts
+from app.services.notification_outbox import enqueue_notification
+from app.services.reviewer_skill import apply_reviewer_skill_contributions
+from app.services.reviewer_skill import reviewer_skill_contributions
 from app.services.rubric import ensure_fixed_rubric
+from app.services.scoring import rubric_alignment_from_scores
 from app.services.similarity import check_similarity
 
 router = APIRouter()
 db_dependency = Depends(get_db)
+async_db_dependency = Depends(get_async_db)
+async_read_db_dependency = Depends(get_async_read_db)
 current_user_dependency = Depends(get_current_user)
+async_current_user_dependency = Depends(get_current_user_async)
 teacher_dependency = Depends(require_teacher)
 
 
@@ -74,20 +91,19 @@ def _evaluation_fields(credit: object | None) -> dict:
     }
 
 
-def _schedule_review_notification(
-    background_tasks: BackgroundTasks,
+def _enqueue_review_notification(
     db: Session,
     submission: Submission | None,
     assignment_id: UUID,
 ) -> None:
-    """レビュー完了時に提出者へPush通知をスケジュールする"""
+    """レビュー完了時に提出者へのPush通知をアウトボックスに積む（commit は呼び出し側）"""
     if not submission:
         return
     assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
     if assignment:
-        # BackgroundTasksには新しいセッションを作成する関数を渡すため、dbは渡さない
-        background_tasks.add_task(
-            send_push_notification,
+        # 送信はディスパッチャーが行うため、レビューと同じトランザクションで書き込むだけにする
+        enqueue_notification(
+            db,
             user_id=submission.author_id,
             notification_type=NotificationType.REVIEW_RECEIVED,
             context={
@@ -109,12 +125,61 @@ def _validate_rubric_scores(payload_scores: list, criteria_by_id: dict) -> None:
             raise HTTPException(status_code=400, detail="Rubric score out of range")
 
 
+def _load_submission_reviews(db: Session, submission: Submission) -> list[tuple[Review, CreditGainResult | None]]:
+    """提出物に届いたレビューを、レビュー数によらない固定回数のクエリで読み込む
+
+    ルーブリック得点・メタレビュー・レビュアーは一括ロードし、クレジット評価は
+    提出物ごとに1回だけ読み込んだ教員スコアと基準から計算する。
+    """
+    reviews = (
+        db.query(Review)
+        .join(ReviewAssignment, ReviewAssignment.id == Review.review_assignment_id)
+        .filter(ReviewAssignment.submission_id == submission.id)
+        .options(
+            joinedload(Review.review_assignment).joinedload(ReviewAssignment.reviewer),
+            selectinload(Review.rubric_scores),
+            selectinload(Review.meta_review),
+        )
+        .order_by(Review.created_at.asc())
+        .all()
+    )
+    if not reviews:
+        return []
+
+    teacher_by_criterion = {
+        s.criterion_id: s.score
+        for s in db.query(SubmissionRubricScore).filter(SubmissionRubricScore.submission_id == submission.id).all()
+    }
+    max_by_criterion = {
+        c.id: c.max_score
+        for c in db.query(RubricCriterion).filter(RubricCriterion.assignment_id == submission.assignment_id).all()
+    }
+
+    results: list[tuple[Review, CreditGainResult | None]] = []
+    for r in reviews:
+        reviewer_user = r.review_assignment.reviewer
+        if reviewer_user is None:
+            results.append((r, None))
+            continue
+        alignment = rubric_alignment_from_scores(
+            teacher_by_criterion=teacher_by_criterion,
+            review_by_criterion={s.criterion_id: s.score for s in r.rubric_scores},
+            max_by_criterion=max_by_criterion,
+        )
+        results.append((r, credit_gain_from_alignment(review=r, reviewer=reviewer_user, alignment=alignment)))
+    return results
+
+
 @router.get("/assignments/{assignment_id}/reviews/next", response_model=ReviewAssignmentTask | None)
-def next_review_task(
+async def next_review_task(
     assignment_id: UUID,
-    db: Session = db_dependency,
-    current_user: User = current_user_dependency,
+    db: AsyncSession = async_db_dependency,
+    current_user: User = async_current_user_dependency,
 ) -> ReviewAssignmentTask | None:
+    return await db.run_sync(_next_review_task, assignment_id, current_user)
+
+
+def _next_review_task(db: Session, assignment_id: UUID, current_user: User) -> ReviewAssignmentTask | None:
     assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
     if assignment is None:
         raise HTTPException(status_code=404, detail="Assignment not found")
@@ -185,7 +250,6 @@ def api_polish_review(
 def submit_review(
     review_assignment_id: UUID,
     payload: ReviewSubmit,
-    background_tasks: BackgroundTasks,
     db: Session = db_dependency,
     current_user: User = current_user_dependency,
 ) -> ReviewPublic:
@@ -312,6 +376,9 @@ def submit_review(
 
     review_assignment.status = ReviewAssignmentStatus.submitted
     review_assignment.submitted_at = review.created_at
+    increment_review_counts(db, review_assignment.submission_id, submitted=1)
+    db.flush()
+    apply_reviewer_skill_contributions(db, reviewer_skill_contributions(db, review_id=review.id))
 
     credit = calculate_review_credit_gain(
         db,
@@ -320,6 +387,8 @@ def submit_review(
         reviewer=current_user,
     )
     review.credit_awarded = credit.added
+    # current_user はユーザーキャッシュ由来の可能性があるため、加算前に最新のクレジットを読み直す
+    db.refresh(current_user, attribute_names=["credits"])
     current_user.credits += credit.added
     record_credit_history(
         db,
@@ -331,12 +400,17 @@ def submit_review(
         assignment_id=review_assignment.assignment_id,
         submission_id=review_assignment.submission_id,
     )
+    # レビュー完了時の提出者へのPush通知（レビューと同じコミットで確定する）
+    _enqueue_review_notification(db, submission, review_assignment.assignment_id)
 
     db.commit()
     db.refresh(review)
-
-    # レビュー完了時に提出者へPush通知をスケジュール（バックグラウンドタスク内で新しいセッションを作成）
-    _schedule_review_notification(background_tasks, db, submission, review_assignment.assignment_id)
+    # 提出者の開いているタブへレビューの到着を知らせる（受け取ったレビュー一覧の再取得用）
+    publish_user_event(
+        submission.author_id,
+        "review_received",
+        {"assignment_id": str(review_assignment.assignment_id), "review_id": str(review.id)},
+    )
 
     review_public = ReviewPublic.model_validate(review)
     return review_public.model_copy(update=_evaluation_fields(credit))
@@ -392,11 +466,15 @@ def paraphrase(
 
 
 @router.get("/assignments/{assignment_id}/reviews/received", response_model=list[ReviewReceived])
-def received_reviews(
+async def received_reviews(
     assignment_id: UUID,
-    db: Session = db_dependency,
-    current_user: User = current_user_dependency,
+    db: AsyncSession = async_read_db_dependency,
+    current_user: User = async_current_user_dependency,
 ) -> list[ReviewReceived]:
+    return await db.run_sync(_received_reviews, assignment_id, current_user)
+
+
+def _received_reviews(db: Session, assignment_id: UUID, current_user: User) -> list[ReviewReceived]:
     assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
     if assignment is None:
         raise HTTPException(status_code=404, detail="Assignment not found")
@@ -409,47 +487,18 @@ def received_reviews(
     if submission is None:
         return []
 
-    review_assignments = db.query(ReviewAssignment).filter(ReviewAssignment.submission_id == submission.id).all()
-    assignment_by_id = {ra.id: ra for ra in review_assignments}
-    reviewer_ids = {ra.reviewer_id for ra in review_assignments}
-    reviewers = db.query(User).filter(User.id.in_(list(reviewer_ids))).all() if reviewer_ids else []
-    reviewer_map = {u.id: u for u in reviewers}
-    reviews = (
-        db.query(Review)
-        .join(ReviewAssignment, ReviewAssignment.id == Review.review_assignment_id)
-        .filter(ReviewAssignment.submission_id == submission.id)
-        .order_by(Review.created_at.asc())
-        .all()
-    )
-
     results: list[ReviewReceived] = []
-    for r in reviews:
-        ra = assignment_by_id.get(r.review_assignment_id)
-        if ra is None:
-            continue
-        reviewer_user = reviewer_map.get(ra.reviewer_id)
-        credit = (
-            calculate_review_credit_gain(
-                db,
-                review_assignment=ra,
-                review=r,
-                reviewer=reviewer_user,
-            )
-            if reviewer_user
-            else None
-        )
+    for r, credit in _load_submission_reviews(db, submission):
+        ra = r.review_assignment
         reviewer_alias = alias_for_user(user_id=ra.reviewer_id, assignment_id=assignment_id, prefix="Reviewer")
-
-        scores = db.query(ReviewRubricScore).filter(ReviewRubricScore.review_id == r.id).all()
-        meta = db.query(MetaReview).filter(MetaReview.review_id == r.id).first()
         results.append(
             ReviewReceived(
                 id=r.id,
                 reviewer_alias=reviewer_alias,
                 comment=r.comment,
                 created_at=r.created_at,
-                rubric_scores=scores,
-                meta_review=meta,
+                rubric_scores=r.rubric_scores,
+                meta_review=r.meta_review,
                 ai_quality_score=r.ai_quality_score,
                 ai_quality_reason=r.ai_quality_reason,
                 ai_comment_alignment_score=r.ai_comment_alignment_score,
@@ -515,11 +564,6 @@ def list_reviews_for_submission(
     if submission is None:
         raise HTTPException(status_code=404, detail="Submission not found")
 
-    review_assignments = db.query(ReviewAssignment).filter(ReviewAssignment.submission_id == submission_id).all()
-    ra_by_id = {ra.id: ra for ra in review_assignments}
-    reviewer_by_id = {ra.reviewer_id for ra in review_assignments}
-    reviewers = db.query(User).filter(User.id.in_(list(reviewer_by_id))).all()
-    reviewer_map = {u.id: u for u in reviewers}
     accepted_ta_ids = {
         req.ta_id
         for req in db.query(TAReviewRequest)
@@ -529,34 +573,13 @@ def list_reviews_for_submission(
         )
         .all()
     }
-    reviews = (
-        db.query(Review)
-        .join(ReviewAssignment, ReviewAssignment.id == Review.review_assignment_id)
-        .filter(ReviewAssignment.submission_id == submission_id)
-        .order_by(Review.created_at.asc())
-        .all()
-    )
     results: list[TeacherReviewPublic] = []
-    for r in reviews:
-        ra = ra_by_id.get(r.review_assignment_id)
-        if ra is None:
-            continue
-        reviewer_user = reviewer_map.get(ra.reviewer_id)
-        credit = (
-            calculate_review_credit_gain(
-                db,
-                review_assignment=ra,
-                review=r,
-                reviewer=reviewer_user,
-            )
-            if reviewer_user
-            else None
-        )
+    for r, credit in _load_submission_reviews(db, submission):
+        ra = r.review_assignment
+        reviewer_user = ra.reviewer
         reviewer_alias = alias_for_user(
             user_id=ra.reviewer_id, assignment_id=submission.assignment_id, prefix="Reviewer"
         )
-        scores = db.query(ReviewRubricScore).filter(ReviewRubricScore.review_id == r.id).all()
-        meta = db.query(MetaReview).filter(MetaReview.review_id == r.id).first()
         results.append(
             TeacherReviewPublic(
                 id=r.id,
@@ -568,8 +591,8 @@ def list_reviews_for_submission(
                 ),
                 comment=r.comment,
                 created_at=r.created_at,
-                rubric_scores=scores,
-                meta_review=meta,
+                rubric_scores=r.rubric_scores,
+                meta_review=r.meta_review,
                 ai_quality_score=r.ai_quality_score,
                 ai_quality_reason=r.ai_quality_reason,
                 ai_comment_alignment_score=r.ai_comment_alignment_score,
@@ -30,6 +30,8 @@ from app.services.credits import CREDIT_REASON_REVIEW_RECALCULATED
 from app.services.credits import calculate_review_credit_gain
 from app.services.credits import record_credit_history
 from app.services.pdf import PDFExtractionService
+from app.services.reviewer_skill import apply_reviewer_skill_contributions
+from app.services.reviewer_skill import reviewer_skill_contributions
 from app.services.rubric import ensure_fixed_rubric
 from app.services.storage import build_download_response
 from app.services.storage import detect_file_type
@@ -208,6 +210,8 @@ def set_teacher_grade(
     submission.teacher_total_score = payload.teacher_total_score
     submission.teacher_feedback = payload.teacher_feedback
 
+    # 教員スコアの差し替え前後で、レビュアーごとの一致度集計から旧スコア分を引き新スコア分を足す
+    apply_reviewer_skill_contributions(db, reviewer_skill_contributions(db, submission_id=submission.id), sign=-1)
     db.query(SubmissionRubricScore).filter(SubmissionRubricScore.submission_id == submission.id).delete()
     for s in payload.rubric_scores:
         db.add(
@@ -217,6 +221,8 @@ def set_teacher_grade(
                 score=s.score,
             )
         )
+    db.flush()
+    apply_reviewer_skill_contributions(db, reviewer_skill_contributions(db, submission_id=submission.id))
 
     reviews = (
         db.query(Review, ReviewAssignment, User)
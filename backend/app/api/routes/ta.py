@@ -21,6 +21,7 @@ from app.schemas.review import TAReviewRequestPublic
 from app.schemas.user import UserPublic
 from app.services.auth import get_current_user
 from app.services.auth import require_teacher
+from app.services.matching import increment_review_counts
 
 router = APIRouter()
 db_dependency = Depends(get_db)
@@ -144,6 +145,7 @@ def accept_ta_review_request(
         )
         db.add(ra)
         db.flush()
+        increment_review_counts(db, request.submission_id, assigned=1)
         request.review_assignment_id = ra.id
     else:
         request.review_assignment_id = existing_ra.id
@@ -9,10 +9,14 @@ from fastapi import APIRouter
 from fastapi import Depends
 from fastapi import File
 from fastapi import HTTPException
+from fastapi import Response
 from fastapi import UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.db.session import get_async_read_db
 from app.db.session import get_db
 from app.models.credit_history import CreditHistory
 from app.models.review import Review
@@ -24,14 +28,21 @@ from app.schemas.user import UserPublic
 from app.schemas.user import UserRankingEntry
 from app.services.auth import get_current_user
 from app.services.credits import calculate_review_credit_gain
+from app.services.credits import get_credit_history
+from app.services.credits import iter_credit_history_csv
+from app.services.pagination import NEXT_CURSOR_HEADER
+from app.services.pagination import InvalidCursorError
 from app.services.rank import get_user_rank
 from app.services.reviewer_skill import calculate_reviewer_skill
+from app.services.reviewer_skill import get_reviewer_skill_from_stats
 from app.services.storage import build_download_response
 from app.services.storage import delete_storage_path
 from app.services.storage import save_avatar_file
+from app.services.user_cache import invalidate_user_cache
 
 router = APIRouter()
 db_dependency = Depends(get_db)
+async_read_db_dependency = Depends(get_async_read_db)
 current_user_dependency = Depends(get_current_user)
 avatar_file_dependency = File(...)
 
@@ -59,17 +70,33 @@ def me(
 
 @router.get("/me/credit-history", response_model=list[CreditHistoryPublic])
 def my_credit_history(
+    response: Response,
     limit: int = 50,
+    cursor: str | None = None,
     current_user: User = current_user_dependency,
     db: Session = db_dependency,
 ) -> list[CreditHistory]:
+    """クレジット履歴を新しい順に返す。続きがあれば X-Next-Cursor ヘッダーの値を cursor に渡す"""
     safe_limit = max(1, min(limit, 200))
-    return (
-        db.query(CreditHistory)
-        .filter(CreditHistory.user_id == current_user.id)
-        .order_by(CreditHistory.created_at.desc())
-        .limit(safe_limit)
-        .all()
+    try:
+        histories, next_cursor = get_credit_history(db, current_user.id, limit=safe_limit, cursor=cursor)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return histories
+
+
+@router.get("/me/credit-history/export")
+def export_my_credit_history(
+    current_user: User = current_user_dependency,
+    db: Session = db_dependency,
+) -> StreamingResponse:
+    """クレジット履歴の全件を CSV でダウンロードする"""
+    return StreamingResponse(
+        iter_credit_history_csv(db, current_user.id),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="credit-history.csv"'},
     )
 
 
@@ -80,12 +107,15 @@ def upload_avatar(
     db: Session = db_dependency,
 ) -> User:
     stored, content_type = save_avatar_file(upload=file, user_id=current_user.id)
+    # キャッシュ由来の値で古いファイルを消さないよう、最新の行を読み直す
+    db.refresh(current_user)
     old_path = current_user.avatar_path
     current_user.avatar_path = stored.storage_path
     current_user.avatar_content_type = content_type
 
     try:
         db.add(current_user)
+        invalidate_user_cache(db, current_user.id)
         db.commit()
         db.refresh(current_user)
     except Exception:
@@ -105,11 +135,13 @@ def delete_avatar(
     current_user: User = current_user_dependency,
     db: Session = db_dependency,
 ) -> User:
+    db.refresh(current_user)
     old_path = current_user.avatar_path
     current_user.avatar_path = None
     current_user.avatar_content_type = None
 
     db.add(current_user)
+    invalidate_user_cache(db, current_user.id)
     db.commit()
     db.refresh(current_user)
 
@@ -134,11 +166,15 @@ def get_avatar(
 
 
 @router.get("/ranking", response_model=list[UserRankingEntry])
-def user_ranking(
+async def user_ranking(
     limit: int = 5,
     period: RankingPeriod = RankingPeriod.total,
-    db: Session = db_dependency,
+    db: AsyncSession = async_read_db_dependency,
 ) -> list[UserRankingEntry]:
+    return await db.run_sync(_user_ranking, limit, period)
+
+
+def _user_ranking(db: Session, limit: int, period: RankingPeriod) -> list[UserRankingEntry]:
     safe_limit = max(1, min(limit, 50))
     if period == RankingPeriod.total:
         users = (
@@ -215,8 +251,11 @@ def my_reviewer_skill(
     current_user: User = current_user_dependency,
     db: Session = db_dependency,
 ) -> ReviewerSkill:
-    return calculate_reviewer_skill(
-        db,
-        reviewer_id=current_user.id,
-        assignment_id=assignment_id,
-    )
+    if assignment_id is not None:
+        return calculate_reviewer_skill(
+            db,
+            reviewer_id=current_user.id,
+            assignment_id=assignment_id,
+        )
+    # 全体のスキルは差分更新される集計行から読む（未作成ならその場で集計する。GET では書き込まない）
+    return get_reviewer_skill_from_stats(db, current_user)
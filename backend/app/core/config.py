@@ -1,3 +1,4 @@
+from typing import Literal
 from typing import TypedDict
 
 from pydantic_settings import BaseSettings
@@ -13,6 +14,47 @@ class Settings(BaseSettings):
 
     app_env: str = "dev"
     database_url: str = "sqlite:///./dev.db"
+    # 接続プール（インメモリ SQLite 以外に適用）
+    # ワーカー数 × (pool_size + max_overflow) が DB の最大接続数を超えないようにする
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: float = 30.0
+    # 指定秒数より古い接続は再接続する。-1 で無効
+    db_pool_recycle_seconds: int = 1800
+    # False にするとチェックアウト時の疎通確認を省略する（切断はエラー発生時にプールごと無効化して回復する）
+    db_pool_pre_ping: bool = True
+
+    # リクエストごとの SQL 計測（/metrics）。None の場合 Server-Timing ヘッダーは APP_ENV=dev のときだけ付ける
+    query_instrumentation: bool = True
+    server_timing: bool | None = None
+    # この時間 (ms) 以上かかった SQL を警告ログに出す。0以下で無効
+    slow_query_log_ms: float = 500.0
+
+    # オンデマンドのプロファイリング（X-Profile ヘッダー / 管理画面からの予約）。本番では通常 false のまま
+    profiling_enabled: bool = False
+    # X-Profile ヘッダーで要求する場合の合言葉。未設定ならヘッダーでは有効にならない（管理画面からの予約のみ）
+    profiling_token: str | None = None
+    # 保存先（未設定なら {storage_dir}/profiles）
+    profiling_dir: str | None = None
+    profiling_interval_seconds: float = 0.005
+    profiling_max_files: int = 50
+
+    # 読み取り専用レプリカ（未設定ならすべてプライマリを使う）
+    database_replica_url: str | None = None
+    # レプリカの遅延がこの秒数を超えたら読み取りもプライマリに戻す
+    replica_max_lag_seconds: float = 5.0
+    # 遅延の計測結果を再利用する秒数
+    replica_lag_check_interval_seconds: float = 2.0
+    # 書き込みを行ったユーザーの読み取りをプライマリに固定する秒数（read-after-write 保証）
+    replica_read_after_write_seconds: float = 5.0
+
+    # ファイルベースの SQLite を複数スレッドから使うための設定（WAL・PRAGMA・書き込みの直列化）
+    sqlite_tuning: bool = True
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    sqlite_mmap_size_bytes: int = 256 * 1024 * 1024
+    sqlite_serialize_writes: bool = True
+    sqlite_write_lock_timeout_seconds: float = 30.0
 
     # 起動時の自動マイグレーション実行を制御
     # 本番環境でDDL権限がない場合や手動管理が必要な場合はFalseに設定
@@ -39,6 +81,18 @@ class Settings(BaseSettings):
     review_credit_comment_weight: float = 0.5
     ta_credit_multiplier: float = 2.0
 
+    # レビュー割り当ての有効期限（分）。0以下で無期限
+    review_assignment_lease_minutes: int = 120
+
+    # キャッシュ (memory: プロセス内 / redis: 複数ワーカーで共有。redis パッケージが必要)
+    cache_backend: str = "memory"
+    redis_url: str | None = None
+    # 認証済みユーザーのキャッシュ。0以下で無効
+    user_cache_ttl_seconds: int = 30
+    user_cache_max_entries: int = 2048
+    # 学生向けの講義カタログ (GET /courses) のキャッシュ。0以下で無効
+    course_catalog_ttl_seconds: int = 300
+
     openai_api_key: str | None = None
     # 類似検知 (review similarity) の設定
     similarity_threshold: float = 0.5
@@ -60,6 +114,34 @@ class Settings(BaseSettings):
     vapid_private_key: str = ""
     vapid_public_key: str = ""
     vapid_subject: str = "mailto:admin@example.com"
+    # 送信専用スレッドプールの並列数と、プッシュサービス 1 件あたりのタイムアウト
+    push_delivery_workers: int = 8
+    push_timeout_seconds: float = 10.0
+    # 通知アウトボックスのディスパッチャー。API プロセス内で OUTBOX_DISPATCH_INTERVAL_SECONDS ごとに送信する
+    # （0 で無効にし、scripts/dispatch_notifications.py を専用プロセスで動かす）
+    outbox_dispatch_interval_seconds: float = 5.0
+    outbox_batch_size: int = 100
+    outbox_lease_seconds: int = 120
+    outbox_max_attempts: int = 6
+    outbox_backoff_base_seconds: float = 10.0
+    outbox_backoff_max_seconds: float = 1800.0
+    # 締め切りリマインダー（scripts/send_deadline_reminders.py）。締め切りの何時間前に送るか（カンマ区切り）
+    deadline_reminder_hours: str = "24"
+    reminder_batch_size: int = 1000
+    # 通知履歴の保持（scripts/compact_notifications.py）。既読で保持日数を過ぎたもの、
+    # ユーザーごとの保持件数を超えた古いものをアーカイブへ移す（0 で無効）
+    notification_retention_days: int = 180
+    notification_keep_per_user: int = 1000
+    # 送信済み・失敗したアウトボックスの行を作成から何日残すか（0 で削除しない）
+    outbox_retention_days: int = 7
+    retention_batch_size: int = 1000
+    # 通知ストリーム (GET /notifications/stream) の配信方式 (auto | memory | redis)。
+    # auto は REDIS_URL があれば redis。別プロセスのジョブからの通知を届けるには redis が必要
+    event_backend: str = "auto"
+    event_queue_size: int = 100
+    event_keepalive_seconds: float = 15.0
+    # 通知ストリームへの接続に使う短命トークンの有効期限（秒）。接続時にだけ検証する
+    stream_token_ttl_seconds: int = 60
 
 
 settings = Settings()
@@ -0,0 +1,206 @@
+"""プロセス内のメトリクスレジストリ
+
+カウンタ・ゲージ・ヒストグラムをラベル付きで保持する。値の読み出し時に ``add_collector`` で
+登録した関数を呼び、接続プールの使用数のような「その時点の状態」をゲージへ反映する。
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+
+LabelKey = tuple[tuple[str, str], ...]
+
+# 秒単位のレイテンシ向け既定バケット
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels: dict[str, object]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, description: str) -> None:
+        self.name = name
+        self.description = description
+        self._values: dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: object) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self) -> dict[LabelKey, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def dec(self, amount: float = 1.0, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+
+@dataclass
+class HistogramSample:
+    bucket_counts: list[int]
+    total: float = 0.0
+    count: int = 0
+    max_value: float = 0.0
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._values: dict[LabelKey, HistogramSample] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            sample = self._values.get(key)
+            if sample is None:
+                sample = HistogramSample(bucket_counts=[0] * (len(self.buckets) + 1))
+                self._values[key] = sample
+            sample.bucket_counts[index] += 1
+            sample.total += value
+            sample.count += 1
+            sample.max_value = max(sample.max_value, value)
+
+    def samples(self) -> dict[LabelKey, HistogramSample]:
+        with self._lock:
+            return {
+                key: HistogramSample(
+                    bucket_counts=list(sample.bucket_counts),
+                    total=sample.total,
+                    count=sample.count,
+                    max_value=sample.max_value,
+                )
+                for key, sample in self._values.items()
+            }
+
+    def quantile(self, q: float, **labels: object) -> float | None:
+        """バケット境界から分位点を近似する（該当バケットの上限を返す）"""
+        sample = self.samples().get(_label_key(labels))
+        if sample is None or sample.count == 0:
+            return None
+        threshold = q * sample.count
+        cumulative = 0
+        for index, bucket_count in enumerate(sample.bucket_counts):
+            cumulative += bucket_count
+            if cumulative >= threshold:
+                return self.buckets[index] if index < len(self.buckets) else sample.max_value
+        return sample.max_value
+
+
+Metric = Counter | Gauge | Histogram
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, name: str, factory: Callable[[], Metric]) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = factory()
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, description: str) -> Counter:
+        metric = self._get_or_create(name, lambda: Counter(name, description))
+        assert isinstance(metric, Counter) and metric.kind == "counter"
+        return metric
+
+    def gauge(self, name: str, description: str) -> Gauge:
+        metric = self._get_or_create(name, lambda: Gauge(name, description))
+        assert isinstance(metric, Gauge)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        metric = self._get_or_create(name, lambda: Histogram(name, description, buckets))
+        assert isinstance(metric, Histogram)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """読み出し直前に呼ばれる関数を登録する（ゲージを最新の状態にする用途）"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def collect(self) -> list[Metric]:
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            collector()
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+
+registry = MetricsRegistry()
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey, extra: tuple[tuple[str, str], ...] = ()) -> str:
+    pairs = (*key, *extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def render_prometheus(target: MetricsRegistry | None = None) -> str:
+    """Prometheus のテキスト形式 (text/plain; version=0.0.4) で出力する"""
+    lines: list[str] = []
+    for metric in (target or registry).collect():
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        if isinstance(metric, Histogram):
+            for key, sample in sorted(metric.samples().items()):
+                cumulative = 0
+                for bound, bucket_count in zip((*metric.buckets, float("inf")), sample.bucket_counts, strict=True):
+                    cumulative += bucket_count
+                    labels = _format_labels(key, (("le", _format_value(bound)),))
+                    lines.append(f"{metric.name}_bucket{labels} {cumulative}")
+                lines.append(f"{metric.name}_sum{_format_labels(key)} {_format_value(sample.total)}")
+                lines.append(f"{metric.name}_count{_format_labels(key)} {sample.count}")
+            continue
+        for key, value in sorted(metric.samples().items()):
+            lines.append(f"{metric.name}{_format_labels(key)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,268 @@
+"""オンデマンドのプロファイリング
+
+PROFILING_ENABLED=true のときだけ有効になる。次の 2 通りで取得できる。
+
+- リクエスト単位: ``X-Profile`` ヘッダーに PROFILING_TOKEN を付けたリクエスト、または管理画面から
+  予約した件数分のリクエストを、スタックのサンプリングで計測する
+- 関数単位: ``@profiled`` を付けたサービス関数の次の呼び出しを、管理画面から予約して計測する
+
+結果は folded stacks 形式（``スレッド;モジュール:関数;... 件数``）で PROFILING_DIR に保存する。
+speedscope (https://www.speedscope.app) や flamegraph.pl にそのまま読み込める。
+予約状態はワーカープロセスごとに持つ。
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import re
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+SERVICE_CALL_SECONDS = registry.histogram(
+    "service_call_seconds",
+    "Duration of profiled service functions",
+)
+
+PROFILE_SUFFIX = ".folded"
+_PROFILE_ID_PATTERN = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+# 待機中のスレッド（スレッドプールの空きワーカーやイベントループの select）はサンプルから除く
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py", "concurrent/futures/thread.py")
+_MAX_STACK_DEPTH = 200
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+
+class SamplingProfiler:
+    """別スレッドから一定間隔で ``sys._current_frames()`` を読み、スタックごとの出現回数を数える
+
+    ``thread_ids`` を指定するとそのスレッドだけを、指定しなければ待機中でない全スレッドを対象にする。
+    """
+
+    def __init__(self, *, interval_seconds: float | None = None, thread_ids: set[int] | None = None) -> None:
+        self.interval_seconds = interval_seconds or settings.profiling_interval_seconds
+        self.thread_ids = thread_ids
+        self.stacks: StackCounter[str] = StackCounter()
+        self.samples = 0
+        self.started_at = 0.0
+        self.elapsed_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.elapsed_seconds = time.perf_counter() - self.started_at
+
+    def __enter__(self) -> SamplingProfiler:
+        self.start()
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while not self._stop.wait(self.interval_seconds):
+            self._sample(own_id, names)
+
+    def _sample(self, own_id: int, names: dict[int | None, str]) -> None:
+        self.samples += 1
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                continue
+            if frame.f_code.co_filename.endswith(_IDLE_FILES):
+                continue
+            labels: list[str] = []
+            current = frame
+            while current is not None and len(labels) < _MAX_STACK_DEPTH:
+                labels.append(_frame_label(current))
+                current = current.f_back
+            if thread_id not in names:
+                names.update({thread.ident: thread.name for thread in threading.enumerate()})
+            labels.append(names.get(thread_id, str(thread_id)))
+            self.stacks[";".join(reversed(labels))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+@dataclass(frozen=True)
+class ProfileInfo:
+    id: str
+    label: str
+    created_at: datetime
+    size_bytes: int
+
+
+def _profile_dir() -> Path:
+    return Path(settings.profiling_dir or Path(settings.storage_dir) / "profiles")
+
+
+def save_profile(profiler: SamplingProfiler, *, label: str, profile_id: str | None = None) -> str:
+    """計測結果を保存して ID を返す。古いものから PROFILING_MAX_FILES 件を超えた分は削除する"""
+    profile_id = profile_id or new_profile_id()
+    directory = _profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    header = (
+        f"# {label}\n"
+        f"# elapsed={profiler.elapsed_seconds:.3f}s samples={profiler.samples}"
+        f" interval={profiler.interval_seconds}s\n"
+    )
+    (directory / f"{profile_id}{PROFILE_SUFFIX}").write_text(header + profiler.folded(), encoding="utf-8")
+
+    stale = sorted(directory.glob(f"*{PROFILE_SUFFIX}"))[: -max(1, settings.profiling_max_files)]
+    for path in stale:
+        path.unlink(missing_ok=True)
+    return profile_id
+
+
+def new_profile_id() -> str:
+    return f"{datetime.now(UTC):%Y%m%dT%H%M%S}-{uuid4().hex[:8]}"
+
+
+def profile_path(profile_id: str) -> Path | None:
+    if not _PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = _profile_dir() / f"{profile_id}{PROFILE_SUFFIX}"
+    return path if path.is_file() else None
+
+
+def list_profiles() -> list[ProfileInfo]:
+    directory = _profile_dir()
+    if not directory.is_dir():
+        return []
+    profiles: list[ProfileInfo] = []
+    for path in sorted(directory.glob(f"*{PROFILE_SUFFIX}"), reverse=True):
+        with path.open(encoding="utf-8") as handle:
+            label = handle.readline().removeprefix("# ").strip()
+        stat = path.stat()
+        profiles.append(
+            ProfileInfo(
+                id=path.name.removesuffix(PROFILE_SUFFIX),
+                label=label,
+                created_at=datetime.fromtimestamp(stat.st_mtime, UTC),
+                size_bytes=stat.st_size,
+            )
+        )
+    return profiles
+
+
+class ProfilingToggle:
+    """管理画面から予約された計測の残り件数（ワーカープロセス内）"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.path_prefix: str | None = None
+        self.functions: dict[str, int] = {}
+
+    def arm_requests(self, count: int, *, path_prefix: str | None = None) -> None:
+        with self._lock:
+            self.requests = count
+            self.path_prefix = path_prefix
+
+    def arm_function(self, name: str, count: int) -> None:
+        with self._lock:
+            if count > 0:
+                self.functions[name] = count
+            else:
+                self.functions.pop(name, None)
+
+    def take_request(self, path: str) -> bool:
+        with self._lock:
+            if self.requests <= 0 or (self.path_prefix and not path.startswith(self.path_prefix)):
+                return False
+            self.requests -= 1
+            return True
+
+    def take_function(self, name: str) -> bool:
+        with self._lock:
+            remaining = self.functions.get(name, 0)
+            if remaining <= 0:
+                return False
+            if remaining == 1:
+                del self.functions[name]
+            else:
+                self.functions[name] = remaining - 1
+            return True
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.path_prefix = None
+            self.functions.clear()
+
+
+toggle = ProfilingToggle()
+# @profiled で登録された関数名（管理画面で予約できる対象の一覧）
+PROFILED_FUNCTIONS: set[str] = set()
+
+
+def profiled(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """サービス関数の所要時間を service_call_seconds に記録し、予約があればその呼び出しを計測する"""
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        PROFILED_FUNCTIONS.add(name)
+
+        def _should_profile() -> bool:
+            return settings.profiling_enabled and toggle.take_function(name)
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                started = time.perf_counter()
+                profiler = SamplingProfiler(thread_ids={threading.get_ident()}) if _should_profile() else None
+                if profiler is not None:
+                    profiler.start()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    SERVICE_CALL_SECONDS.observe(time.perf_counter() - started, function=name)
+                    if profiler is not None:
+                        profiler.stop()
+                        save_profile(profiler, label=f"function {name}")
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            profiler = SamplingProfiler(thread_ids={threading.get_ident()}) if _should_profile() else None
+            if profiler is not None:
+                profiler.start()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                SERVICE_CALL_SECONDS.observe(time.perf_counter() - started, function=name)
+                if profiler is not None:
+                    profiler.stop()
+                    save_profile(profiler, label=f"function {name}")
+
+        return wrapper
+
+    return decorator
@@ -1,13 +1,17 @@
 from datetime import UTC
 from datetime import datetime
 from datetime import timedelta
+from uuid import UUID
 
 import bcrypt
+from jose import JWTError
 from jose import jwt
 
 from app.core.config import settings
 
 ALGORITHM = "HS256"
+# 通知ストリーム (GET /notifications/stream) 専用の短命トークン。API の認証には使えない
+STREAM_TOKEN_SCOPE = "notification_stream"
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -24,3 +28,35 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     expire = datetime.now(UTC) + (expires_delta or timedelta(minutes=15))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.secret_key, algorithm=ALGORITHM)
+
+
+def decode_access_token_subject(token: str) -> UUID | None:
+    """アクセストークンを検証して sub (ユーザーID) を返す。不正なトークンなら None"""
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
+        if payload.get("scope") is not None:
+            # 用途を限定したトークン（ストリーム用など）はアクセストークンとして受け付けない
+            return None
+        subject = payload.get("sub")
+        return UUID(subject) if subject is not None else None
+    except (JWTError, ValueError, TypeError):
+        return None
+
+
+def create_stream_token(user_id: UUID) -> str:
+    """URL のクエリに載せるための、通知ストリーム専用の短命トークンを作る"""
+    return create_access_token(
+        {"sub": str(user_id), "scope": STREAM_TOKEN_SCOPE},
+        expires_delta=timedelta(seconds=settings.stream_token_ttl_seconds),
+    )
+
+
+def decode_stream_token_subject(token: str) -> UUID | None:
+    """通知ストリーム用トークンを検証して sub (ユーザーID) を返す。不正・期限切れ・用途違いなら None"""
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
+        if payload.get("scope") != STREAM_TOKEN_SCOPE:
+            return None
+        return UUID(payload["sub"])
+    except (JWTError, KeyError, ValueError, TypeError):
+        return None
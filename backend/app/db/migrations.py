@@ -0,0 +1,140 @@
+"""起動時のマイグレーション確認
+
+ビルド時に Alembic の head リビジョンを ``alembic/head.json`` に書き出しておき、起動時は
+アプリのエンジンで ``alembic_version`` を 1 回読むだけで最新かどうかを判定する。
+最新なら Alembic を import せずに起動する。キャッシュがない・versions ディレクトリの内容と
+一致しない・DB が古い場合だけ Alembic を読み込んで従来どおり upgrade する。
+
+キャッシュの作成（Dockerfile のビルド時に実行）:
+    uv run python -m app.db.migrations write-head-cache
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sys
+from pathlib import Path
+
+from sqlalchemy import Engine
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+ALEMBIC_INI_PATH = BACKEND_DIR / "alembic.ini"
+VERSIONS_DIR = BACKEND_DIR / "alembic" / "versions"
+HEAD_CACHE_PATH = BACKEND_DIR / "alembic" / "head.json"
+
+
+def versions_fingerprint(versions_dir: Path | None = None) -> str:
+    """マイグレーションファイルの名前と内容から作るハッシュ（キャッシュが古くないかの確認用）
+
+    サイズの変わらない修正（リビジョン ID の書き換えなど）も検出できるよう内容を読む。数十件の小さな
+    ファイルなので、stat だけの場合と時間はほとんど変わらない。
+    """
+    digest = hashlib.sha256()
+    for path in sorted((versions_dir or VERSIONS_DIR).glob("*.py")):
+        digest.update(f"{path.name}\n".encode())
+        digest.update(hashlib.sha256(path.read_bytes()).digest())
+    return digest.hexdigest()
+
+
+def read_cached_heads(cache_path: Path | None = None, versions_dir: Path | None = None) -> set[str] | None:
+    """キャッシュ済みの head を返す。キャッシュがない・壊れている・古い場合は None"""
+    try:
+        data = json.loads((cache_path or HEAD_CACHE_PATH).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    heads = data.get("heads") if isinstance(data, dict) else None
+    if not heads or data.get("fingerprint") != versions_fingerprint(versions_dir):
+        return None
+    return set(heads)
+
+
+def _alembic_config():
+    from alembic.config import Config  # noqa: PLC0415
+
+    return Config(str(ALEMBIC_INI_PATH))
+
+
+def script_heads() -> set[str]:
+    from alembic.script import ScriptDirectory  # noqa: PLC0415
+
+    return set(ScriptDirectory.from_config(_alembic_config()).get_heads())
+
+
+def write_head_cache(cache_path: Path | None = None) -> set[str]:
+    heads = script_heads()
+    payload = {"heads": sorted(heads), "fingerprint": versions_fingerprint()}
+    (cache_path or HEAD_CACHE_PATH).write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    return heads
+
+
+def current_revisions(engine: Engine) -> set[str]:
+    """DB の alembic_version を読む（テーブルがなければ空集合）"""
+    try:
+        with engine.connect() as connection:
+            return {row[0] for row in connection.execute(text("SELECT version_num FROM alembic_version"))}
+    except DBAPIError:
+        return set()
+
+
+def run_migrations(engine: Engine) -> None:
+    """起動時に Alembic マイグレーションを自動実行する
+
+    注意事項:
+    - 本番環境で DDL 権限がない場合は RUN_MIGRATIONS_ON_STARTUP=false を設定
+    - 複数ワーカーで起動する場合は手動マイグレーション推奨
+    - alembic.ini は __file__ からの相対パスで解決
+    """
+    if not settings.run_migrations_on_startup:
+        logger.info("Automatic migrations disabled (RUN_MIGRATIONS_ON_STARTUP=false)")
+        return
+
+    if not ALEMBIC_INI_PATH.exists():
+        logger.warning(f"alembic.ini not found at {ALEMBIC_INI_PATH}, skipping migrations")
+        return
+
+    current = current_revisions(engine)
+    cached_heads = read_cached_heads()
+    if cached_heads is not None and current == cached_heads:
+        logger.info(f"Database is already up to date (revision: {', '.join(sorted(current))}, cached head)")
+        return
+
+    try:
+        heads = script_heads()
+        if current == heads:
+            logger.info(f"Database is already up to date (revision: {', '.join(sorted(current))})")
+            if cached_heads is None:
+                logger.info("Run `python -m app.db.migrations write-head-cache` at build time to skip this check")
+            return
+
+        from alembic import command  # noqa: PLC0415
+
+        logger.info(f"Database migration needed: {', '.join(sorted(current)) or 'None'} -> {', '.join(sorted(heads))}")
+        logger.info("Starting database migration to head...")
+        command.upgrade(_alembic_config(), "head")
+        logger.info("Database migrations completed successfully")
+    except Exception as e:
+        logger.error(f"Migration execution failed: {e}", exc_info=True)
+        logger.error("Please check database connectivity and migration files")
+        raise RuntimeError(f"Migration execution failed: {e}") from e
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = sys.argv[1:] if argv is None else argv
+    if args != ["write-head-cache"]:
+        print("usage: python -m app.db.migrations write-head-cache", file=sys.stderr)
+        return 2
+    heads = write_head_cache()
+    print(f"done: wrote {HEAD_CACHE_PATH} (heads={', '.join(sorted(heads))})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,113 @@
+"""接続プールの計測
+
+チェックアウト待ち時間をヒストグラムに記録し、使用中・オーバーフロー数をゲージとして公開する。
+ラベルにはエンジン作成時の ``pool_logging_name``（primary / async など）を使う。
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+
+from sqlalchemy import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.pool import ConnectionPoolEntry
+from sqlalchemy.pool import Pool
+from sqlalchemy.pool import QueuePool
+
+from app.core.metrics import registry
+
+POOL_CHECKOUT_SECONDS = registry.histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a connection from the pool",
+)
+POOL_CHECKOUT_TIMEOUTS = registry.counter(
+    "db_pool_checkout_timeouts_total",
+    "Connection checkouts that failed with a pool timeout",
+)
+POOL_SIZE = registry.gauge("db_pool_size", "Configured number of persistent connections")
+POOL_CHECKED_OUT = registry.gauge("db_pool_checked_out", "Connections currently in use")
+POOL_CHECKED_IN = registry.gauge("db_pool_checked_in", "Idle connections held by the pool")
+POOL_OVERFLOW = registry.gauge("db_pool_overflow", "Connections opened beyond pool_size (negative while warming up)")
+
+_instrumented_engines: dict[str, Engine] = {}
+
+
+def _pool_label(pool: Pool) -> str:
+    return str(pool.logging_name or "default")
+
+
+def _timed_checkout(pool: Pool, do_get: Callable[[], ConnectionPoolEntry]) -> ConnectionPoolEntry:
+    label = _pool_label(pool)
+    started = time.perf_counter()
+    try:
+        return do_get()
+    except PoolTimeoutError:
+        POOL_CHECKOUT_TIMEOUTS.inc(pool=label)
+        raise
+    finally:
+        POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started, pool=label)
+
+
+class InstrumentedQueuePool(QueuePool):
+    def _do_get(self) -> ConnectionPoolEntry:
+        return _timed_checkout(self, super()._do_get)
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self) -> ConnectionPoolEntry:
+        return _timed_checkout(self, super()._do_get)
+
+
+def pool_status(pool: Pool) -> dict[str, int] | None:
+    """QueuePool 系の現在の状態を返す（それ以外のプールは None）"""
+    if not isinstance(pool, QueuePool):
+        return None
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+
+def register_pool_metrics(engine: Engine) -> None:
+    """エンジンのプールをゲージの集計対象に加える（dispose 後に作り直されたプールも追従する）"""
+    _instrumented_engines[_pool_label(engine.pool)] = engine
+
+
+def _collect_pool_gauges() -> None:
+    for label, engine in _instrumented_engines.items():
+        status = pool_status(engine.pool)
+        if status is None:
+            continue
+        POOL_SIZE.set(status["size"], pool=label)
+        POOL_CHECKED_OUT.set(status["checked_out"], pool=label)
+        POOL_CHECKED_IN.set(status["checked_in"], pool=label)
+        POOL_OVERFLOW.set(status["overflow"], pool=label)
+
+
+def pool_metrics_snapshot() -> dict[str, dict]:
+    """登録済みプールの状態とチェックアウト待ち時間の要約"""
+    _collect_pool_gauges()
+    checkout = POOL_CHECKOUT_SECONDS.samples()
+    snapshot: dict[str, dict] = {}
+    for label, engine in _instrumented_engines.items():
+        pool = engine.pool
+        sample = checkout.get((("pool", label),))
+        count = sample.count if sample else 0
+        snapshot[label] = {
+            "pool_class": type(pool).__name__,
+            "status": pool_status(pool),
+            "checkout_count": count,
+            "checkout_timeouts": int(POOL_CHECKOUT_TIMEOUTS.value(pool=label)),
+            "checkout_seconds_avg": (sample.total / count) if sample and count else None,
+            "checkout_seconds_p50": POOL_CHECKOUT_SECONDS.quantile(0.5, pool=label),
+            "checkout_seconds_p95": POOL_CHECKOUT_SECONDS.quantile(0.95, pool=label),
+            "checkout_seconds_max": sample.max_value if sample else None,
+        }
+    return snapshot
+
+
+registry.add_collector(_collect_pool_gauges)
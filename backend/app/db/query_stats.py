@@ -0,0 +1,91 @@
+"""リクエスト単位の SQL 計測
+
+``track_queries()`` の内側で実行された SQL の件数・合計時間・最も遅い文を記録する。
+計測対象は contextvar で切り替えるため、スレッドプールで動く同期ルートや
+``AsyncSession.run_sync`` の中から発行された SQL も同じリクエストに集計される。
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import Engine
+from sqlalchemy import event
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_STARTED_AT_KEY = "query_stats_started_at"
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: str | None = None
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_seconds += elapsed
+        if elapsed >= self.slowest_seconds:
+            self.slowest_seconds = elapsed
+            self.slowest_statement = statement
+
+
+_current_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> QueryStats | None:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """ブロック内で実行された SQL を集計する"""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def _before_cursor_execute(conn, _cursor, _statement, *_args) -> None:
+    if _current_stats.get() is None:
+        return
+    conn.info.setdefault(_STARTED_AT_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, _cursor, statement, *_args) -> None:
+    stats = _current_stats.get()
+    started = conn.info.get(_STARTED_AT_KEY)
+    if stats is None or not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats.record(statement, elapsed)
+    threshold_ms = settings.slow_query_log_ms
+    if threshold_ms > 0 and elapsed * 1000 >= threshold_ms:
+        logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, " ".join(statement.split())[:500])
+
+
+def _handle_error(context) -> None:
+    # 失敗した文は after_cursor_execute が呼ばれないため、開始時刻を捨てて対応をずらさない
+    started = context.connection.info.get(_STARTED_AT_KEY) if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def install_query_instrumentation() -> None:
+    """全エンジンにカーソル実行のフックを登録する（複数回呼んでも一度だけ）"""
+    if event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
@@ -0,0 +1,140 @@
+"""読み取り専用レプリカへの振り分け判定
+
+- レプリカの遅延を定期的に計測し、許容値 (REPLICA_MAX_LAG_SECONDS) を超えたらプライマリに戻す
+- 書き込みを行ったユーザーは一定時間 (REPLICA_READ_AFTER_WRITE_SECONDS) プライマリに固定し、
+  自分の書き込みが読み取りで見えない状態を避ける
+
+固定情報は CACHE_BACKEND のキャッシュに置くため、redis を使えば複数ワーカー間で共有される。
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from functools import lru_cache
+from uuid import UUID
+
+from sqlalchemy import Connection
+from sqlalchemy import Engine
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.requests import HTTPConnection
+
+from app.core.config import settings
+from app.core.security import decode_access_token_subject
+from app.services.cache import Cache
+from app.services.cache import build_cache
+
+logger = logging.getLogger(__name__)
+
+# WAL を受信済みの分まですべて適用済みなら遅延 0 とみなす（書き込みがない間に
+# pg_last_xact_replay_timestamp() が古いまま残り、遅延が大きく見えるのを避ける）
+_POSTGRES_LAG_SQL = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END"
+)
+
+_lag_lock = threading.Lock()
+# engine の識別子 -> (計測時刻, 遅延秒数)
+_lag_samples: dict[str, tuple[float, float]] = {}
+
+
+def _engine_key(engine: Engine) -> str:
+    return engine.pool.logging_name or str(engine.url)
+
+
+def _cached_lag(key: str) -> float | None:
+    with _lag_lock:
+        sample = _lag_samples.get(key)
+    if sample is None or time.monotonic() - sample[0] >= settings.replica_lag_check_interval_seconds:
+        return None
+    return sample[1]
+
+
+def _store_lag(key: str, lag: float) -> float:
+    with _lag_lock:
+        _lag_samples[key] = (time.monotonic(), lag)
+    return lag
+
+
+def _measure_lag(connection: Connection) -> float:
+    # PostgreSQL 以外（SQLite など）はストリーミングレプリケーションがないため常に 0 とする
+    if connection.dialect.name != "postgresql":
+        return 0.0
+    value = connection.execute(_POSTGRES_LAG_SQL).scalar()
+    return float(value or 0.0)
+
+
+def probe_replica_lag(engine: Engine) -> float:
+    """レプリカの遅延（秒）を返す。計測に失敗した場合は inf（=使用不可）"""
+    key = _engine_key(engine)
+    cached = _cached_lag(key)
+    if cached is not None:
+        return cached
+    try:
+        with engine.connect() as connection:
+            lag = _measure_lag(connection)
+    except Exception:
+        logger.warning("Failed to measure replica lag; falling back to primary", exc_info=True)
+        lag = math.inf
+    return _store_lag(key, lag)
+
+
+async def async_probe_replica_lag(engine: AsyncEngine) -> float:
+    key = _engine_key(engine.sync_engine)
+    cached = _cached_lag(key)
+    if cached is not None:
+        return cached
+    try:
+        async with engine.connect() as connection:
+            lag = await connection.run_sync(_measure_lag)
+    except Exception:
+        logger.warning("Failed to measure replica lag; falling back to primary", exc_info=True)
+        lag = math.inf
+    return _store_lag(key, lag)
+
+
+def replica_lag_acceptable(lag_seconds: float) -> bool:
+    return lag_seconds <= settings.replica_max_lag_seconds
+
+
+def reset_replica_lag_samples() -> None:
+    with _lag_lock:
+        _lag_samples.clear()
+
+
+@lru_cache
+def get_primary_pin_cache() -> Cache:
+    return build_cache(
+        namespace="primary-pin",
+        max_entries=max(1, settings.user_cache_max_entries),
+        ttl_seconds=settings.replica_read_after_write_seconds,
+    )
+
+
+def pin_to_primary(user_id: UUID) -> None:
+    """書き込み直後のユーザーの読み取りを一定時間プライマリに固定する"""
+    get_primary_pin_cache().set(str(user_id), 1)
+
+
+def is_pinned_to_primary(user_id: UUID) -> bool:
+    return get_primary_pin_cache().get(str(user_id)) is not None
+
+
+def bearer_subject(authorization: str | None) -> UUID | None:
+    """Authorization ヘッダーの Bearer トークンからユーザーIDを取り出す"""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return decode_access_token_subject(token.strip())
+
+
+def request_pinned_to_primary(connection: HTTPConnection) -> bool:
+    user_id = bearer_subject(connection.headers.get("authorization"))
+    return user_id is not None and is_pinned_to_primary(user_id)
@@ -1,27 +1,124 @@
+from collections.abc import AsyncGenerator
 from collections.abc import Generator
 
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import Session
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import Pool
 
 from app.core.config import settings
+from app.db.pool import InstrumentedAsyncAdaptedQueuePool
+from app.db.pool import InstrumentedQueuePool
+from app.db.pool import register_pool_metrics
+from app.db.replica import async_probe_replica_lag
+from app.db.replica import probe_replica_lag
+from app.db.replica import replica_lag_acceptable
+from app.db.replica import request_pinned_to_primary
+from app.db.sqlite import configure_sqlite_engine
 
 
-def _build_engine():
+def _is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (
+        ":memory:" in url or "mode=memory" in url or url.split("://", 1)[-1] in {"", "/"}
+    )
+
+
+def _uses_sqlite_tuning(url: str) -> bool:
+    return settings.sqlite_tuning and url.startswith("sqlite") and not _is_memory_sqlite(url)
+
+
+def _pool_options(url: str, *, poolclass: type[Pool], logging_name: str) -> dict:
+    # インメモリ SQLite は接続ごとに別 DB になるため、SQLAlchemy 既定の単一接続プールのままにする
+    if _is_memory_sqlite(url):
+        return {"pool_pre_ping": settings.db_pool_pre_ping}
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_logging_name": logging_name,
+    }
+
+
+def _build_engine(url: str, *, logging_name: str, serialize_writes: bool):
     connect_args: dict = {}
-    if settings.database_url.startswith("sqlite"):
+    if url.startswith("sqlite"):
         connect_args = {"check_same_thread": False}
 
-    return create_engine(
-        settings.database_url,
+    engine = create_engine(
+        url,
         connect_args=connect_args,
-        pool_pre_ping=True,
+        **_pool_options(url, poolclass=InstrumentedQueuePool, logging_name=logging_name),
     )
+    register_pool_metrics(engine)
+    if _uses_sqlite_tuning(url):
+        configure_sqlite_engine(engine, serialize_writes=serialize_writes)
+    return engine
+
 
+def async_database_url(url: str) -> str:
+    """同期用の DATABASE_URL を非同期ドライバ用に読み替える
 
-engine = _build_engine()
+    SQLite は aiosqlite、PostgreSQL は psycopg (v3) の非同期モードを使う。
+    """
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        return url
+    dialect = scheme.split("+", 1)[0]
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    if dialect in {"postgresql", "postgres"}:
+        return f"postgresql+psycopg://{rest}"
+    return url
+
+
+def _build_async_engine(url: str, *, logging_name: str):
+    url = async_database_url(url)
+    engine = create_async_engine(
+        url,
+        **_pool_options(url, poolclass=InstrumentedAsyncAdaptedQueuePool, logging_name=logging_name),
+    )
+    register_pool_metrics(engine.sync_engine)
+    if _uses_sqlite_tuning(url):
+        # 非同期セッションはイベントループ上で動くため、スレッドロックによる直列化は行わない
+        configure_sqlite_engine(engine.sync_engine, serialize_writes=False)
+    return engine
+
+
+engine = _build_engine(settings.database_url, logging_name="primary", serialize_writes=settings.sqlite_serialize_writes)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
 
+async_engine = _build_async_engine(settings.database_url, logging_name="async")
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# 読み取り専用レプリカ（DATABASE_REPLICA_URL 未設定なら None で、読み取りもプライマリに流れる）
+replica_engine = (
+    _build_engine(settings.database_replica_url, logging_name="replica", serialize_writes=False)
+    if settings.database_replica_url
+    else None
+)
+ReplicaSessionLocal = (
+    sessionmaker(bind=replica_engine, autocommit=False, autoflush=False, expire_on_commit=False)
+    if replica_engine is not None
+    else None
+)
+async_replica_engine = (
+    _build_async_engine(settings.database_replica_url, logging_name="async-replica")
+    if settings.database_replica_url
+    else None
+)
+AsyncReplicaSessionLocal = (
+    async_sessionmaker(bind=async_replica_engine, autoflush=False, expire_on_commit=False)
+    if async_replica_engine is not None
+    else None
+)
+
 
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
@@ -29,3 +126,45 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _prefer_primary(request: Request) -> bool:
+    return request.method not in {"GET", "HEAD"} or request_pinned_to_primary(request)
+
+
+def get_read_db(request: Request) -> Generator[Session, None, None]:
+    """読み取り専用エンドポイント用のセッション
+
+    レプリカが設定されていて、遅延が許容範囲内かつ直前に書き込みを行ったユーザーでなければレプリカを使う。
+    それ以外は get_db と同じくプライマリを使う。書き込みには使わないこと。
+    """
+    factory = SessionLocal
+    if (
+        replica_engine is not None
+        and not _prefer_primary(request)
+        and replica_lag_acceptable(probe_replica_lag(replica_engine))
+    ):
+        factory = ReplicaSessionLocal
+    db = factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """get_read_db の非同期版"""
+    factory = AsyncSessionLocal
+    if (
+        async_replica_engine is not None
+        and not _prefer_primary(request)
+        and replica_lag_acceptable(await async_probe_replica_lag(async_replica_engine))
+    ):
+        factory = AsyncReplicaSessionLocal
+    async with factory() as db:
+        yield db
@@ -0,0 +1,100 @@
+"""SQLite を本番相当の同時アクセスで使うための設定
+
+- 接続ごとに WAL / synchronous / mmap_size / busy_timeout の PRAGMA を設定する
+- 同期セッションの書き込みトランザクション（最初の書き込みから commit / rollback まで）を
+  プロセス内のロックで1本ずつに直列化する
+
+SQLite は書き込み開始から commit までデータベース全体をロックするため、複数スレッドが同時に書き込むと
+``database is locked`` になりやすい。ロックの順番待ちを Python 側で行うことでこれを避ける。
+非同期セッションはイベントループ上で動くためロックの対象外とし、busy_timeout の待機に任せる。
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from sqlalchemy import Engine
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm import SessionTransaction
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+_HOLDS_WRITE_LOCK_KEY = "sqlite_write_lock_held"
+
+SQLITE_WRITE_LOCK_WAIT_SECONDS = registry.histogram(
+    "sqlite_write_lock_wait_seconds",
+    "Time request threads waited for the SQLite single-writer lock",
+)
+
+
+def _apply_pragmas(dbapi_connection, _connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}")
+        cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.execute(f"PRAGMA synchronous = {settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size_bytes)}")
+    finally:
+        cursor.close()
+
+
+class SQLiteWriteQueue:
+    """書き込みトランザクションを1本ずつ通す単一ライターキュー（スレッド間の FIFO は保証しない）"""
+
+    def __init__(self, *, timeout_seconds: float) -> None:
+        self.timeout_seconds = timeout_seconds
+        self._lock = threading.Lock()
+        self._engines: set[Engine] = set()
+
+    def attach(self, engine: Engine) -> None:
+        self._engines.add(engine)
+
+    def _applies_to(self, session: Session) -> bool:
+        bind = session.get_bind()
+        return isinstance(bind, Engine) and bind in self._engines
+
+    def acquire(self, session: Session) -> None:
+        if session.info.get(_HOLDS_WRITE_LOCK_KEY) or not self._applies_to(session):
+            return
+        started = time.perf_counter()
+        acquired = self._lock.acquire(timeout=self.timeout_seconds)
+        SQLITE_WRITE_LOCK_WAIT_SECONDS.observe(time.perf_counter() - started)
+        if not acquired:
+            raise OperationalError("acquire sqlite write lock", None, TimeoutError("sqlite write lock timed out"))
+        session.info[_HOLDS_WRITE_LOCK_KEY] = True
+
+    def release(self, session: Session) -> None:
+        if session.info.pop(_HOLDS_WRITE_LOCK_KEY, False):
+            self._lock.release()
+
+
+write_queue = SQLiteWriteQueue(timeout_seconds=settings.sqlite_write_lock_timeout_seconds)
+
+
+@event.listens_for(Session, "before_flush")
+def _acquire_before_flush(session: Session, _flush_context, _instances) -> None:
+    write_queue.acquire(session)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _acquire_before_bulk_write(orm_execute_state) -> None:
+    # query().update() / delete() などの一括 DML は flush を経由しない
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        write_queue.acquire(orm_execute_state.session)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _release_after_transaction(session: Session, transaction: SessionTransaction) -> None:
+    if transaction.parent is None:
+        write_queue.release(session)
+
+
+def configure_sqlite_engine(engine: Engine, *, serialize_writes: bool) -> None:
+    """ファイルベースの SQLite エンジンに PRAGMA と（必要なら）単一ライターキューを設定する"""
+    event.listen(engine, "connect", _apply_pragmas)
+    if serialize_writes:
+        write_queue.attach(engine)
@@ -0,0 +1,21 @@
+"""INSERT ... ON CONFLICT を使うためのヘルパー
+
+ON CONFLICT 句は方言ごとの insert() にしかないため、セッションの接続先に合わせて選ぶ。
+本番の PostgreSQL と開発・テストの SQLite に対応する。
+"""
+
+from __future__ import annotations
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import Session
+
+
+def dialect_insert(db: Session, model):
+    """``on_conflict_do_nothing`` / ``on_conflict_do_update`` が使える insert() を返す"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise RuntimeError(f"INSERT ... ON CONFLICT is not supported on {dialect}")
@@ -3,12 +3,17 @@ from app.models.assignment import RubricCriterion
 from app.models.course import Course
 from app.models.course import CourseEnrollment
 from app.models.credit_history import CreditHistory
+from app.models.notification import DeadlineReminder
+from app.models.notification import NotificationCounter
 from app.models.notification import NotificationHistory
+from app.models.notification import NotificationHistoryArchive
+from app.models.notification import NotificationOutbox
 from app.models.notification import PushSubscription
 from app.models.review import MetaReview
 from app.models.review import Review
 from app.models.review import ReviewAssignment
 from app.models.review import ReviewRubricScore
+from app.models.reviewer_skill_stat import ReviewerSkillStat
 from app.models.submission import Submission
 from app.models.submission import SubmissionRubricScore
 from app.models.ta_review_request import TAReviewRequest
@@ -21,12 +26,17 @@ __all__ = [
     "Course",
     "CourseEnrollment",
     "CreditHistory",
+    "DeadlineReminder",
     "MetaReview",
+    "NotificationCounter",
     "NotificationHistory",
+    "NotificationHistoryArchive",
+    "NotificationOutbox",
     "PushSubscription",
     "Review",
     "ReviewAssignment",
     "ReviewRubricScore",
+    "ReviewerSkillStat",
     "RubricCriterion",
     "Submission",
     "SubmissionRubricScore",
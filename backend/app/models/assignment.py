@@ -35,6 +35,7 @@ class Assignment(Base):
         DateTime(timezone=True),
         default=None,
         nullable=True,
+        index=True,
     )
 
     course = relationship("Course", back_populates="assignments")
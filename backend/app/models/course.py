@@ -5,6 +5,7 @@ from uuid import uuid4
 
 from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import String
 from sqlalchemy import Text
 from sqlalchemy import UniqueConstraint
@@ -18,6 +19,8 @@ from app.db.base import UUIDType
 
 class Course(Base):
     __tablename__ = "courses"
+    # 講義一覧のキーセットページング (created_at DESC, id DESC) 用
+    __table_args__ = (Index("ix_courses_created_id", "created_at", "id"),)
 
     id: Mapped[UUID] = mapped_column(UUIDType, primary_key=True, default=uuid4)
     title: Mapped[str] = mapped_column(String(200))
@@ -5,6 +5,7 @@ from uuid import uuid4
 
 from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy.orm import Mapped
@@ -17,9 +18,11 @@ from app.db.base import UUIDType
 
 class CreditHistory(Base):
     __tablename__ = "credit_histories"
+    # 履歴一覧のキーセットページング (user_id, created_at DESC, id DESC) 用。user_id 単独の索引も兼ねる
+    __table_args__ = (Index("ix_credit_histories_user_created_id", "user_id", "created_at", "id"),)
 
     id: Mapped[UUID] = mapped_column(UUIDType, primary_key=True, default=uuid4)
-    user_id: Mapped[UUID] = mapped_column(UUIDType, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    user_id: Mapped[UUID] = mapped_column(UUIDType, ForeignKey("users.id", ondelete="CASCADE"))
     delta: Mapped[int] = mapped_column(Integer)
     total_credits: Mapped[int] = mapped_column(Integer)
     reason: Mapped[str] = mapped_column(String(120))
@@ -5,11 +5,15 @@ from datetime import datetime
 from uuid import UUID
 from uuid import uuid4
 
+from sqlalchemy import JSON
 from sqlalchemy import Boolean
 from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
+from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy import Text
+from sqlalchemy import UniqueConstraint
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 
@@ -37,9 +41,12 @@ class NotificationHistory(Base):
     """通知履歴モデル"""
 
     __tablename__ = "notification_history"
+    # 通知一覧のキーセットページング (user_id, created_at DESC, id DESC) 用
+    # user_id だけの検索もこの索引の先頭列で賄えるため、user_id 単独の索引は持たない
+    __table_args__ = (Index("ix_notification_history_user_created_id", "user_id", "created_at", "id"),)
 
     id: Mapped[UUID] = mapped_column(UUIDType, primary_key=True, default=uuid4)
-    user_id: Mapped[UUID] = mapped_column(UUIDType, ForeignKey("users.id"), index=True)
+    user_id: Mapped[UUID] = mapped_column(UUIDType, ForeignKey("users.id"))
     notification_type: Mapped[str] = mapped_column(String(50))
     title: Mapped[str] = mapped_column(String(255))
     body: Mapped[str] = mapped_column(Text)
@@ -49,3 +56,81 @@ class NotificationHistory(Base):
 
     def __repr__(self) -> str:
         return f"<NotificationHistory(id={self.id}, user_id={self.user_id}, is_read={self.is_read})>"
+
+
+class NotificationHistoryArchive(Base):
+    """保持期間を過ぎた通知履歴の退避先（scripts/compact_notifications.py が移す）"""
+
+    __tablename__ = "notification_history_archive"
+    __table_args__ = (Index("ix_notification_history_archive_user_created", "user_id", "created_at"),)
+
+    id: Mapped[UUID] = mapped_column(UUIDType, primary_key=True)
+    user_id: Mapped[UUID] = mapped_column(UUIDType, ForeignKey("users.id", ondelete="CASCADE"))
+    notification_type: Mapped[str] = mapped_column(String(50))
+    title: Mapped[str] = mapped_column(String(255))
+    body: Mapped[str] = mapped_column(Text)
+    url: Mapped[str | None] = mapped_column(String(500), nullable=True, default=None)
+    is_read: Mapped[bool] = mapped_column(Boolean, default=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    archived_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
+
+    def __repr__(self) -> str:
+        return f"<NotificationHistoryArchive(id={self.id}, user_id={self.user_id})>"
+
+
+class NotificationCounter(Base):
+    """ユーザーごとの通知数（一覧表示のたびに COUNT しないよう、通知の追加・既読化のたびに更新する）"""
+
+    __tablename__ = "notification_counters"
+
+    user_id: Mapped[UUID] = mapped_column(UUIDType, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    unread_count: Mapped[int] = mapped_column(Integer, default=0)
+    total_count: Mapped[int] = mapped_column(Integer, default=0)
+
+    def __repr__(self) -> str:
+        return f"<NotificationCounter(user_id={self.user_id}, unread={self.unread_count}, total={self.total_count})>"
+
+
+class NotificationOutbox(Base):
+    """Push通知の送信待ちキュー（トリガーとなる更新と同じトランザクションで書き込む）"""
+
+    __tablename__ = "notification_outbox"
+    __table_args__ = (Index("ix_notification_outbox_status_next_attempt_at", "status", "next_attempt_at"),)
+
+    id: Mapped[UUID] = mapped_column(UUIDType, primary_key=True, default=uuid4)
+    user_id: Mapped[UUID] = mapped_column(UUIDType, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    notification_type: Mapped[str] = mapped_column(String(50))
+    context: Mapped[dict] = mapped_column(JSON, default=dict)
+    # pending -> sending -> sent / failed（送信失敗時は pending に戻して next_attempt_at まで待つ）
+    status: Mapped[str] = mapped_column(String(20), default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
+    claimed_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, default=None)
+    # enqueue_notification が同じトランザクションで作る通知履歴
+    notification_id: Mapped[UUID] = mapped_column(UUIDType)
+    delivered_count: Mapped[int] = mapped_column(Integer, default=0)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True, default=None)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, default=None)
+
+    def __repr__(self) -> str:
+        return f"<NotificationOutbox(id={self.id}, user_id={self.user_id}, status={self.status})>"
+
+
+class DeadlineReminder(Base):
+    """締め切りリマインダーの送信記録（同じ課題・ユーザー・タイミングには 1 回だけ送る）"""
+
+    __tablename__ = "deadline_reminders"
+    __table_args__ = (UniqueConstraint("assignment_id", "user_id", "reminder_key", name="uq_deadline_reminder"),)
+
+    id: Mapped[UUID] = mapped_column(UUIDType, primary_key=True, default=uuid4)
+    assignment_id: Mapped[UUID] = mapped_column(UUIDType, ForeignKey("assignments.id", ondelete="CASCADE"))
+    user_id: Mapped[UUID] = mapped_column(UUIDType, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    # 締め切りの何時間前のリマインダーか（例: "24h"）
+    reminder_key: Mapped[str] = mapped_column(String(20))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
+
+    def __repr__(self) -> str:
+        return (
+            f"<DeadlineReminder(assignment_id={self.assignment_id}, user_id={self.user_id}, key={self.reminder_key})>"
+        )
@@ -40,6 +40,9 @@ class ReviewAssignment(Base):
     )
     assigned_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
     submitted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=None)
+    # マッチングで割り当てた枠の有効期限。期限切れの assigned は回収され他のレビュアーに再割り当てされる
+    # TA依頼など期限を設けない割り当ては None
+    lease_expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), default=None, index=True)
 
     submission = relationship("Submission", back_populates="review_assignments")
     reviewer = relationship("User", back_populates="review_assignments")
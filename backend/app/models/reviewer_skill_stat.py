@@ -0,0 +1,37 @@
+from datetime import UTC
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import DateTime
+from sqlalchemy import Float
+from sqlalchemy import ForeignKey
+from sqlalchemy import Integer
+from sqlalchemy.orm import Mapped
+from sqlalchemy.orm import mapped_column
+
+from app.db.base import Base
+from app.db.base import UUIDType
+
+
+class ReviewerSkillStat(Base):
+    """レビュアーごとの軸別一致度（0〜1）の合計と件数
+
+    レビュー提出・教員採点のたびに差分更新し、スキル取得時はこの1行だけを読む。
+    """
+
+    __tablename__ = "reviewer_skill_stats"
+
+    reviewer_id: Mapped[UUID] = mapped_column(UUIDType, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    logic_sum: Mapped[float] = mapped_column(Float, default=0.0, server_default="0")
+    logic_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    specificity_sum: Mapped[float] = mapped_column(Float, default=0.0, server_default="0")
+    specificity_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    structure_sum: Mapped[float] = mapped_column(Float, default=0.0, server_default="0")
+    structure_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    evidence_sum: Mapped[float] = mapped_column(Float, default=0.0, server_default="0")
+    evidence_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(UTC),
+        onupdate=lambda: datetime.now(UTC),
+    )
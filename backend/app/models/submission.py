@@ -7,6 +7,7 @@ from uuid import uuid4
 from sqlalchemy import DateTime
 from sqlalchemy import Enum
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import Integer
 from sqlalchemy import String
 from sqlalchemy import Text
@@ -25,6 +26,7 @@ class SubmissionFileType(str, enum.Enum):
 
 class Submission(Base):
     __tablename__ = "submissions"
+    __table_args__ = (Index("ix_submissions_assignment_assigned_count", "assignment_id", "assigned_count"),)
 
     id: Mapped[UUID] = mapped_column(UUIDType, primary_key=True, default=uuid4)
     assignment_id: Mapped[UUID] = mapped_column(UUIDType, ForeignKey("assignments.id", ondelete="CASCADE"), index=True)
@@ -38,6 +40,11 @@ class Submission(Base):
 
     teacher_total_score: Mapped[int | None] = mapped_column(Integer, default=None)
     teacher_feedback: Mapped[str | None] = mapped_column(Text, default=None)
+
+    # レビュー割り当て数の非正規化カウンタ（マッチング用）
+    # assigned_count は assigned/submitted を合わせた割り当て総数、submitted_count はそのうち提出済みの数
+    assigned_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    submitted_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
 
     assignment = relationship("Assignment", back_populates="submissions")
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Literal
 from uuid import UUID
 
 from pydantic import BaseModel
@@ -50,3 +51,28 @@ class AdminAssignmentUpdate(BaseModel):
     description: str | None = None
     target_reviews_per_submission: int | None = Field(default=None, ge=1, le=3)
     due_at: datetime | None = None
+
+
+class ProfilingArm(BaseModel):
+    target: Literal["request", "function"]
+    count: int = Field(default=1, ge=0, le=100)
+    # target=request: このパスで始まるリクエストだけを対象にする
+    path_prefix: str | None = None
+    # target=function: @profiled で登録した関数名
+    function: str | None = None
+
+
+class ProfileEntry(BaseModel):
+    id: str
+    label: str
+    created_at: datetime
+    size_bytes: int
+
+
+class ProfilingStatus(BaseModel):
+    enabled: bool
+    armed_requests: int
+    path_prefix: str | None
+    armed_functions: dict[str, int]
+    functions: list[str]
+    profiles: list[ProfileEntry]
@@ -5,6 +5,8 @@ from pydantic import BaseModel
 from pydantic import ConfigDict
 from pydantic import Field
 
+from app.schemas.user import ReviewerSkill
+
 
 class CourseCreate(BaseModel):
     title: str = Field(min_length=1, max_length=200)
@@ -33,3 +35,9 @@ class CourseEnrollmentPublic(BaseModel):
     course_id: UUID
     user_id: UUID
     created_at: datetime
+
+
+class CourseStudentReviewerSkill(BaseModel):
+    user_id: UUID
+    name: str
+    reviewer_skill: ReviewerSkill
@@ -59,3 +59,12 @@ class NotificationHistoryListResponse(BaseModel):
     notifications: list[NotificationHistoryResponse]
     unread_count: int
     total_count: int
+    # 次のページを取得するときに cursor に渡す値（最後のページでは None）
+    next_cursor: str | None = None
+
+
+class StreamTokenResponse(BaseModel):
+    """通知ストリーム用トークンのレスポンススキーマ"""
+
+    token: str
+    expires_in: int
@@ -1,43 +1,74 @@
-from uuid import UUID
-
 from fastapi import Depends
 from fastapi import HTTPException
 from fastapi import status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError
-from jose import jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.config import settings
-from app.core.security import ALGORITHM
+from app.core.security import decode_access_token_subject
+from app.db.session import get_async_db
 from app.db.session import get_db
 from app.models.user import User
 from app.models.user import UserRole
+from app.services.user_cache import cache_user
+from app.services.user_cache import cache_user_async
+from app.services.user_cache import get_cached_user
+from app.services.user_cache import get_cached_user_async
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),  # noqa: B008
-    db: Session = Depends(get_db),  # noqa: B008
-) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
-        user_id: str | None = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-        user_uuid = UUID(user_id)
-    except (JWTError, ValueError) as exc:
-        raise credentials_exception from exc
+
+
+def _user_from_token(db: Session, token: str) -> User:
+    user_uuid = decode_access_token_subject(token)
+    if user_uuid is None:
+        raise _credentials_exception()
+
+    user = get_cached_user(db, user_uuid)
+    if user is not None:
+        return user
 
     user = db.query(User).filter(User.id == user_uuid).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    cache_user(user)
+    return user
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),  # noqa: B008
+    db: Session = Depends(get_db),  # noqa: B008
+) -> User:
+    return _user_from_token(db, token)
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),  # noqa: B008
+    db: AsyncSession = Depends(get_async_db),  # noqa: B008
+) -> User:
+    """非同期ルート用。返すユーザーはリクエストの AsyncSession に紐づく
+
+    キャッシュの読み書き（共有バックエンドではネットワーク呼び出し）は run_sync の中では行わない。
+    """
+    user_uuid = decode_access_token_subject(token)
+    if user_uuid is None:
+        raise _credentials_exception()
+
+    user = await get_cached_user_async(db, user_uuid)
+    if user is not None:
+        return user
+
+    user = await db.get(User, user_uuid)
+    if user is None:
+        raise _credentials_exception()
+    await cache_user_async(user)
     return user
 
 
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+from typing import Protocol
+
+from app.core.config import settings
+
+
+class Cache(Protocol):
+    def get(self, key: str) -> Any | None: ...
+
+    def set(self, key: str, value: Any, *, ttl_seconds: float | None = None) -> None: ...
+
+    def delete(self, *keys: str) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class MemoryCache:
+    """プロセス内の TTL 付き LRU キャッシュ（スレッドセーフ）
+
+    値は JSON 互換の dict などをそのまま保持する。共有バックエンドと同じ値を扱えるよう、
+    ORM オブジェクトではなくスナップショットを入れること。
+    """
+
+    def __init__(self, *, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, *, ttl_seconds: float | None = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else float(ttl_seconds)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache:
+    """複数ワーカー間で共有する Redis バックエンド（redis パッケージが必要）"""
+
+    def __init__(self, url: str, *, namespace: str, ttl_seconds: float) -> None:
+        try:
+            import redis  # noqa: PLC0415
+        except ImportError as exc:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from exc
+
+        self._client = redis.Redis.from_url(url)
+        self.namespace = namespace
+        self.ttl_seconds = float(ttl_seconds)
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str) -> Any | None:
+        raw = self._client.get(self._key(key))
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any, *, ttl_seconds: float | None = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else float(ttl_seconds)
+        if ttl <= 0:
+            return
+        self._client.set(self._key(key), json.dumps(value), px=int(ttl * 1000))
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self._client.delete(*(self._key(key) for key in keys))
+
+    def clear(self) -> None:
+        keys = list(self._client.scan_iter(match=self._key("*")))
+        if keys:
+            self._client.delete(*keys)
+
+
+def build_cache(*, namespace: str, max_entries: int, ttl_seconds: float) -> Cache:
+    """設定 (CACHE_BACKEND) に応じてキャッシュを生成する"""
+    backend = settings.cache_backend.lower()
+    if backend == "redis":
+        if not settings.redis_url:
+            raise RuntimeError("REDIS_URL is required for CACHE_BACKEND=redis")
+        return RedisCache(settings.redis_url, namespace=namespace, ttl_seconds=ttl_seconds)
+    if backend != "memory":
+        raise RuntimeError(f"Unsupported CACHE_BACKEND: {settings.cache_backend}")
+    return MemoryCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
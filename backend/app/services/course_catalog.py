@@ -0,0 +1,129 @@
+"""学生向けの講義カタログのキャッシュ
+
+GET /courses（学生・検索/ページングなし）の内容は、is_enrolled を除いて全学生で同じ。
+講師名と受講生数を含むカタログを 1 つだけキャッシュし、応答時にそのユーザーの受講登録を重ねる。
+
+- 講義の作成、受講登録・取り消し、講師名の変更で無効化する（commit 前後の 2 回削除する）
+- 取りこぼした変更（ユーザー削除による講義の削除など）も COURSE_CATALOG_TTL_SECONDS で反映される
+- ETag はカタログ内容のハッシュとそのユーザーの受講登録から作り、変わっていなければ 304 を返す
+- キャッシュは全学生で共有されるため、作り直しはレプリカではなくプライマリから読む
+  （遅れたレプリカの内容を TTL の間配り続けないように）
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from functools import lru_cache
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.models.course import Course
+from app.models.course import CourseEnrollment
+from app.models.user import User
+from app.services.cache import Cache
+from app.services.cache import build_cache
+
+CATALOG_KEY = "catalog"
+_PENDING_INVALIDATION_KEY = "course_catalog_invalidation"
+
+CATALOG_LOOKUPS = registry.counter("course_catalog_lookups_total", "Course catalog cache lookups by result")
+
+
+@lru_cache(maxsize=1)
+def get_course_catalog_cache() -> Cache:
+    return build_cache(
+        namespace="course_catalog",
+        max_entries=1,
+        ttl_seconds=settings.course_catalog_ttl_seconds,
+    )
+
+
+def course_student_count():
+    """講義ごとの受講生数（Course を外側のクエリに持つ相関サブクエリ）"""
+    return (
+        select(func.count(CourseEnrollment.id))
+        .where(CourseEnrollment.course_id == Course.id)
+        .correlate(Course)
+        .scalar_subquery()
+    )
+
+
+def build_course_catalog(db: Session) -> dict[str, Any]:
+    """全講義を新しい順に読み、{"etag": ..., "courses": [...]} を返す（1 クエリ）"""
+    rows = db.execute(
+        select(Course, User.name, course_student_count())
+        .outerjoin(User, User.id == Course.teacher_id)
+        .order_by(Course.created_at.desc(), Course.id.desc())
+    ).all()
+    courses = [
+        {
+            "id": str(course.id),
+            "title": course.title,
+            "description": course.description,
+            "theme": course.theme,
+            "teacher_id": str(course.teacher_id),
+            "created_at": course.created_at.isoformat(),
+            "teacher_name": teacher_name,
+            "student_count": student_count,
+        }
+        for course, teacher_name, student_count in rows
+    ]
+    digest = hashlib.sha256(json.dumps(courses, ensure_ascii=False, sort_keys=True).encode()).hexdigest()
+    return {"etag": digest[:32], "courses": courses}
+
+
+def get_course_catalog(primary_db: Session) -> dict[str, Any]:
+    """キャッシュ済みのカタログを返す（なければプライマリから作ってキャッシュする）"""
+    if settings.course_catalog_ttl_seconds <= 0:
+        return build_course_catalog(primary_db)
+    cache = get_course_catalog_cache()
+    catalog = cache.get(CATALOG_KEY)
+    if catalog is not None:
+        CATALOG_LOOKUPS.inc(result="hit")
+        return catalog
+    CATALOG_LOOKUPS.inc(result="miss")
+    catalog = build_course_catalog(primary_db)
+    cache.set(CATALOG_KEY, catalog)
+    return catalog
+
+
+def enrolled_course_ids(db: Session, user_id: UUID) -> set[str]:
+    return {
+        str(course_id)
+        for course_id in db.scalars(select(CourseEnrollment.course_id).where(CourseEnrollment.user_id == user_id))
+    }
+
+
+def catalog_etag(catalog: dict[str, Any], enrolled_ids: set[str]) -> str:
+    """カタログと受講登録の組に対する ETag（ユーザーごとに異なる）"""
+    enrolled = hashlib.sha256(",".join(sorted(enrolled_ids)).encode()).hexdigest()[:16]
+    return f'W/"{catalog["etag"]}-{enrolled}"'
+
+
+def invalidate_course_catalog(db: Session) -> None:
+    """講義・受講登録・講師名の変更時に呼ぶ
+
+    すぐに削除したうえで、commit 完了時にもう一度削除する（commit 前に古い値が再キャッシュされるのを防ぐ）。
+    """
+    get_course_catalog_cache().delete(CATALOG_KEY)
+    db.info[_PENDING_INVALIDATION_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    if session.info.pop(_PENDING_INVALIDATION_KEY, None):
+        get_course_catalog_cache().delete(CATALOG_KEY)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _invalidate_after_rollback(session: Session, previous_transaction) -> None:
+    if session.info.pop(_PENDING_INVALIDATION_KEY, None):
+        get_course_catalog_cache().delete(CATALOG_KEY)
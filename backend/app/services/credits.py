@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import csv
+import io
+from collections.abc import Iterator
 from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
@@ -10,7 +14,10 @@ from app.models.credit_history import CreditHistory
 from app.models.review import Review
 from app.models.review import ReviewAssignment
 from app.models.user import User
+from app.services.pagination import before_cursor
+from app.services.pagination import encode_cursor
 from app.services.scoring import _rubric_alignment_score
+from app.services.user_cache import invalidate_user_cache
 
 if TYPE_CHECKING:
     from uuid import UUID
@@ -20,6 +27,17 @@ CREDIT_REASON_REVIEW_SUBMITTED = "review_submitted"
 CREDIT_REASON_REVIEW_RECALCULATED = "review_recalculated"
 CREDIT_REASON_ADMIN_ADJUSTMENT = "admin_adjustment"
 
+CREDIT_HISTORY_EXPORT_PAGE_SIZE = 500
+CREDIT_HISTORY_CSV_COLUMNS = (
+    "created_at",
+    "delta",
+    "total_credits",
+    "reason",
+    "review_id",
+    "assignment_id",
+    "submission_id",
+)
+
 
 @dataclass(frozen=True)
 class CreditGainResult:
@@ -65,13 +83,23 @@ def calculate_review_credit_gain(
     review: Review,
     reviewer: User,
 ) -> CreditGainResult:
-    base = max(0.0, float(settings.review_credit_base))
     alignment = _rubric_alignment_score(
         db,
         submission_id=review_assignment.submission_id,
         review_id=review.id,
         assignment_id=review_assignment.assignment_id,
     )
+    return credit_gain_from_alignment(review=review, reviewer=reviewer, alignment=alignment)
+
+
+def credit_gain_from_alignment(
+    *,
+    review: Review,
+    reviewer: User,
+    alignment: float | None,
+) -> CreditGainResult:
+    """ルーブリック一致度が計算済みの場合に、DBアクセスなしでクレジット獲得量を求める"""
+    base = max(0.0, float(settings.review_credit_base))
     comment_alignment = _norm_1_to_5(review.ai_comment_alignment_score)
     rubric_weight = max(0.0, float(getattr(settings, "review_credit_rubric_weight", 0.5)))
     comment_weight = max(0.0, float(getattr(settings, "review_credit_comment_weight", 0.5)))
@@ -126,4 +154,63 @@ def record_credit_history(
         submission_id=submission_id,
     )
     db.add(history)
+    invalidate_user_cache(db, user.id)
     return history
+
+
+def get_credit_history(
+    db: Session,
+    user_id: UUID,
+    *,
+    limit: int,
+    cursor: str | None = None,
+) -> tuple[list[CreditHistory], str | None]:
+    """クレジット履歴を新しい順に 1 ページ分取得し、(履歴, 次ページのカーソル) を返す
+
+    (user_id, created_at, id) の索引を範囲検索するため、ページの深さによらず一定の時間で読める。
+    不正なカーソルには InvalidCursorError を送出する。
+    """
+    stmt = select(CreditHistory).where(CreditHistory.user_id == user_id)
+    if cursor:
+        stmt = stmt.where(before_cursor(CreditHistory.created_at, CreditHistory.id, cursor))
+    # 1 件多く読み、次のページがあるかを判定する
+    rows = list(db.scalars(stmt.order_by(CreditHistory.created_at.desc(), CreditHistory.id.desc()).limit(limit + 1)))
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+def iter_credit_history_csv(
+    db: Session,
+    user_id: UUID,
+    *,
+    page_size: int | None = None,
+) -> Iterator[str]:
+    """クレジット履歴の全件を CSV としてページ単位で書き出す（全件をメモリに載せない）"""
+    page_size = page_size or CREDIT_HISTORY_EXPORT_PAGE_SIZE
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CREDIT_HISTORY_CSV_COLUMNS)
+    cursor: str | None = None
+    while True:
+        rows, cursor = get_credit_history(db, user_id, limit=page_size, cursor=cursor)
+        for row in rows:
+            writer.writerow(
+                [
+                    row.created_at.isoformat(),
+                    row.delta,
+                    row.total_credits,
+                    row.reason,
+                    row.review_id or "",
+                    row.assignment_id or "",
+                    row.submission_id or "",
+                ]
+            )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        # 読み終えたページの ORM オブジェクトを解放する
+        db.expunge_all()
+        if cursor is None:
+            return
@@ -0,0 +1,172 @@
+"""課題の締め切りリマインダー
+
+締め切りまでの残り時間が DEADLINE_REMINDER_HOURS（例: "72,24"）のいずれかを下回った課題について、
+受講者のうちまだ提出していない学生へ ``SUBMISSION_DUE`` を送る。
+
+- 対象は 1 回のクエリで求める（assignments.due_at の範囲検索 + 受講者 + 未提出・未送信の NOT EXISTS）
+- 時間帯は重ならないように区切る（"72,24" なら 72〜24 時間前が "72h"、24 時間前以降が "24h"）
+- 送信記録 deadline_reminders の一意制約で二重送信を防ぐ。記録の INSERT ... ON CONFLICT DO NOTHING と
+  通知履歴の保存を同じコミットで行うため、複数ノードで同時に動かしても 1 人に 1 回だけ届く
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
+from uuid import UUID
+from uuid import uuid4
+
+from sqlalchemy import and_
+from sqlalchemy import case
+from sqlalchemy import exists
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.upsert import dialect_insert
+from app.models.assignment import Assignment
+from app.models.course import CourseEnrollment
+from app.models.notification import DeadlineReminder
+from app.models.submission import Submission
+from app.schemas.notification import NotificationType
+from app.services.notification_service import broadcast_notification
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ReminderCandidate:
+    assignment_id: UUID
+    assignment_title: str
+    due_at: datetime
+    user_id: UUID
+    reminder_key: str
+
+
+@dataclass
+class ReminderRunResult:
+    candidates: int = 0
+    claimed: int = 0
+    sent: int = 0
+
+
+def reminder_windows() -> list[int]:
+    """DEADLINE_REMINDER_HOURS を時間の昇順で返す"""
+    return sorted({int(hours) for hours in settings.deadline_reminder_hours.split(",") if hours.strip()})
+
+
+def find_reminder_candidates(
+    db: Session,
+    *,
+    now: datetime,
+    windows: list[int],
+    limit: int,
+) -> list[ReminderCandidate]:
+    """リマインダー未送信・未提出の (課題, 学生) を締め切りの近い順に最大 limit 件返す"""
+    if not windows:
+        return []
+    reminder_key = case(
+        *((Assignment.due_at <= now + timedelta(hours=hours), f"{hours}h") for hours in windows[:-1]),
+        else_=f"{windows[-1]}h",
+    )
+    not_submitted = ~exists().where(
+        Submission.assignment_id == Assignment.id,
+        Submission.author_id == CourseEnrollment.user_id,
+    )
+    not_reminded = ~exists().where(
+        DeadlineReminder.assignment_id == Assignment.id,
+        DeadlineReminder.user_id == CourseEnrollment.user_id,
+        DeadlineReminder.reminder_key == reminder_key,
+    )
+    rows = db.execute(
+        select(Assignment.id, Assignment.title, Assignment.due_at, CourseEnrollment.user_id, reminder_key)
+        .join(CourseEnrollment, CourseEnrollment.course_id == Assignment.course_id)
+        .where(
+            and_(Assignment.due_at > now, Assignment.due_at <= now + timedelta(hours=windows[-1])),
+            not_submitted,
+            not_reminded,
+        )
+        .order_by(Assignment.due_at, Assignment.id, CourseEnrollment.user_id)
+        .limit(limit)
+    ).all()
+    return [
+        ReminderCandidate(
+            assignment_id=assignment_id,
+            assignment_title=title,
+            due_at=due_at if due_at.tzinfo else due_at.replace(tzinfo=UTC),
+            user_id=user_id,
+            reminder_key=key,
+        )
+        for assignment_id, title, due_at, user_id, key in rows
+    ]
+
+
+def claim_reminders(db: Session, assignment_id: UUID, user_ids: list[UUID], reminder_key: str) -> list[UUID]:
+    """送信記録を追加し、このトランザクションで新たに記録できたユーザーだけを返す（commit は呼び出し側）"""
+    now = datetime.now(UTC)
+    stmt = (
+        dialect_insert(db, DeadlineReminder)
+        .values(
+            [
+                {
+                    "id": uuid4(),
+                    "assignment_id": assignment_id,
+                    "user_id": user_id,
+                    "reminder_key": reminder_key,
+                    "created_at": now,
+                }
+                for user_id in user_ids
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=["assignment_id", "user_id", "reminder_key"])
+        .returning(DeadlineReminder.user_id)
+    )
+    return list(db.scalars(stmt))
+
+
+def send_deadline_reminders(db: Session, *, now: datetime | None = None) -> ReminderRunResult:
+    """1 回分（1 tick）の締め切りリマインダーを送信する"""
+    now = now or datetime.now(UTC)
+    windows = reminder_windows()
+    result = ReminderRunResult()
+    while True:
+        candidates = find_reminder_candidates(db, now=now, windows=windows, limit=settings.reminder_batch_size)
+        result.candidates += len(candidates)
+
+        groups: dict[tuple[UUID, str], list[ReminderCandidate]] = defaultdict(list)
+        for candidate in candidates:
+            groups[(candidate.assignment_id, candidate.reminder_key)].append(candidate)
+
+        for (assignment_id, reminder_key), members in groups.items():
+            claimed = claim_reminders(db, assignment_id, [member.user_id for member in members], reminder_key)
+            if not claimed:
+                # 他のノードが先に送信済み
+                db.rollback()
+                continue
+            first = members[0]
+            days_left = max(1, math.ceil((first.due_at - now) / timedelta(days=1)))
+            # 送信記録は通知履歴と同じコミットで確定する
+            broadcast = broadcast_notification(
+                db,
+                claimed,
+                NotificationType.SUBMISSION_DUE,
+                {
+                    "assignment_id": str(assignment_id),
+                    "assignment_title": first.assignment_title,
+                    "days_left": days_left,
+                },
+            )
+            result.claimed += len(claimed)
+            result.sent += broadcast.sent
+
+        if len(candidates) < settings.reminder_batch_size:
+            break
+
+    if result.claimed:
+        logger.info(f"Deadline reminders: claimed={result.claimed} sent={result.sent}")
+    return result
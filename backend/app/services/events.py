@@ -0,0 +1,191 @@
+"""ユーザー宛てイベントの pub/sub（Server-Sent Events 用）
+
+通知の追加やレビューの到着を、開いているブラウザのタブへすぐに届けるための仕組み。
+``publish`` はどのスレッドからでも呼べ、``subscribe`` はイベントループ上で購読する。
+
+- memory: プロセス内だけで配信する（ワーカー 1 つ・開発環境向け）
+- redis: Redis の PUBLISH / PSUBSCRIBE でワーカー間・別プロセスのジョブから配信する（redis パッケージが必要）
+- auto（既定）: REDIS_URL があれば redis、なければ memory
+
+EVENT_BACKEND で切り替える。memory では、定期ジョブ（締め切りリマインダーなど）のように
+API とは別のプロセスで作られた通知はストリームに載らない（一覧の再取得で反映される）。
+配信は取りこぼしうる（購読していない間のイベントは残らない）ため、クライアントは接続時に一覧を取得し、以降の差分だけをストリームで受け取る。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import logging
+import threading
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+from typing import Protocol
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+EVENT_SUBSCRIBERS = registry.gauge("event_stream_subscribers", "Open event stream subscriptions in this process")
+EVENTS_DROPPED = registry.counter("events_dropped_total", "Events dropped because a subscriber queue was full")
+EVENT_LISTENER_RECONNECTS = registry.counter(
+    "event_listener_reconnects_total", "Times the Redis event listener reconnected after an error"
+)
+
+# Redis の購読が切れたときの再接続間隔（指数バックオフ）
+LISTENER_RETRY_MIN_SECONDS = 0.5
+LISTENER_RETRY_MAX_SECONDS = 30.0
+
+
+def user_channel(user_id: UUID) -> str:
+    return f"user:{user_id}"
+
+
+class EventBroker(Protocol):
+    def publish(self, channel: str, event: dict[str, Any]) -> None: ...
+
+    def subscribe(self, channel: str) -> Any: ...
+
+
+class _Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_queue: int) -> None:
+        self.loop = loop
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=max_queue)
+
+    def deliver(self, event: dict[str, Any]) -> None:
+        # 購読側のイベントループ上で実行される
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            EVENTS_DROPPED.inc()
+
+
+class MemoryBroker:
+    """プロセス内の pub/sub（スレッドセーフ）"""
+
+    def __init__(self, *, max_queue: int) -> None:
+        self.max_queue = max(1, int(max_queue))
+        self._subscriptions: dict[str, set[_Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel: str, event: dict[str, Any]) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # ループが既に閉じている（接続の後始末中）
+                continue
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[asyncio.Queue[dict[str, Any]]]:
+        subscription = _Subscription(asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        EVENT_SUBSCRIBERS.inc()
+        try:
+            yield subscription.queue
+        finally:
+            EVENT_SUBSCRIBERS.dec()
+            with self._lock:
+                subscriptions = self._subscriptions.get(channel)
+                if subscriptions is not None:
+                    subscriptions.discard(subscription)
+                    if not subscriptions:
+                        del self._subscriptions[channel]
+
+    def subscriber_count(self, channel: str) -> int:
+        with self._lock:
+            return len(self._subscriptions.get(channel, ()))
+
+
+class RedisBroker:
+    """Redis 経由でワーカー間に配信する。受信は 1 プロセス 1 本の PSUBSCRIBE をプロセス内に配る"""
+
+    def __init__(self, url: str, *, namespace: str, max_queue: int) -> None:
+        try:
+            import redis  # noqa: PLC0415
+        except ImportError as exc:
+            raise RuntimeError("EVENT_BACKEND=redis requires the 'redis' package") from exc
+
+        self._client = redis.Redis.from_url(url)
+        self.namespace = namespace
+        self._local = MemoryBroker(max_queue=max_queue)
+        self._listener: threading.Thread | None = None
+        self._listener_lock = threading.Lock()
+
+    def publish(self, channel: str, event: dict[str, Any]) -> None:
+        self._client.publish(f"{self.namespace}:{channel}", json.dumps(event, default=str))
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[asyncio.Queue[dict[str, Any]]]:
+        self._ensure_listener()
+        async with self._local.subscribe(channel) as queue:
+            yield queue
+
+    def _ensure_listener(self) -> None:
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name="event-listener", daemon=True)
+                self._listener.start()
+
+    def _listen(self) -> None:
+        # 接続エラーでスレッドを終わらせると、開いているストリームには keepalive しか届かなくなる。
+        # ログを残してバックオフしながら購読し直す（切れていた間のイベントは届かない）
+        delay = LISTENER_RETRY_MIN_SECONDS
+        while True:
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                try:
+                    pubsub.psubscribe(f"{self.namespace}:*")
+                    delay = LISTENER_RETRY_MIN_SECONDS
+                    for message in pubsub.listen():
+                        self._deliver(message)
+                finally:
+                    pubsub.close()
+            except Exception:
+                logger.warning(f"Event listener lost its Redis subscription; retrying in {delay:.1f}s", exc_info=True)
+            EVENT_LISTENER_RECONNECTS.inc()
+            time.sleep(delay)
+            delay = min(delay * 2, LISTENER_RETRY_MAX_SECONDS)
+
+    def _deliver(self, message: dict[str, Any]) -> None:
+        try:
+            channel = message["channel"].decode().removeprefix(f"{self.namespace}:")
+            self._local.publish(channel, json.loads(message["data"]))
+        except (ValueError, AttributeError):
+            logger.warning("Ignoring malformed event message", exc_info=True)
+
+
+@functools.lru_cache(maxsize=1)
+def get_event_broker() -> EventBroker:
+    """設定 (EVENT_BACKEND) に応じてブローカーを生成する"""
+    backend = settings.event_backend.lower()
+    if backend == "auto":
+        backend = "redis" if settings.redis_url else "memory"
+    if backend == "redis":
+        if not settings.redis_url:
+            raise RuntimeError("REDIS_URL is required for EVENT_BACKEND=redis")
+        return RedisBroker(settings.redis_url, namespace="events", max_queue=settings.event_queue_size)
+    if backend != "memory":
+        raise RuntimeError(f"Unsupported EVENT_BACKEND: {settings.event_backend}")
+    return MemoryBroker(max_queue=settings.event_queue_size)
+
+
+def events_are_process_local() -> bool:
+    """イベントがこのプロセス内にしか届かない（別プロセスの購読者に配信されない）か"""
+    return isinstance(get_event_broker(), MemoryBroker)
+
+
+def publish_user_event(user_id: UUID, event_type: str, data: dict[str, Any]) -> None:
+    """ユーザー宛てのイベントを配信する。配信の失敗で本来の処理を失敗させない"""
+    try:
+        get_event_broker().publish(user_channel(user_id), {"type": event_type, "data": data})
+    except Exception:
+        logger.warning(f"Failed to publish {event_type} event for user {user_id}", exc_info=True)
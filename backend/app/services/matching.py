@@ -1,14 +1,153 @@
 from __future__ import annotations
 
+from collections import Counter
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
+from uuid import UUID
+
+from sqlalchemy import case
+from sqlalchemy import delete
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.models.assignment import Assignment
 from app.models.review import ReviewAssignment
 from app.models.review import ReviewAssignmentStatus
 from app.models.submission import Submission
 from app.models.user import User
 
+# 同時リクエストで同じ提出物の枠を取り合った場合に、別の候補を探し直す回数
+_MAX_CLAIM_ATTEMPTS = 3
+# 期限切れリースを一度に回収する最大件数
+LEASE_REAP_BATCH_SIZE = 500
+
+
+def _lease_duration() -> timedelta | None:
+    minutes = int(settings.review_assignment_lease_minutes)
+    if minutes <= 0:
+        return None
+    return timedelta(minutes=minutes)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite はタイムゾーン情報を保持しないため、naive な値は UTC とみなす
+    return value if value.tzinfo is not None else value.replace(tzinfo=UTC)
+
+
+def _renew_lease_if_needed(db: Session, review_assignment: ReviewAssignment, now: datetime) -> None:
+    """レビュアーがタスクを再度開いたときにリースを延長する（残りが半分を切った場合のみ書き込む）"""
+    duration = _lease_duration()
+    if duration is None or review_assignment.lease_expires_at is None:
+        return
+    if _as_utc(review_assignment.lease_expires_at) - now >= duration / 2:
+        return
+    review_assignment.lease_expires_at = now + duration
+    db.commit()
+
+
+def increment_review_counts(db: Session, submission_id: UUID, *, assigned: int = 0, submitted: int = 0) -> None:
+    """Submission のレビューカウンタを同一トランザクション内で加算する"""
+    values = {}
+    if assigned:
+        values[Submission.assigned_count] = Submission.assigned_count + assigned
+    if submitted:
+        values[Submission.submitted_count] = Submission.submitted_count + submitted
+    if not values:
+        return
+    db.query(Submission).filter(Submission.id == submission_id).update(values)
+
+
+def _claim_review_slot(db: Session, submission_id: UUID, target: int) -> bool:
+    """目標レビュー数に達していない場合のみ assigned_count を加算する（条件付き UPDATE）"""
+    updated = (
+        db.query(Submission)
+        .filter(Submission.id == submission_id, Submission.assigned_count < target)
+        .update({Submission.assigned_count: Submission.assigned_count + 1})
+    )
+    return updated > 0
+
+
+def recalculate_review_counts(
+    db: Session,
+    *,
+    assignment_id: UUID | None = None,
+    submission_ids: list[UUID] | None = None,
+) -> int:
+    """ReviewAssignment の実数から Submission のカウンタを再計算する
+
+    カウンタがずれた場合の整合性修復用。修正した Submission の件数を返す（commit は呼び出し側）。
+    """
+    counts_query = db.query(
+        ReviewAssignment.submission_id,
+        func.count(ReviewAssignment.id),
+        func.sum(case((ReviewAssignment.status == ReviewAssignmentStatus.submitted, 1), else_=0)),
+    )
+    submissions_query = db.query(Submission)
+    if assignment_id is not None:
+        counts_query = counts_query.filter(ReviewAssignment.assignment_id == assignment_id)
+        submissions_query = submissions_query.filter(Submission.assignment_id == assignment_id)
+    if submission_ids is not None:
+        if not submission_ids:
+            return 0
+        counts_query = counts_query.filter(ReviewAssignment.submission_id.in_(submission_ids))
+        submissions_query = submissions_query.filter(Submission.id.in_(submission_ids))
+
+    actual = {
+        submission_id: (int(assigned or 0), int(submitted or 0))
+        for submission_id, assigned, submitted in counts_query.group_by(ReviewAssignment.submission_id).all()
+    }
+
+    fixed = 0
+    for submission in submissions_query.all():
+        assigned, submitted = actual.get(submission.id, (0, 0))
+        if submission.assigned_count == assigned and submission.submitted_count == submitted:
+            continue
+        submission.assigned_count = assigned
+        submission.submitted_count = submitted
+        fixed += 1
+    return fixed
+
+
+def reclaim_expired_review_assignments(
+    db: Session,
+    *,
+    assignment_id: UUID | None = None,
+    now: datetime | None = None,
+    limit: int = LEASE_REAP_BATCH_SIZE,
+) -> int:
+    """リース期限切れの未提出割り当てを一括削除し、提出物の枠を解放する
+
+    最大 ``limit`` 件を処理して回収件数を返す（commit は呼び出し側）。
+    """
+    now = now or datetime.now(UTC)
+    query = db.query(ReviewAssignment.id, ReviewAssignment.submission_id).filter(
+        ReviewAssignment.status == ReviewAssignmentStatus.assigned,
+        ReviewAssignment.lease_expires_at.is_not(None),
+        ReviewAssignment.lease_expires_at < now,
+    )
+    if assignment_id is not None:
+        query = query.filter(ReviewAssignment.assignment_id == assignment_id)
+    expired = query.limit(limit).all()
+    if not expired:
+        return 0
+
+    # 実際に削除できた行（同時に提出された割り当ては除く）だけを数え、カウンタを相対的に減らす。
+    # 絶対値で書き戻すと、並行する _claim_review_slot の加算を上書きしてしまう
+    deleted = db.execute(
+        delete(ReviewAssignment)
+        .where(
+            ReviewAssignment.id.in_([row.id for row in expired]),
+            ReviewAssignment.status == ReviewAssignmentStatus.assigned,
+        )
+        .returning(ReviewAssignment.submission_id)
+    ).scalars()
+    released = Counter(deleted)
+    for submission_id, count in released.items():
+        increment_review_counts(db, submission_id, assigned=-count)
+    return sum(released.values())
+
 
 def get_or_assign_review_assignment(db: Session, assignment: Assignment, reviewer: User) -> ReviewAssignment | None:
     open_task = (
@@ -21,47 +160,50 @@ def get_or_assign_review_assignment(db: Session, assignment: Assignment, reviewe
         .order_by(ReviewAssignment.assigned_at.asc())
         .first()
     )
+    now = datetime.now(UTC)
     if open_task is not None:
+        _renew_lease_if_needed(db, open_task, now)
         return open_task
 
-    target = assignment.target_reviews_per_submission
+    # 期限切れのリースは空き枠として扱う
+    if reclaim_expired_review_assignments(db, assignment_id=assignment.id, now=now):
+        db.commit()
 
-    assigned_count_subq = (
-        db.query(
-            ReviewAssignment.submission_id.label("submission_id"),
-            func.count(ReviewAssignment.id).label("assigned_count"),
-        )
-        .filter(
-            ReviewAssignment.assignment_id == assignment.id,
-            ReviewAssignment.status.in_([ReviewAssignmentStatus.assigned, ReviewAssignmentStatus.submitted]),
-        )
-        .group_by(ReviewAssignment.submission_id)
-        .subquery()
-    )
+    target = assignment.target_reviews_per_submission
 
     already_assigned_subq = db.query(ReviewAssignment.submission_id).filter(
         ReviewAssignment.assignment_id == assignment.id,
         ReviewAssignment.reviewer_id == reviewer.id,
     )
 
-    candidate = (
+    # (assignment_id, assigned_count) の複合インデックスで範囲スキャンできるよう、
+    # 集計サブクエリではなく非正規化カウンタで絞り込む
+    candidate_query = (
         db.query(Submission)
         .join(User, User.id == Submission.author_id)
-        .outerjoin(assigned_count_subq, assigned_count_subq.c.submission_id == Submission.id)
         .filter(
             Submission.assignment_id == assignment.id,
+            Submission.assigned_count < target,
             Submission.author_id != reviewer.id,
         )
         .filter(~Submission.id.in_(already_assigned_subq))
-        .filter(func.coalesce(assigned_count_subq.c.assigned_count, 0) < target)
         .order_by(
-            func.coalesce(assigned_count_subq.c.assigned_count, 0).asc(),
+            Submission.assigned_count.asc(),
             User.credits.desc(),
             func.random(),
         )
-        .first()
     )
-    if candidate is None:
+
+    tried: list[UUID] = []
+    for _ in range(_MAX_CLAIM_ATTEMPTS):
+        query = candidate_query.filter(~Submission.id.in_(tried)) if tried else candidate_query
+        candidate = query.first()
+        if candidate is None:
+            return None
+        if _claim_review_slot(db, candidate.id, target):
+            break
+        tried.append(candidate.id)
+    else:
         return None
 
     review_assignment = ReviewAssignment(
@@ -69,7 +211,11 @@ def get_or_assign_review_assignment(db: Session, assignment: Assignment, reviewe
         submission_id=candidate.id,
         reviewer_id=reviewer.id,
         status=ReviewAssignmentStatus.assigned,
+        assigned_at=now,
     )
+    duration = _lease_duration()
+    if duration is not None:
+        review_assignment.lease_expires_at = now + duration
     db.add(review_assignment)
     db.commit()
     db.refresh(review_assignment)
@@ -0,0 +1,276 @@
+"""Push通知のアウトボックス
+
+通知のきっかけになる更新（レビュー提出など）と同じトランザクションで通知履歴と ``notification_outbox`` の
+1 行を書き込み、Push の送信はディスパッチャーが後から行う。ディスパッチャーは API プロセス内のスレッド
+（OutboxDispatcher、OUTBOX_DISPATCH_INTERVAL_SECONDS）か、専用プロセスの scripts/dispatch_notifications.py。
+リクエストの応答時間がプッシュサービスの遅延に左右されず、ワーカーが落ちても通知は失われない。
+
+ディスパッチャーは送信待ちの行をバッチで確保（PostgreSQL では FOR UPDATE SKIP LOCKED）し、
+1 件ごとにリースを延長してから送信し、結果を記録する。リースの延長と結果の記録は
+確保時に書き込んだ claimed_until が一致する場合だけ行うため、リース切れで別のディスパッチャーに
+取り直された行を二重に送信・記録しない。全サブスクリプションへの送信が失敗した場合は
+指数バックオフで再試行し、OUTBOX_MAX_ATTEMPTS 回失敗したら failed にする。
+途中で落ちたディスパッチャーの行は、リース切れ後に別のディスパッチャーが拾い直す。
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
+from uuid import UUID
+from uuid import uuid4
+
+from sqlalchemy import and_
+from sqlalchemy import or_
+from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.models.notification import NotificationHistory
+from app.models.notification import NotificationOutbox
+from app.schemas.notification import NotificationType
+from app.services.notification_content import NotificationContext
+from app.services.notification_content import generate_notification_content
+from app.services.notification_service import bump_notification_counters
+from app.services.notification_service import deliver_to_user
+from app.services.notification_service import publish_notification_after_commit
+from app.services.push_delivery import DeliveryOutcome
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_PENDING = "pending"
+OUTBOX_SENDING = "sending"
+OUTBOX_SENT = "sent"
+OUTBOX_FAILED = "failed"
+
+OUTBOX_PROCESSED = registry.counter("notification_outbox_processed_total", "Notification outbox entries by result")
+
+
+@dataclass(frozen=True)
+class OutboxLease:
+    """確保した行と、そのときに書き込んだリース期限（更新はこの値が一致する場合だけ行う）"""
+
+    entry_id: UUID
+    claimed_until: datetime
+
+
+@dataclass
+class OutboxDispatchResult:
+    claimed: int = 0
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+def enqueue_notification(
+    db: Session,
+    user_id: UUID,
+    notification_type: NotificationType,
+    context: NotificationContext,
+) -> NotificationOutbox:
+    """通知履歴と送信待ちの行を追加する（commit は呼び出し側。トリガーとなる更新と同じトランザクションにする）
+
+    通知履歴はここで作り、commit 後にこのプロセス（API）から通知ストリームへ配信する。
+    ディスパッチャーは Push の送信だけを行うため、別プロセスで動いていてもストリームは遅れない。
+    """
+    now = datetime.now(UTC)
+    title, body, url = generate_notification_content(notification_type, context)
+    notification = NotificationHistory(
+        id=uuid4(),
+        user_id=user_id,
+        notification_type=notification_type.value,
+        title=title,
+        body=body,
+        url=url,
+        is_read=False,
+        created_at=now,
+    )
+    db.add(notification)
+    bump_notification_counters(db, [user_id], unread=1, total=1)
+    entry = NotificationOutbox(
+        user_id=user_id,
+        notification_type=notification_type.value,
+        context=dict(context),
+        status=OUTBOX_PENDING,
+        next_attempt_at=now,
+        notification_id=notification.id,
+    )
+    db.add(entry)
+    publish_notification_after_commit(db, notification)
+    return entry
+
+
+def backoff_seconds(attempts: int) -> float:
+    """attempts 回失敗した後の待ち時間（指数バックオフ、上限あり、±20% のジッター）"""
+    base = settings.outbox_backoff_base_seconds * (2 ** max(0, attempts - 1))
+    delay = min(base, settings.outbox_backoff_max_seconds)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _claimable(now: datetime):
+    return or_(
+        and_(NotificationOutbox.status == OUTBOX_PENDING, NotificationOutbox.next_attempt_at <= now),
+        and_(NotificationOutbox.status == OUTBOX_SENDING, NotificationOutbox.claimed_until < now),
+    )
+
+
+def claim_outbox_batch(db: Session, *, limit: int, now: datetime | None = None) -> list[OutboxLease]:
+    """送信待ち（またはリース切れ）の行を最大 limit 件確保し、そのリースを返す（commit する）"""
+    now = now or datetime.now(UTC)
+    claimed_until = now + timedelta(seconds=settings.outbox_lease_seconds)
+    ids = list(
+        db.scalars(
+            select(NotificationOutbox.id)
+            .where(_claimable(now))
+            .order_by(NotificationOutbox.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+    )
+    claimed: list[UUID] = []
+    if ids:
+        claimed = list(
+            db.scalars(
+                update(NotificationOutbox)
+                .where(NotificationOutbox.id.in_(ids), _claimable(now))
+                .values(status=OUTBOX_SENDING, claimed_until=claimed_until)
+                .returning(NotificationOutbox.id)
+                .execution_options(synchronize_session=False)
+            )
+        )
+    db.commit()
+    return [OutboxLease(entry_id=entry_id, claimed_until=claimed_until) for entry_id in claimed]
+
+
+def _held(entry_id: UUID, claimed_until: datetime):
+    # 自分のリースがまだ有効な（他のディスパッチャーに取り直されていない）行だけに当たる条件
+    return and_(
+        NotificationOutbox.id == entry_id,
+        NotificationOutbox.status == OUTBOX_SENDING,
+        NotificationOutbox.claimed_until == claimed_until,
+    )
+
+
+def _update_if_held(db: Session, lease: OutboxLease, **values) -> bool:
+    result = db.execute(
+        update(NotificationOutbox)
+        .where(_held(lease.entry_id, lease.claimed_until))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount > 0
+
+
+def _renew_lease(db: Session, lease: OutboxLease, now: datetime) -> OutboxLease | None:
+    """送信の直前に 1 件分のリースを延長する（commit する）。既に取り直されていれば None"""
+    renewed = OutboxLease(lease.entry_id, now + timedelta(seconds=settings.outbox_lease_seconds))
+    if not _update_if_held(db, lease, claimed_until=renewed.claimed_until):
+        db.rollback()
+        return None
+    db.commit()
+    return renewed
+
+
+def process_outbox_entry(db: Session, lease: OutboxLease, *, now: datetime | None = None) -> str | None:
+    """確保済みの 1 行を送信して結果を記録し、新しい status を返す
+
+    リースを失っていた（期限切れ後に別のディスパッチャーが取り直した）場合は何もせず None を返す。
+    """
+    lease = _renew_lease(db, lease, now or datetime.now(UTC))
+    if lease is None:
+        return None
+    entry = db.get(NotificationOutbox, lease.entry_id, populate_existing=True)
+    if entry is None:
+        return None
+
+    context = entry.context or {}
+    title, body, url = generate_notification_content(NotificationType(entry.notification_type), context)
+
+    try:
+        outcomes = deliver_to_user(db, entry.user_id, title=title, body=body, url=url, context=context)
+        error = None
+    except Exception as e:
+        logger.error(f"Failed to dispatch notification {lease.entry_id}: {e}", exc_info=True)
+        db.rollback()
+        outcomes = [DeliveryOutcome.failed]
+        error = str(e)
+
+    now = now or datetime.now(UTC)
+    attempts = entry.attempts + 1
+    values: dict = {"attempts": attempts, "claimed_until": None}
+    sent = outcomes.count(DeliveryOutcome.sent)
+    # 1 件でも届いた・全宛先が失効済み・宛先なしの場合は完了扱い（届いた宛先に重複して送らない）
+    if sent or DeliveryOutcome.failed not in outcomes:
+        values.update(status=OUTBOX_SENT, delivered_count=sent, sent_at=now, last_error=None)
+    elif attempts >= settings.outbox_max_attempts:
+        values.update(status=OUTBOX_FAILED, last_error=error or f"all {len(outcomes)} deliveries failed")
+    else:
+        values.update(
+            status=OUTBOX_PENDING,
+            next_attempt_at=now + timedelta(seconds=backoff_seconds(attempts)),
+            last_error=error or f"all {len(outcomes)} deliveries failed",
+        )
+    if not _update_if_held(db, lease, **values):
+        db.rollback()
+        logger.warning(f"Lost the lease on notification {lease.entry_id} while delivering it")
+        return None
+    db.commit()
+    OUTBOX_PROCESSED.inc(status=values["status"])
+    return values["status"]
+
+
+def dispatch_outbox_once(session_factory: Callable[[], Session], *, limit: int | None = None) -> OutboxDispatchResult:
+    """1 バッチ分を確保して送信する"""
+    result = OutboxDispatchResult()
+    with session_factory() as db:
+        leases = claim_outbox_batch(db, limit=limit or settings.outbox_batch_size)
+        result.claimed = len(leases)
+        for lease in leases:
+            status = process_outbox_entry(db, lease)
+            if status == OUTBOX_SENT:
+                result.sent += 1
+            elif status == OUTBOX_PENDING:
+                result.retried += 1
+            elif status == OUTBOX_FAILED:
+                result.failed += 1
+    return result
+
+
+class OutboxDispatcher:
+    """API プロセス内で、送信待ちの行を interval 秒ごとに送信するスレッド
+
+    複数のワーカーで動いても、行の確保とリースで同じ通知を二重に送信しない。
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], *, interval: float) -> None:
+        self.session_factory = session_factory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                # 送信待ちがなくなるまで続け、なくなったら次の間隔まで待つ
+                while not self._stop.is_set() and dispatch_outbox_once(self.session_factory).claimed:
+                    pass
+            except Exception:
+                logger.exception("Notification outbox dispatch failed")
+            self._stop.wait(self.interval)
@@ -0,0 +1,165 @@
+"""通知履歴の保持期間とアーカイブ
+
+notification_history は削除されずに増え続けるため、次のどちらかに当たる行を
+notification_history_archive へ移す（設定値 0 でそのルールを無効にする）。
+
+- 既読で NOTIFICATION_RETENTION_DAYS 日より古い
+- ユーザーごとに新しい順で NOTIFICATION_KEEP_PER_USER 件を超えた分（未読も含む）
+
+あわせて、送信済み・失敗したアウトボックスの行（notification_outbox）のうち作成から
+OUTBOX_RETENTION_DAYS 日を過ぎたものを削除する（通知履歴は別に残っているためアーカイブしない）。
+
+RETENTION_BATCH_SIZE 件ずつ「DELETE ... RETURNING で取り出してアーカイブへ INSERT」し、
+同じコミットで notification_counters を減らす。削除した時点の is_read で数えるため、
+実行中に既読化された行があっても未読数はずれない。保持件数の超過は notification_counters の
+total_count から対象ユーザーを絞り、(user_id, created_at, id) の索引で古い側だけを読む。
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
+from uuid import UUID
+
+from sqlalchemy import delete
+from sqlalchemy import insert
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.notification import NotificationCounter
+from app.models.notification import NotificationHistory
+from app.models.notification import NotificationHistoryArchive
+from app.models.notification import NotificationOutbox
+from app.services.notification_outbox import OUTBOX_FAILED
+from app.services.notification_outbox import OUTBOX_SENT
+from app.services.notification_service import bump_notification_counters
+
+logger = logging.getLogger(__name__)
+
+_ARCHIVED_COLUMNS = ("id", "user_id", "notification_type", "title", "body", "url", "is_read", "created_at")
+
+
+@dataclass
+class RetentionResult:
+    expired: int = 0
+    over_limit: int = 0
+    outbox_purged: int = 0
+
+    @property
+    def archived(self) -> int:
+        return self.expired + self.over_limit
+
+
+def archive_notifications(db: Session, notification_ids: list[UUID], *, now: datetime | None = None) -> int:
+    """指定した通知履歴をアーカイブへ移し、通知数を減らしてコミットする。移した件数を返す"""
+    if not notification_ids:
+        return 0
+    now = now or datetime.now(UTC)
+    rows = db.execute(
+        delete(NotificationHistory)
+        .where(NotificationHistory.id.in_(notification_ids))
+        .returning(*(getattr(NotificationHistory, column) for column in _ARCHIVED_COLUMNS))
+    ).all()
+    if not rows:
+        db.rollback()
+        return 0
+
+    db.execute(insert(NotificationHistoryArchive).values([{**row._asdict(), "archived_at": now} for row in rows]))
+
+    # 減らす数が同じユーザーをまとめて 1 文で更新する
+    totals = Counter(row.user_id for row in rows)
+    unread = Counter(row.user_id for row in rows if not row.is_read)
+    groups: dict[tuple[int, int], list[UUID]] = {}
+    for user_id, total in totals.items():
+        groups.setdefault((unread[user_id], total), []).append(user_id)
+    for (unread_count, total), user_ids in groups.items():
+        bump_notification_counters(db, user_ids, unread=-unread_count, total=-total)
+
+    db.commit()
+    return len(rows)
+
+
+def _archive_expired(db: Session, *, cutoff: datetime, batch_size: int) -> int:
+    archived = 0
+    while True:
+        ids = list(
+            db.scalars(
+                select(NotificationHistory.id)
+                .where(NotificationHistory.is_read.is_(True), NotificationHistory.created_at < cutoff)
+                .limit(batch_size)
+            )
+        )
+        archived += archive_notifications(db, ids)
+        if len(ids) < batch_size:
+            return archived
+
+
+def _archive_over_limit(db: Session, *, keep_per_user: int, batch_size: int) -> int:
+    user_ids = list(
+        db.scalars(select(NotificationCounter.user_id).where(NotificationCounter.total_count > keep_per_user))
+    )
+    archived = 0
+    for user_id in user_ids:
+        while True:
+            ids = list(
+                db.scalars(
+                    select(NotificationHistory.id)
+                    .where(NotificationHistory.user_id == user_id)
+                    .order_by(NotificationHistory.created_at.desc(), NotificationHistory.id.desc())
+                    .offset(keep_per_user)
+                    .limit(batch_size)
+                )
+            )
+            archived += archive_notifications(db, ids)
+            if len(ids) < batch_size:
+                break
+    return archived
+
+
+def _purge_outbox(db: Session, *, cutoff: datetime, batch_size: int) -> int:
+    purged = 0
+    while True:
+        ids = list(
+            db.scalars(
+                select(NotificationOutbox.id)
+                .where(
+                    NotificationOutbox.status.in_((OUTBOX_SENT, OUTBOX_FAILED)),
+                    NotificationOutbox.created_at < cutoff,
+                )
+                .limit(batch_size)
+            )
+        )
+        if ids:
+            db.execute(delete(NotificationOutbox).where(NotificationOutbox.id.in_(ids)))
+            db.commit()
+            purged += len(ids)
+        if len(ids) < batch_size:
+            return purged
+
+
+def compact_notification_history(db: Session, *, now: datetime | None = None) -> RetentionResult:
+    """保持ルールに当たる通知履歴をすべてアーカイブへ移す（1 回分）"""
+    now = now or datetime.now(UTC)
+    batch_size = max(1, settings.retention_batch_size)
+    result = RetentionResult()
+    if settings.notification_retention_days > 0:
+        cutoff = now - timedelta(days=settings.notification_retention_days)
+        result.expired = _archive_expired(db, cutoff=cutoff, batch_size=batch_size)
+    if settings.notification_keep_per_user > 0:
+        result.over_limit = _archive_over_limit(
+            db, keep_per_user=settings.notification_keep_per_user, batch_size=batch_size
+        )
+    if settings.outbox_retention_days > 0:
+        cutoff = now - timedelta(days=settings.outbox_retention_days)
+        result.outbox_purged = _purge_outbox(db, cutoff=cutoff, batch_size=batch_size)
+
+    if result.archived:
+        logger.info(f"Notification history archived: expired={result.expired} over_limit={result.over_limit}")
+    if result.outbox_purged:
+        logger.info(f"Notification outbox rows purged: {result.outbox_purged}")
+    return result
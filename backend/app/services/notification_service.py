@@ -2,24 +2,53 @@
 
 import json
 import logging
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import UTC
+from datetime import datetime
 from uuid import UUID
+from uuid import uuid4
 
-from pywebpush import WebPushException  # type: ignore
-from pywebpush import webpush  # type: ignore
+from sqlalchemy import delete
+from sqlalchemy import event
+from sqlalchemy import insert
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.profiling import profiled
+from app.db.upsert import dialect_insert
+from app.models.course import CourseEnrollment
+from app.models.notification import NotificationCounter
 from app.models.notification import NotificationHistory
 from app.models.notification import PushSubscription
+from app.schemas.notification import NotificationHistoryResponse
 from app.schemas.notification import NotificationType
 from app.schemas.notification import PushSubscriptionCreate
+from app.services.events import publish_user_event
 from app.services.notification_content import generate_notification_content
+from app.services.pagination import before_cursor
+from app.services.push_delivery import DeliveryOutcome
+from app.services.push_delivery import PushTarget
+from app.services.push_delivery import get_push_delivery_pool
 
 logger = logging.getLogger(__name__)
 
 
 type NotificationContext = dict[str, str | int | None]
-type SubscriptionInfo = dict[str, str | bytes | dict[str, str | bytes]]
+
+# 通知履歴の一括 INSERT 1 文あたりの行数（バインド変数の上限に収まるように分割する）
+BROADCAST_INSERT_CHUNK_SIZE = 1000
+_PENDING_PUBLICATIONS_KEY = "pending_notification_publications"
+
+
+@dataclass
+class BroadcastResult:
+    recipients: int = 0
+    subscriptions: int = 0
+    sent: int = 0
+    failed: int = 0
+    removed: int = 0
 
 
 def create_subscription(
@@ -87,6 +116,66 @@ def delete_subscription(db: Session, user_id: UUID, endpoint: str) -> bool:
 # ==================== 通知履歴関連 ====================
 
 
+def bump_notification_counters(db: Session, user_ids: list[UUID], *, unread: int = 0, total: int = 0) -> None:
+    """
+    ユーザーごとの通知数を増減する（行がなければ作成する。commit は呼び出し側）
+
+    通知履歴の追加・既読化と同じトランザクションで呼び、件数と履歴がずれないようにします。
+    """
+    if not user_ids or (unread == 0 and total == 0):
+        return
+    stmt = dialect_insert(db, NotificationCounter).values(
+        [
+            {"user_id": user_id, "unread_count": max(unread, 0), "total_count": max(total, 0)}
+            for user_id in dict.fromkeys(user_ids)
+        ]
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={
+                "unread_count": NotificationCounter.unread_count + unread,
+                "total_count": NotificationCounter.total_count + total,
+            },
+        )
+    )
+
+
+def publish_notification(notification: NotificationHistory | dict) -> None:
+    """開いているタブへ新しい通知を配信する（GET /notifications/stream）"""
+    user_id = notification["user_id"] if isinstance(notification, dict) else notification.user_id
+    payload = NotificationHistoryResponse.model_validate(notification).model_dump(mode="json")
+    publish_user_event(user_id, "notification", payload)
+
+
+def publish_notification_after_commit(db: Session, notification: NotificationHistory) -> None:
+    """トランザクションの commit 後に新しい通知を配信する（ロールバックされたら配信しない）
+
+    配信内容はこの時点で作るため、id と created_at を設定済みの行を渡すこと。
+    """
+    payload = NotificationHistoryResponse.model_validate(notification).model_dump(mode="json")
+    db.info.setdefault(_PENDING_PUBLICATIONS_KEY, []).append((notification.user_id, payload))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session: Session) -> None:
+    for user_id, payload in session.info.pop(_PENDING_PUBLICATIONS_KEY, ()):
+        publish_user_event(user_id, "notification", payload)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING_PUBLICATIONS_KEY, None)
+
+
+def get_notification_counts(db: Session, user_id: UUID) -> tuple[int, int]:
+    """ユーザーの (未読数, 総数) を集計済みの値から取得する"""
+    counter = db.get(NotificationCounter, user_id)
+    if counter is None:
+        return 0, 0
+    return max(counter.unread_count, 0), max(counter.total_count, 0)
+
+
 def create_notification_history(
     db: Session,
     user_id: UUID,
@@ -118,8 +207,10 @@ def create_notification_history(
         is_read=False,
     )
     db.add(notification)
+    bump_notification_counters(db, [user_id], unread=1, total=1)
     db.commit()
     db.refresh(notification)
+    publish_notification(notification)
 
     logger.info(f"Created notification history for user {user_id}: {title}")
     return notification
@@ -129,44 +220,33 @@ def get_notification_history(
     db: Session,
     user_id: UUID,
     limit: int = 50,
-    offset: int = 0,
+    cursor: str | None = None,
 ) -> list[NotificationHistory]:
     """
-    ユーザーの通知履歴を取得する
+    ユーザーの通知履歴を新しい順に取得する
 
     Args:
         db: データベースセッション
         user_id: ユーザーID
         limit: 取得件数
-        offset: オフセット
+        cursor: 前のページの next_cursor（先頭ページは None）
 
     Returns:
         通知履歴のリスト
+
+    Raises:
+        InvalidCursorError: カーソルが不正な場合
     """
+    query = db.query(NotificationHistory).filter(NotificationHistory.user_id == user_id)
+    if cursor:
+        query = query.filter(before_cursor(NotificationHistory.created_at, NotificationHistory.id, cursor))
     return (
-        db.query(NotificationHistory)
-        .filter(NotificationHistory.user_id == user_id)
-        .order_by(NotificationHistory.created_at.desc())  # type: ignore
-        .offset(offset)
+        query.order_by(NotificationHistory.created_at.desc(), NotificationHistory.id.desc())  # type: ignore
         .limit(limit)
         .all()
     )
 
 
-def get_unread_count(db: Session, user_id: UUID) -> int:
-    """ユーザーの未読通知数を取得する"""
-    return (
-        db.query(NotificationHistory)
-        .filter(NotificationHistory.user_id == user_id, NotificationHistory.is_read == False)  # noqa: E712
-        .count()
-    )
-
-
-def get_total_count(db: Session, user_id: UUID) -> int:
-    """ユーザーの通知総数を取得する"""
-    return db.query(NotificationHistory).filter(NotificationHistory.user_id == user_id).count()
-
-
 def mark_as_read(db: Session, notification_id: UUID, user_id: UUID) -> bool:
     """
     通知を既読にする
@@ -179,16 +259,26 @@ def mark_as_read(db: Session, notification_id: UUID, user_id: UUID) -> bool:
     Returns:
         成功した場合True
     """
-    result = (
+    changed = (
         db.query(NotificationHistory)
         .filter(
             NotificationHistory.id == notification_id,
             NotificationHistory.user_id == user_id,
+            NotificationHistory.is_read == False,  # noqa: E712
         )
         .update({"is_read": True})
     )
-    db.commit()
-    return result > 0
+    if changed:
+        bump_notification_counters(db, [user_id], unread=-changed)
+        db.commit()
+        return True
+    # 既読済みの通知も成功扱い（存在しない・他人の通知だけ False）
+    return (
+        db.query(NotificationHistory.id)
+        .filter(NotificationHistory.id == notification_id, NotificationHistory.user_id == user_id)
+        .first()
+        is not None
+    )
 
 
 def mark_all_as_read(db: Session, user_id: UUID) -> int:
@@ -210,6 +300,9 @@ def mark_all_as_read(db: Session, user_id: UUID) -> int:
         )
         .update({"is_read": True})
     )
+    if result:
+        # 0 に上書きせず、実際に既読にした件数だけ減らす（並行して追加された未読を消さない）
+        bump_notification_counters(db, [user_id], unread=-result)
     db.commit()
     return result
 
@@ -245,79 +338,74 @@ def _build_notification_payload(
     )
 
 
-def _build_subscription_info(subscription: PushSubscription) -> SubscriptionInfo:
-    """
-    webpush用のサブスクリプション情報を構築する
+def _push_target(subscription: PushSubscription) -> PushTarget:
+    """webpush 用の送信先情報を構築する（送信スレッドへは ORM オブジェクトを渡さない）"""
+    return PushTarget(
+        subscription_id=subscription.id,
+        endpoint=subscription.endpoint,
+        p256dh_key=subscription.p256dh_key,
+        auth_key=subscription.auth_key,
+    )
 
-    Args:
-        subscription: PushSubscriptionオブジェクト
 
-    Returns:
-        webpush用のサブスクリプション情報辞書
-    """
-    return {
-        "endpoint": subscription.endpoint,
-        "keys": {
-            "p256dh": subscription.p256dh_key,
-            "auth": subscription.auth_key,
-        },
-    }
+def _delete_gone_subscriptions(db: Session, subscription_ids: list[UUID]) -> int:
+    """404 / 410 を返したサブスクリプションを 1 文でまとめて削除する（commit は呼び出し側）"""
+    if not subscription_ids:
+        return 0
+    result = db.execute(delete(PushSubscription).where(PushSubscription.id.in_(subscription_ids)))
+    logger.info(f"Removed {result.rowcount} invalid push subscriptions")
+    return result.rowcount
+
 
+def _gone_subscription_ids(targets: list[PushTarget], outcomes: list[DeliveryOutcome]) -> list[UUID]:
+    return [
+        target.subscription_id
+        for target, outcome in zip(targets, outcomes, strict=True)
+        if outcome == DeliveryOutcome.gone
+    ]
 
-def _send_to_subscription(
+
+def deliver_to_user(
     db: Session,
-    subscription: PushSubscription,
+    user_id: UUID,
+    *,
     title: str,
     body: str,
     url: str | None,
     context: NotificationContext,
-    vapid_claims: dict[str, str | int],
-) -> bool:
+) -> list[DeliveryOutcome]:
     """
-    個別のサブスクリプションにPush通知を送信する
+    ユーザーの全サブスクリプションへPush通知を送信する
 
-    Args:
-        db: データベースセッション
-        subscription: 送信先サブスクリプション
-        title: 通知タイトル
-        body: 通知本文
-        url: 遷移先URL
-        context: コンテキスト情報
-        vapid_claims: VAPID claims
+    専用プールで並列に送信し、失効したサブスクリプションはまとめて削除します。
+    VAPIDキー未設定・宛先なしの場合は空リストを返します。
 
     Returns:
-        送信成功した場合True
+        サブスクリプションごとの送信結果
     """
-    try:
-        payload = _build_notification_payload(title, body, url, context)
-        subscription_info = _build_subscription_info(subscription)
-
-        webpush(
-            subscription_info=subscription_info,
-            data=payload,
-            vapid_private_key=settings.vapid_private_key,
-            vapid_claims=vapid_claims,
-        )
-
-        logger.info(f"Push notification sent to {subscription.endpoint[:50]}...")
-        return True
-
-    except WebPushException as e:
-        logger.error(f"Failed to send push notification: {e}")
-
-        # 410 Gone や 404 Not Found の場合は無効なサブスクリプションとして削除
-        if e.response and e.response.status_code in [404, 410]:
-            logger.info(f"Removing invalid subscription: {subscription.id}")
-            db.delete(subscription)
-            db.commit()
-
-        return False
-
-    except Exception as e:
-        logger.error(f"Unexpected error sending push notification: {e}")
-        return False
+    # VAPIDキーが設定されていない場合はスキップ
+    if not settings.vapid_private_key or not settings.vapid_public_key:
+        logger.warning("VAPID keys not configured, skipping push notification")
+        return []
+
+    subscriptions = db.query(PushSubscription).filter(PushSubscription.user_id == user_id).all()
+    if not subscriptions:
+        logger.info(f"No push subscriptions found for user {user_id}")
+        return []
+
+    vapid_claims: dict[str, str | int] = {"sub": settings.vapid_subject}
+    targets = [_push_target(subscription) for subscription in subscriptions]
+    payload = _build_notification_payload(title, body, url, context)
+    outcomes = get_push_delivery_pool().deliver(targets, payload, vapid_claims)
+    _delete_gone_subscriptions(db, _gone_subscription_ids(targets, outcomes))
+    db.commit()
+    logger.info(
+        f"Sent {outcomes.count(DeliveryOutcome.sent)}/{len(subscriptions)} push notifications to user {user_id}"
+    )
+    return outcomes
 
 
+@profiled("send_push_notification")
 def send_push_notification(
     user_id: UUID,
     notification_type: NotificationType,
@@ -355,29 +443,118 @@ def send_push_notification(
             url=url,
         )
 
-        # VAPIDキーが設定されていない場合はスキップ
-        if not settings.vapid_private_key or not settings.vapid_public_key:
-            logger.warning("VAPID keys not configured, skipping push notification")
-            return 0
+        # 3. 各サブスクリプションに送信
+        outcomes = deliver_to_user(db, user_id, title=title, body=body, url=url, context=context)
+        return outcomes.count(DeliveryOutcome.sent)
 
-        # 3. 宛先取得
-        subscriptions = db.query(PushSubscription).filter(PushSubscription.user_id == user_id).all()
+    finally:
+        db.close()
 
-        if not subscriptions:
-            logger.info(f"No push subscriptions found for user {user_id}")
-            return 0
 
-        # 4. VAPID設定
-        vapid_claims = {"sub": settings.vapid_subject}
+def schedule_push_notification(
+    user_id: UUID,
+    notification_type: NotificationType,
+    context: NotificationContext,
+) -> None:
+    """
+    Push通知の送信を専用プールに積む
 
-        # 5. 各サブスクリプションに送信
-        success_count = 0
-        for subscription in subscriptions:
-            if _send_to_subscription(db, subscription, title, body, url, context, vapid_claims):
-                success_count += 1
+    BackgroundTasksから呼び出しても即座に戻るため、リクエスト用のスレッドプールを占有しません。
+    """
+    get_push_delivery_pool().submit(
+        send_push_notification,
+        user_id=user_id,
+        notification_type=notification_type,
+        context=context,
+    )
 
-        logger.info(f"Sent {success_count}/{len(subscriptions)} push notifications to user {user_id}")
-        return success_count
 
-    finally:
-        db.close()
+def broadcast_notification(
+    db: Session,
+    user_ids: Iterable[UUID],
+    notification_type: NotificationType,
+    context: NotificationContext,
+) -> BroadcastResult:
+    """
+    複数ユーザーに同じ通知をまとめて送信する
+
+    通知履歴は複数行の INSERT でまとめて保存し、宛先のサブスクリプションは 1 クエリで取得して
+    専用プールで並列に送信します。コミットは履歴の保存時と失効したサブスクリプションの削除時の 2 回です。
+
+    Args:
+        db: データベースセッション
+        user_ids: 送信先ユーザーIDの一覧（重複は除く）
+        notification_type: 通知タイプ
+        context: 通知コンテンツ生成に必要なコンテキスト（全員共通）
+
+    Returns:
+        送信結果の集計
+    """
+    recipients = list(dict.fromkeys(user_ids))
+    result = BroadcastResult(recipients=len(recipients))
+    if not recipients:
+        return result
+
+    # 1. コンテンツは全員共通なので 1 回だけ生成
+    title, body, url = generate_notification_content(notification_type, context)
+
+    # 2. 通知履歴を複数行の INSERT で保存
+    now = datetime.now(UTC)
+    rows = [
+        {
+            "id": uuid4(),
+            "user_id": user_id,
+            "notification_type": notification_type.value,
+            "title": title,
+            "body": body,
+            "url": url,
+            "is_read": False,
+            "created_at": now,
+        }
+        for user_id in recipients
+    ]
+    for start in range(0, len(rows), BROADCAST_INSERT_CHUNK_SIZE):
+        db.execute(insert(NotificationHistory).values(rows[start : start + BROADCAST_INSERT_CHUNK_SIZE]))
+        bump_notification_counters(db, recipients[start : start + BROADCAST_INSERT_CHUNK_SIZE], unread=1, total=1)
+    db.commit()
+    for row in rows:
+        publish_notification(row)
+
+    if not settings.vapid_private_key or not settings.vapid_public_key:
+        logger.warning("VAPID keys not configured, skipping push notification")
+        return result
+
+    # 3. 宛先全員のサブスクリプションを 1 クエリで取得
+    targets = [
+        _push_target(subscription)
+        for subscription in db.query(PushSubscription).filter(PushSubscription.user_id.in_(recipients)).all()
+    ]
+    result.subscriptions = len(targets)
+    if not targets:
+        return result
+
+    # 4. 専用プールで並列送信し、失効したサブスクリプションはまとめて削除
+    vapid_claims: dict[str, str | int] = {"sub": settings.vapid_subject}
+    payload = _build_notification_payload(title, body, url, context)
+    outcomes = get_push_delivery_pool().deliver(targets, payload, vapid_claims)
+    result.removed = _delete_gone_subscriptions(db, _gone_subscription_ids(targets, outcomes))
+    db.commit()
+
+    result.sent = outcomes.count(DeliveryOutcome.sent)
+    result.failed = outcomes.count(DeliveryOutcome.failed)
+    logger.info(
+        f"Broadcast {notification_type.value} to {result.recipients} users:"
+        f" sent={result.sent} failed={result.failed} removed={result.removed}"
+    )
+    return result
+
+
+def broadcast_to_course(
+    db: Session,
+    course_id: UUID,
+    notification_type: NotificationType,
+    context: NotificationContext,
+) -> BroadcastResult:
+    """授業の受講者全員に同じ通知をまとめて送信する"""
+    user_ids = db.scalars(select(CourseEnrollment.user_id).where(CourseEnrollment.course_id == course_id)).all()
+    return broadcast_notification(db, user_ids, notification_type, context)
@@ -0,0 +1,47 @@
+"""キーセット（シーク）ページング
+
+``(created_at, id)`` の降順で並べた一覧を、OFFSET ではなく「前のページの最後の行より後ろ」という
+条件で読む。ページが深くなっても読み飛ばす行がなく、インデックスの範囲検索 1 回で済む。
+カーソルは最後の行の ``created_at`` と ``id`` を URL セーフな文字列にしたもの。
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+from datetime import UTC
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import and_
+from sqlalchemy import or_
+from sqlalchemy.sql import ColumnElement
+
+# 一覧のレスポンスがリストのままのエンドポイントでは、次ページのカーソルをこのヘッダーで返す
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=UTC)
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursorError("Invalid cursor") from e
+
+
+def before_cursor(created_at_column, id_column, cursor: str) -> ColumnElement[bool]:
+    """降順の一覧で、カーソルの行より後ろ（古い側）の行を選ぶ条件"""
+    created_at, row_id = decode_cursor(cursor)
+    return or_(created_at_column < created_at, and_(created_at_column == created_at, id_column < row_id))
@@ -5,6 +5,8 @@ from pathlib import Path
 import pdfplumber
 from pdfminer.pdfparser import PDFSyntaxError
 
+from app.core.profiling import profiled
+
 
 class PDFExtractionService:
     """PDFからテキストを抽出するサービス"""
@@ -62,6 +64,7 @@ class PDFExtractionService:
         return p
 
     @staticmethod
+    @profiled("PDFExtractionService.extract_text")
     def extract_text(
         pdf_path: str | Path,
         *,
@@ -0,0 +1,131 @@
+"""Web Push の送信専用スレッドプール
+
+pywebpush.webpush はブロッキングな HTTP 呼び出しのため、リクエスト処理と同じスレッドプール
+（Starlette の BackgroundTasks / run_in_threadpool）で動かすと、遅いプッシュサービスが
+API のワーカーを占有してしまう。ここでは次の 2 つの専用プールを持つ。
+
+- dispatcher: 通知 1 件分の処理（履歴保存・宛先取得・結果の反映）を順に実行する
+- delivery: サブスクリプションごとの送信を PUSH_DELIVERY_WORKERS 並列で実行する
+
+送信は PUSH_TIMEOUT_SECONDS でタイムアウトする。DB セッションはワーカースレッドに渡さない。
+"""
+
+from __future__ import annotations
+
+import enum
+import functools
+import logging
+from collections.abc import Callable
+from collections.abc import Sequence
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+PUSH_DELIVERIES = registry.counter("push_deliveries_total", "Web Push deliveries by outcome")
+
+# プッシュサービスが購読の失効を示すステータス
+GONE_STATUS_CODES = frozenset({404, 410})
+
+
+class DeliveryOutcome(enum.StrEnum):
+    sent = "sent"
+    gone = "gone"
+    failed = "failed"
+
+
+@dataclass(frozen=True)
+class PushTarget:
+    """送信先（ワーカースレッドには ORM オブジェクトではなくこの値を渡す）"""
+
+    subscription_id: UUID
+    endpoint: str
+    p256dh_key: str
+    auth_key: str
+
+    def subscription_info(self) -> dict[str, str | dict[str, str]]:
+        return {"endpoint": self.endpoint, "keys": {"p256dh": self.p256dh_key, "auth": self.auth_key}}
+
+
+def deliver_one(target: PushTarget, payload: str, vapid_claims: dict[str, str | int]) -> DeliveryOutcome:
+    """1 件のサブスクリプションに送信する（delivery プールのスレッドで実行）"""
+    # pywebpush (cryptography / requests) の読み込みは重いため、初回送信時まで遅らせて起動を速くする
+    from pywebpush import WebPushException  # type: ignore # noqa: PLC0415
+    from pywebpush import webpush  # type: ignore # noqa: PLC0415
+
+    try:
+        webpush(
+            subscription_info=target.subscription_info(),
+            data=payload,
+            vapid_private_key=settings.vapid_private_key,
+            vapid_claims=dict(vapid_claims),
+            timeout=settings.push_timeout_seconds,
+        )
+    except WebPushException as e:
+        status_code = e.response.status_code if e.response is not None else None
+        if status_code in GONE_STATUS_CODES:
+            logger.info(f"Push subscription is gone ({status_code}): {target.subscription_id}")
+            return DeliveryOutcome.gone
+        logger.error(f"Failed to send push notification: {e}")
+        return DeliveryOutcome.failed
+    except Exception as e:
+        # requests のタイムアウトや接続エラーもここに来る
+        logger.error(f"Unexpected error sending push notification to {target.endpoint[:50]}...: {e}")
+        return DeliveryOutcome.failed
+
+    logger.info(f"Push notification sent to {target.endpoint[:50]}...")
+    return DeliveryOutcome.sent
+
+
+class PushDeliveryPool:
+    def __init__(self, *, workers: int) -> None:
+        self.workers = max(1, workers)
+        self._dispatcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="push-dispatch")
+        self._delivery = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="push-delivery")
+
+    def submit(self, func: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        """通知 1 件分の処理を dispatcher に積む（呼び出し元は待たない）"""
+        future = self._dispatcher.submit(func, *args, **kwargs)
+        future.add_done_callback(_log_failure)
+        return future
+
+    def deliver(
+        self,
+        targets: Sequence[PushTarget],
+        payload: str,
+        vapid_claims: dict[str, str | int],
+    ) -> list[DeliveryOutcome]:
+        """全サブスクリプションへ並列に送信し、targets と同じ順で結果を返す"""
+        futures = [self._delivery.submit(deliver_one, target, payload, vapid_claims) for target in targets]
+        outcomes = [future.result() for future in futures]
+        for outcome in outcomes:
+            PUSH_DELIVERIES.inc(outcome=outcome.value)
+        return outcomes
+
+    def shutdown(self) -> None:
+        # 送信は PUSH_TIMEOUT_SECONDS で打ち切られるため、積まれた分を送り切ってから止める
+        self._dispatcher.shutdown(wait=True)
+        self._delivery.shutdown(wait=True)
+
+
+def _log_failure(future: Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Push notification job failed", exc_info=future.exception())
+
+
+@functools.lru_cache(maxsize=1)
+def get_push_delivery_pool() -> PushDeliveryPool:
+    return PushDeliveryPool(workers=settings.push_delivery_workers)
+
+
+def shutdown_push_delivery_pool() -> None:
+    """アプリ終了時に呼ぶ（一度も使われていなければ何もしない）"""
+    if get_push_delivery_pool.cache_info().currsize:
+        get_push_delivery_pool().shutdown()
+        get_push_delivery_pool.cache_clear()
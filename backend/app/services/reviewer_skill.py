@@ -1,20 +1,35 @@
 from __future__ import annotations
 
-from collections import defaultdict
+from collections.abc import Callable
 from uuid import UUID
 
+from sqlalchemy import Float
+from sqlalchemy import and_
+from sqlalchemy import case
+from sqlalchemy import cast
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy import update
+from sqlalchemy.orm import Query
 from sqlalchemy.orm import Session
 
 from app.core.config import REVIEWER_SKILL_TEMPLATE
+from app.db.upsert import dialect_insert
+from app.models.assignment import Assignment
 from app.models.assignment import RubricCriterion
 from app.models.review import Review
 from app.models.review import ReviewAssignment
 from app.models.review import ReviewRubricScore
+from app.models.reviewer_skill_stat import ReviewerSkillStat
 from app.models.submission import SubmissionRubricScore
 from app.models.user import User
 from app.schemas.user import ReviewerSkill
 from app.services.rubric import normalize_rubric_name
 
+SKILL_AXIS_KEYS = [item["key"] for item in REVIEWER_SKILL_TEMPLATE]
+# 差分更新と再計算の合計値を比較する際の許容誤差
+_SUM_TOLERANCE = 1e-6
+
 
 def _avg(values: list[float]) -> float | None:
     if not values:
@@ -22,13 +37,6 @@ def _avg(values: list[float]) -> float | None:
     return sum(values) / len(values)
 
 
-def _alignment_norm(review_score: int, teacher_score: int, max_score: int) -> float | None:
-    if max_score <= 0:
-        return None
-    diff = abs(float(review_score) - float(teacher_score))
-    return max(0.0, min(1.0, 1.0 - (diff / float(max_score))))
-
-
 def _norm_to_1_5(norm: float | None) -> float:
     if norm is None:
         return 0.0
@@ -78,95 +86,281 @@ def _apply_override(skill: ReviewerSkill, user: User | None) -> ReviewerSkill:
     )
 
 
+def _skill_from_axis_norms(
+    axis_sums: dict[str, float],
+    axis_counts: dict[str, int],
+) -> ReviewerSkill:
+    axis_scores: dict[str, float] = {}
+    for item in REVIEWER_SKILL_TEMPLATE:
+        key = item["key"]
+        count = axis_counts.get(key, 0)
+        axis_scores[key] = _norm_to_1_5(axis_sums.get(key, 0.0) / count if count else None)
+
+    overall_values = [score for score in axis_scores.values() if score > 0]
+    overall = _avg(overall_values) or 0.0
+
+    return ReviewerSkill(
+        logic=axis_scores.get("logic", 0.0),
+        specificity=axis_scores.get("specificity", 0.0),
+        structure=axis_scores.get("structure", 0.0),
+        evidence=axis_scores.get("evidence", 0.0),
+        overall=overall,
+    )
+
+
+AxisTotals = tuple[dict[str, float], dict[str, int]]
+
+
+def _axis_norm_totals(db: Session, scope: Callable[[Query], Query]) -> dict[UUID, AxisTotals]:
+    """一致度（1 - |レビュー点 - 教員点| / 満点）を DB 側で (レビュアー, 基準名) ごとに合計・件数へ集計する
+
+    ``scope`` で ReviewAssignment / Review を起点にした絞り込みを追加する。
+    """
+    diff = cast(func.abs(ReviewRubricScore.score - SubmissionRubricScore.score), Float) / cast(
+        RubricCriterion.max_score, Float
+    )
+    norm = case((diff >= 1.0, 0.0), else_=1.0 - diff)
+    query = (
+        db.query(
+            ReviewAssignment.reviewer_id,
+            RubricCriterion.name,
+            func.sum(norm),
+            func.count(ReviewRubricScore.id),
+        )
+        .join(Review, Review.review_assignment_id == ReviewAssignment.id)
+        .join(ReviewRubricScore, ReviewRubricScore.review_id == Review.id)
+        .join(
+            SubmissionRubricScore,
+            and_(
+                SubmissionRubricScore.submission_id == ReviewAssignment.submission_id,
+                SubmissionRubricScore.criterion_id == ReviewRubricScore.criterion_id,
+            ),
+        )
+        .join(RubricCriterion, RubricCriterion.id == ReviewRubricScore.criterion_id)
+        .filter(RubricCriterion.max_score > 0)
+    )
+    query = scope(query).group_by(ReviewAssignment.reviewer_id, RubricCriterion.name)
+
+    template_by_norm = {normalize_rubric_name(item["name"]): item["key"] for item in REVIEWER_SKILL_TEMPLATE}
+    totals: dict[UUID, AxisTotals] = {}
+    for reviewer_id, criterion_name, norm_sum, norm_count in query.all():
+        axis_key = template_by_norm.get(normalize_rubric_name(criterion_name))
+        if axis_key is None:
+            continue
+        sums, counts = totals.setdefault(reviewer_id, ({}, {}))
+        sums[axis_key] = sums.get(axis_key, 0.0) + float(norm_sum or 0.0)
+        counts[axis_key] = counts.get(axis_key, 0) + int(norm_count or 0)
+    return totals
+
+
+def calculate_reviewer_skills(
+    db: Session,
+    *,
+    course_id: UUID | None = None,
+    assignment_id: UUID | None = None,
+    reviewer_ids: list[UUID] | None = None,
+) -> dict[UUID, ReviewerSkill]:
+    """複数レビュアーの ReviewerSkill をまとめて計算する
+
+    ``reviewer_ids`` を指定した場合はそのレビュアーのみ、省略した場合はスコープ（授業・課題）内で
+    レビューを割り当てられた全レビュアーが対象。レビュアー数によらず固定回数のクエリで済む。
+    """
+
+    def _scoped(query: Query) -> Query:
+        if assignment_id is not None:
+            query = query.filter(ReviewAssignment.assignment_id == assignment_id)
+        if course_id is not None:
+            query = query.join(Assignment, Assignment.id == ReviewAssignment.assignment_id).filter(
+                Assignment.course_id == course_id
+            )
+        return query
+
+    if reviewer_ids is not None:
+        target_ids = set(reviewer_ids)
+    else:
+        target_ids = {
+            reviewer_id for (reviewer_id,) in _scoped(db.query(ReviewAssignment.reviewer_id).distinct()).all()
+        }
+    if not target_ids:
+        return {}
+
+    totals = _axis_norm_totals(
+        db,
+        lambda query: _scoped(query.filter(ReviewAssignment.reviewer_id.in_(list(target_ids)))),
+    )
+    users = {user.id: user for user in db.query(User).filter(User.id.in_(list(target_ids))).all()}
+    return {
+        reviewer_id: _apply_override(
+            _skill_from_axis_norms(*totals.get(reviewer_id, ({}, {}))),
+            users.get(reviewer_id),
+        )
+        for reviewer_id in target_ids
+    }
+
+
 def calculate_reviewer_skill(
     db: Session,
     *,
     reviewer_id: UUID,
     assignment_id: UUID | None = None,
 ) -> ReviewerSkill:
-    user = db.query(User).filter(User.id == reviewer_id).first()
-    axes = REVIEWER_SKILL_TEMPLATE
-    axis_keys = [axis["key"] for axis in axes]
-    axis_norms: dict[str, list[float]] = {key: [] for key in axis_keys}
+    return calculate_reviewer_skills(db, reviewer_ids=[reviewer_id], assignment_id=assignment_id)[reviewer_id]
+
+
+def _stat_totals(stat: ReviewerSkillStat) -> AxisTotals:
+    sums = {key: float(getattr(stat, f"{key}_sum") or 0.0) for key in SKILL_AXIS_KEYS}
+    counts = {key: int(getattr(stat, f"{key}_count") or 0) for key in SKILL_AXIS_KEYS}
+    return sums, counts
+
+
+def _normalize_totals(totals: AxisTotals) -> AxisTotals:
+    sums: dict[str, float] = {}
+    counts: dict[str, int] = {}
+    for key in SKILL_AXIS_KEYS:
+        count = max(0, int(totals[1].get(key, 0)))
+        # 差分更新で生じる浮動小数点の誤差を丸め、件数0なら合計も0に戻す
+        sums[key] = max(0.0, float(totals[0].get(key, 0.0))) if count else 0.0
+        counts[key] = count
+    return sums, counts
 
-    query = (
-        db.query(ReviewAssignment, Review)
-        .join(Review, Review.review_assignment_id == ReviewAssignment.id)
-        .filter(ReviewAssignment.reviewer_id == reviewer_id)
-    )
-    if assignment_id is not None:
-        query = query.filter(ReviewAssignment.assignment_id == assignment_id)
-
-    rows = query.all()
-    if not rows:
-        base_skill = ReviewerSkill(
-            logic=0.0,
-            specificity=0.0,
-            structure=0.0,
-            evidence=0.0,
-            overall=0.0,
-        )
-        return _apply_override(base_skill, user)
 
-    review_ids = [review.id for _, review in rows]
-    submission_ids = [ra.submission_id for ra, _ in rows]
-    assignment_ids = {ra.assignment_id for ra, _ in rows}
+def _set_stat_totals(stat: ReviewerSkillStat, totals: AxisTotals) -> None:
+    sums, counts = _normalize_totals(totals)
+    for key in SKILL_AXIS_KEYS:
+        setattr(stat, f"{key}_sum", sums[key])
+        setattr(stat, f"{key}_count", counts[key])
 
-    review_scores = db.query(ReviewRubricScore).filter(ReviewRubricScore.review_id.in_(review_ids)).all()
-    teacher_scores = (
-        db.query(SubmissionRubricScore).filter(SubmissionRubricScore.submission_id.in_(submission_ids)).all()
+
+def reviewer_skill_contributions(
+    db: Session,
+    *,
+    review_id: UUID | None = None,
+    submission_id: UUID | None = None,
+) -> dict[UUID, AxisTotals]:
+    """特定のレビュー、または提出物に付いた全レビューの一致度の寄与をレビュアーごとに返す"""
+
+    def _scope(query: Query) -> Query:
+        if review_id is not None:
+            query = query.filter(Review.id == review_id)
+        if submission_id is not None:
+            query = query.filter(ReviewAssignment.submission_id == submission_id)
+        return query
+
+    return _axis_norm_totals(db, _scope)
+
+
+def _stat_row(reviewer_id: UUID, totals: AxisTotals) -> dict:
+    sums, counts = _normalize_totals(totals)
+    row: dict = {"reviewer_id": reviewer_id}
+    for key in SKILL_AXIS_KEYS:
+        row[f"{key}_sum"] = sums[key]
+        row[f"{key}_count"] = counts[key]
+    return row
+
+
+def _insert_missing_stats(db: Session, reviewer_ids: list[UUID]) -> set[UUID]:
+    """集計行の無いレビュアーの行をその時点の DB から作り、このトランザクションで作成できた ID を返す
+
+    同時に別のリクエストが作成した場合は ON CONFLICT DO NOTHING で何もしない（主キー違反にしない）。
+    """
+    existing = set(
+        db.scalars(select(ReviewerSkillStat.reviewer_id).where(ReviewerSkillStat.reviewer_id.in_(reviewer_ids)))
+    )
+    missing = [reviewer_id for reviewer_id in reviewer_ids if reviewer_id not in existing]
+    if not missing:
+        return set()
+    rebuilt = _axis_norm_totals(db, lambda query: query.filter(ReviewAssignment.reviewer_id.in_(missing)))
+    stmt = (
+        dialect_insert(db, ReviewerSkillStat)
+        .values([_stat_row(reviewer_id, rebuilt.get(reviewer_id, ({}, {}))) for reviewer_id in missing])
+        .on_conflict_do_nothing(index_elements=["reviewer_id"])
+        .returning(ReviewerSkillStat.reviewer_id)
     )
-    criteria = db.query(RubricCriterion).filter(RubricCriterion.assignment_id.in_(list(assignment_ids))).all()
+    return set(db.scalars(stmt))
 
-    review_by_review_id: dict[UUID, dict[UUID, int]] = defaultdict(dict)
-    for score in review_scores:
-        review_by_review_id[score.review_id][score.criterion_id] = score.score
 
-    teacher_by_submission_id: dict[UUID, dict[UUID, int]] = defaultdict(dict)
-    for score in teacher_scores:
-        teacher_by_submission_id[score.submission_id][score.criterion_id] = score.score
+def apply_reviewer_skill_contributions(
+    db: Session,
+    contributions: dict[UUID, AxisTotals],
+    *,
+    sign: int = 1,
+) -> None:
+    """ReviewerSkillStat に寄与を加算（sign=1）または減算（sign=-1）する（commit は呼び出し側）
 
-    template_by_norm = {normalize_rubric_name(item["name"]): item["key"] for item in REVIEWER_SKILL_TEMPLATE}
-    criterion_axis: dict[UUID, str] = {}
-    criterion_max: dict[UUID, int] = {}
-    for criterion in criteria:
-        axis_key = template_by_norm.get(normalize_rubric_name(criterion.name))
-        if axis_key is None:
-            continue
-        criterion_axis[criterion.id] = axis_key
-        criterion_max[criterion.id] = criterion.max_score
+    加算は変更を flush した後、減算は変更を加える前に呼ぶこと。集計行がまだ無いレビュアーは
+    その時点の DB から作り直すため、加算時は作り直した値に既に寄与が含まれている。
+    更新は ``x_sum = x_sum + :delta`` の UPDATE で行い、同じレビュアーへの同時更新を失わない。
+    """
+    if not contributions:
+        return
+    created = _insert_missing_stats(db, list(contributions))
 
-    for ra, review in rows:
-        review_scores_map = review_by_review_id.get(review.id, {})
-        teacher_scores_map = teacher_by_submission_id.get(ra.submission_id, {})
-        if not review_scores_map or not teacher_scores_map:
+    for reviewer_id, (delta_sums, delta_counts) in contributions.items():
+        if sign > 0 and reviewer_id in created:
             continue
+        values = {}
+        for key in SKILL_AXIS_KEYS:
+            sum_column = getattr(ReviewerSkillStat, f"{key}_sum")
+            count_column = getattr(ReviewerSkillStat, f"{key}_count")
+            if delta_counts.get(key, 0):
+                values[count_column] = count_column + sign * delta_counts[key]
+            if delta_sums.get(key, 0.0):
+                values[sum_column] = sum_column + sign * delta_sums[key]
+        if values:
+            db.execute(
+                update(ReviewerSkillStat)
+                .where(ReviewerSkillStat.reviewer_id == reviewer_id)
+                .values(values)
+                .execution_options(synchronize_session=False)
+            )
 
-        for criterion_id, teacher_score in teacher_scores_map.items():
-            review_score = review_scores_map.get(criterion_id)
-            if review_score is None:
-                continue
-            axis_key = criterion_axis.get(criterion_id)
-            if axis_key is None:
-                continue
-            max_score = criterion_max.get(criterion_id, 0)
-            norm = _alignment_norm(review_score, teacher_score, max_score)
-            if norm is None:
-                continue
-            axis_norms[axis_key].append(norm)
 
-    axis_scores: dict[str, float] = {}
-    for key in axis_keys:
-        axis_scores[key] = _norm_to_1_5(_avg(axis_norms[key]))
+def get_reviewer_skill_from_stats(db: Session, user: User) -> ReviewerSkill:
+    """集計済みの ReviewerSkillStat 1行からスキルを返す（書き込みはしない）
 
-    overall_values = [score for score in axis_scores.values() if score > 0]
-    overall = _avg(overall_values) or 0.0
+    行がまだ無い（レビュー・採点の差分更新が一度も起きていない）場合は、その場で集計する。
+    """
+    stat = db.get(ReviewerSkillStat, user.id, populate_existing=True)
+    if stat is None:
+        totals = _axis_norm_totals(db, lambda query: query.filter(ReviewAssignment.reviewer_id == user.id))
+        return _apply_override(_skill_from_axis_norms(*_normalize_totals(totals.get(user.id, ({}, {})))), user)
+    return _apply_override(_skill_from_axis_norms(*_normalize_totals(_stat_totals(stat))), user)
 
-    base_skill = ReviewerSkill(
-        logic=axis_scores.get("logic", 0.0),
-        specificity=axis_scores.get("specificity", 0.0),
-        structure=axis_scores.get("structure", 0.0),
-        evidence=axis_scores.get("evidence", 0.0),
-        overall=overall,
-    )
-    return _apply_override(base_skill, user)
+
+def rebuild_reviewer_skill_stats(db: Session, *, reviewer_ids: list[UUID] | None = None) -> int:
+    """ReviewerSkillStat を全レビューから再計算する
+
+    差分更新の検証・修復用。値が変わった（または新規作成した）行数を返す（commit は呼び出し側）。
+    """
+    if reviewer_ids is not None and not reviewer_ids:
+        return 0
+
+    def _scope(query: Query) -> Query:
+        if reviewer_ids is not None:
+            query = query.filter(ReviewAssignment.reviewer_id.in_(reviewer_ids))
+        return query
+
+    totals = _axis_norm_totals(db, _scope)
+    stats_query = db.query(ReviewerSkillStat)
+    if reviewer_ids is not None:
+        stats_query = stats_query.filter(ReviewerSkillStat.reviewer_id.in_(reviewer_ids))
+    stats = {stat.reviewer_id: stat for stat in stats_query.all()}
+
+    fixed = 0
+    for reviewer_id in set(totals) | set(stats):
+        stat = stats.get(reviewer_id)
+        if stat is None:
+            stat = ReviewerSkillStat(reviewer_id=reviewer_id)
+            db.add(stat)
+            _set_stat_totals(stat, totals[reviewer_id])
+            fixed += 1
+            continue
+        current_sums, current_counts = _stat_totals(stat)
+        expected_sums, expected_counts = _normalize_totals(totals.get(reviewer_id, ({}, {})))
+        if current_counts == expected_counts and all(
+            abs(current_sums[key] - expected_sums[key]) < _SUM_TOLERANCE for key in SKILL_AXIS_KEYS
+        ):
+            continue
+        _set_stat_totals(stat, (expected_sums, expected_counts))
+        fixed += 1
+    return fixed
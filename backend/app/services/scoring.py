@@ -4,6 +4,7 @@ from uuid import UUID
 
 from sqlalchemy.orm import Session
 
+from app.core.profiling import profiled
 from app.models.assignment import Assignment
 from app.models.assignment import RubricCriterion
 from app.models.review import MetaReview
@@ -57,9 +58,22 @@ def _rubric_alignment_score(db: Session, *, submission_id: UUID, review_id: UUID
         return None
 
     criteria = db.query(RubricCriterion).filter(RubricCriterion.assignment_id == assignment_id).all()
-    max_by_criterion = {c.id: c.max_score for c in criteria}
-    teacher_by_criterion = {s.criterion_id: s.score for s in teacher_scores}
-    review_by_criterion = {s.criterion_id: s.score for s in review_scores}
+    return rubric_alignment_from_scores(
+        teacher_by_criterion={s.criterion_id: s.score for s in teacher_scores},
+        review_by_criterion={s.criterion_id: s.score for s in review_scores},
+        max_by_criterion={c.id: c.max_score for c in criteria},
+    )
+
+
+def rubric_alignment_from_scores(
+    *,
+    teacher_by_criterion: dict[UUID, int],
+    review_by_criterion: dict[UUID, int],
+    max_by_criterion: dict[UUID, int],
+) -> float | None:
+    """読み込み済みのスコアから教員とレビュアーのルーブリック一致度 (0.0-1.0) を計算する"""
+    if not teacher_by_criterion or not review_by_criterion:
+        return None
 
     diffs: list[float] = []
     max_diffs: list[float] = []
@@ -93,6 +107,7 @@ def _norm_1_to_5(score: int | None) -> float | None:
     return float(score) / 5.0
 
 
+@profiled("calculate_grade_for_user")
 def calculate_grade_for_user(db: Session, assignment: Assignment, user: User) -> GradeMe:
     submission = (
         db.query(Submission).filter(Submission.assignment_id == assignment.id, Submission.author_id == user.id).first()
@@ -9,6 +9,7 @@ from uuid import UUID
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.profiling import profiled
 from app.models.review import Review
 from app.models.review import ReviewAssignment
 
@@ -102,6 +103,7 @@ class SimilarityResult:
 # =============================================================================
 
 
+@profiled("check_similarity")
 def check_similarity(
     db: Session,
     *,
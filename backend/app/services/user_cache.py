@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from datetime import datetime
+from functools import lru_cache
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm import make_transient_to_detached
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.models.user import User
+from app.models.user import UserRole
+from app.services.cache import Cache
+from app.services.cache import MemoryCache
+from app.services.cache import build_cache
+
+# キャッシュするカラム（password_hash は含めない。必要になった時点で遅延ロードされる）
+_SNAPSHOT_FIELDS = (
+    "email",
+    "name",
+    "avatar_path",
+    "avatar_content_type",
+    "credits",
+    "reviewer_skill_override_logic",
+    "reviewer_skill_override_specificity",
+    "reviewer_skill_override_structure",
+    "reviewer_skill_override_evidence",
+    "reviewer_skill_override_overall",
+)
+_PENDING_INVALIDATIONS_KEY = "user_cache_invalidations"
+
+
+@lru_cache(maxsize=1)
+def get_user_cache() -> Cache:
+    return build_cache(
+        namespace="users",
+        max_entries=settings.user_cache_max_entries,
+        ttl_seconds=settings.user_cache_ttl_seconds,
+    )
+
+
+def _snapshot(user: User) -> dict:
+    data: dict = {field: getattr(user, field) for field in _SNAPSHOT_FIELDS}
+    data["id"] = str(user.id)
+    data["role"] = user.role.value if isinstance(user.role, UserRole) else user.role
+    data["created_at"] = user.created_at.isoformat() if user.created_at else None
+    return data
+
+
+def _restore(db: Session, data: dict) -> User:
+    user = User(
+        id=UUID(data["id"]),
+        role=UserRole(data["role"]),
+        created_at=datetime.fromisoformat(data["created_at"]) if data["created_at"] else None,
+        **{field: data[field] for field in _SNAPSHOT_FIELDS},
+    )
+    # DB から読んだ行と同じ永続状態としてセッションに載せる（SELECT は発行しない）
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+def get_cached_user(db: Session, user_id: UUID) -> User | None:
+    if settings.user_cache_ttl_seconds <= 0:
+        return None
+    data = get_user_cache().get(str(user_id))
+    if data is None:
+        return None
+    return _restore(db, data)
+
+
+def cache_user(user: User) -> None:
+    if settings.user_cache_ttl_seconds <= 0:
+        return
+    get_user_cache().set(str(user.id), _snapshot(user))
+
+
+async def _call_cache(method: str, *args: Any) -> Any:
+    # 共有バックエンド（Redis）はブロッキングなネットワーク呼び出しのため、イベントループの外で行う
+    cache = get_user_cache()
+    if isinstance(cache, MemoryCache):
+        return getattr(cache, method)(*args)
+    return await run_in_threadpool(getattr(cache, method), *args)
+
+
+async def get_cached_user_async(db: AsyncSession, user_id: UUID) -> User | None:
+    """非同期ルート用の get_cached_user（キャッシュの読み出しでイベントループを止めない）"""
+    if settings.user_cache_ttl_seconds <= 0:
+        return None
+    data = await _call_cache("get", str(user_id))
+    if data is None:
+        return None
+    return await db.run_sync(_restore, data)
+
+
+async def cache_user_async(user: User) -> None:
+    if settings.user_cache_ttl_seconds <= 0:
+        return
+    await _call_cache("set", str(user.id), _snapshot(user))
+
+
+def invalidate_user_cache(db: Session, user_id: UUID) -> None:
+    """ユーザー情報（クレジット・ロール・プロフィール）の変更時に呼ぶ
+
+    すぐに削除したうえで、commit 完了時にもう一度削除する（commit 前に古い値が再キャッシュされるのを防ぐ）。
+    """
+    get_user_cache().delete(str(user_id))
+    db.info.setdefault(_PENDING_INVALIDATIONS_KEY, set()).add(str(user_id))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    pending = session.info.pop(_PENDING_INVALIDATIONS_KEY, None)
+    if pending:
+        get_user_cache().delete(*pending)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _invalidate_after_rollback(session: Session, previous_transaction) -> None:
+    pending = session.info.pop(_PENDING_INVALIDATIONS_KEY, None)
+    if pending:
+        get_user_cache().delete(*pending)
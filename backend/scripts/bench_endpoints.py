@@ -0,0 +1,258 @@
+"""主要エンドポイントの負荷ベンチマーク
+
+seed_test_users.py の合成データ（--synthetic と同じ生成処理）で大規模コースを用意し、
+仮想ユーザーを並行に動かして次のエンドポイントを呼び出す。
+
+- GET  /assignments/{id}/reviews/next
+- POST /review-assignments/{id}/submit
+- GET  /assignments/{id}/reviews/received
+- GET  /assignments/{id}/grades/me
+- GET  /users/ranking
+
+エンドポイントごとに p50 / p95 / p99 のレイテンシと 1 リクエストあたりの SQL 件数
+（Server-Timing ヘッダーの値）を表示する。--max-p95-ms / --max-queries を指定すると、
+超過したエンドポイントがあった場合に終了コード 1 を返す（デプロイ前の回帰チェック用）。
+
+既定では一時ファイルの SQLite にデータを作り、アプリをプロセス内 (ASGI) で呼び出す。
+--database-url を指定すると既存 DB を使い、同じ --prefix のコースがあれば生成を省略する。
+--base-url を指定すると起動済みのサーバーに HTTP で送る（SERVER_TIMING=true で起動し、
+同じ DATABASE_URL と SECRET_KEY を使うこと）。
+
+使い方:
+    uv run python scripts/bench_endpoints.py [--students 1000] [--assignments 20] [--reviews-per-submission 5]
+        [--users 100] [--iterations 3] [--concurrency 20] [--max-p95-ms 250] [--max-queries 30]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Ensure project root (backend/) is on sys.path when running as a script
+ROOT = Path(__file__).resolve().parent.parent
+_QUERY_COUNT_PATTERN = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def _ensure_app_path() -> None:
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+
+
+@dataclass
+class EndpointStats:
+    latencies: list[float] = field(default_factory=list)
+    queries: list[int] = field(default_factory=list)
+    errors: int = 0
+
+
+def percentile(values: list[float], q: float) -> float:
+    """最近傍順位法による分位点"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), round(q * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+
+def _query_count(headers) -> int | None:
+    match = _QUERY_COUNT_PATTERN.search(headers.get("server-timing", ""))
+    return int(match.group(1)) if match else None
+
+
+async def _request(client, results: dict[str, EndpointStats], label: str, method: str, url: str, **kwargs):
+    started = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    stats = results[label]
+    stats.latencies.append(time.perf_counter() - started)
+    count = _query_count(response.headers)
+    if count is not None:
+        stats.queries.append(count)
+    if response.status_code >= 400:
+        stats.errors += 1
+    return response
+
+
+async def _virtual_user(client, results, token: str, *, assignment_ids: list, iterations: int, rng: random.Random):
+    headers = {"Authorization": f"Bearer {token}"}
+    for iteration in range(iterations):
+        assignment_id = rng.choice(assignment_ids)
+        response = await _request(
+            client, results, "reviews/next", "GET", f"/assignments/{assignment_id}/reviews/next", headers=headers
+        )
+        task = response.json() if response.status_code == 200 else None
+        if task:
+            payload = {
+                "comment": f"ベンチマークのレビュー {task['review_assignment_id']} {iteration}: 根拠が具体的です。",
+                "rubric_scores": [
+                    {"criterion_id": criterion["id"], "score": rng.randint(1, criterion["max_score"])}
+                    for criterion in task["rubric"]
+                ],
+            }
+            await _request(
+                client,
+                results,
+                "submit",
+                "POST",
+                f"/review-assignments/{task['review_assignment_id']}/submit",
+                headers=headers,
+                json=payload,
+            )
+        await _request(
+            client, results, "received", "GET", f"/assignments/{assignment_id}/reviews/received", headers=headers
+        )
+        await _request(client, results, "grades/me", "GET", f"/assignments/{assignment_id}/grades/me", headers=headers)
+        await _request(client, results, "ranking", "GET", "/users/ranking", headers=headers)
+
+
+async def _run_load(args, course, tokens: list[str]) -> tuple[dict[str, EndpointStats], float]:
+    import httpx
+
+    if args.base_url:
+        transport = None
+        base_url = args.base_url
+    else:
+        from app.main import create_app
+
+        transport = httpx.ASGITransport(app=create_app(), raise_app_exceptions=False)
+        base_url = "http://bench"
+
+    results: dict[str, EndpointStats] = defaultdict(EndpointStats)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    rng = random.Random(args.seed)
+
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60.0) as client:
+
+            async def _limited(token: str, user_seed: int) -> None:
+                async with semaphore:
+                    await _virtual_user(
+                        client,
+                        results,
+                        token,
+                        assignment_ids=course["assignment_ids"],
+                        iterations=args.iterations,
+                        rng=random.Random(user_seed),
+                    )
+
+            started = time.perf_counter()
+            await asyncio.gather(*(_limited(token, rng.randrange(1 << 30)) for token in tokens))
+            elapsed = time.perf_counter() - started
+    finally:
+        if transport is not None:
+            # ASGITransport は lifespan を実行しないため、アプリの終了処理と同じく非同期エンジンを
+            # このイベントループ内で閉じる（残った接続のスレッドで終了時に止まらないように）
+            from app.db.session import async_engine
+            from app.db.session import async_replica_engine
+
+            await async_engine.dispose()
+            if async_replica_engine is not None:
+                await async_replica_engine.dispose()
+    return results, elapsed
+
+
+def _report(results: dict[str, EndpointStats], elapsed: float, args) -> int:
+    total = sum(len(stats.latencies) for stats in results.values())
+    print(f"requests={total} elapsed={elapsed:.1f}s throughput={total / elapsed if elapsed else 0:.1f} req/s")
+    print(f"{'endpoint':<14}{'n':>7}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'q/req':>8}{'q max':>7}")
+    failures: list[str] = []
+    for label in ("reviews/next", "submit", "received", "grades/me", "ranking"):
+        stats = results.get(label)
+        if stats is None or not stats.latencies:
+            continue
+        p50, p95, p99 = (percentile(stats.latencies, q) * 1000 for q in (0.5, 0.95, 0.99))
+        mean_queries = sum(stats.queries) / len(stats.queries) if stats.queries else float("nan")
+        max_queries = max(stats.queries, default=0)
+        print(
+            f"{label:<14}{len(stats.latencies):>7}{stats.errors:>6}"
+            f"{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}{mean_queries:>8.1f}{max_queries:>7}"
+        )
+        if args.max_p95_ms is not None and p95 > args.max_p95_ms:
+            failures.append(f"{label}: p95 {p95:.1f} ms > {args.max_p95_ms} ms")
+        if args.max_queries is not None and max_queries > args.max_queries:
+            failures.append(f"{label}: {max_queries} queries > {args.max_queries}")
+        if stats.errors:
+            failures.append(f"{label}: {stats.errors} error responses")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--assignments", type=int, default=20)
+    parser.add_argument("--reviews-per-submission", type=int, default=5)
+    parser.add_argument("--prefix", default="bench")
+    parser.add_argument("--users", type=int, default=100, help="仮想ユーザー数（合成データの学生から選ぶ）")
+    parser.add_argument("--iterations", type=int, default=3, help="仮想ユーザーごとのシナリオ繰り返し回数")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", default=None, help="未指定なら一時ファイルの SQLite を使う")
+    parser.add_argument("--base-url", default=None, help="起動済みサーバーの URL（未指定ならプロセス内で実行）")
+    parser.add_argument("--max-p95-ms", type=float, default=None)
+    parser.add_argument("--max-queries", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    tmpdir = None
+    if args.database_url is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        args.database_url = f"sqlite:///{Path(tmpdir.name) / 'bench.db'}"
+    # app の設定はインポート時に読まれるため、先に環境変数を設定する
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("SERVER_TIMING", "true")
+    os.environ.setdefault("ENABLE_OPENAI", "false")
+    _ensure_app_path()
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    from seed_test_users import seed_synthetic_course
+
+    from app.core.security import create_access_token
+    from app.db.init_db import init_db
+    from app.db.session import SessionLocal
+    from app.db.session import engine
+
+    try:
+        init_db()
+        started = time.perf_counter()
+        with SessionLocal() as db:
+            course = seed_synthetic_course(
+                db,
+                prefix=args.prefix,
+                students=args.students,
+                assignments=args.assignments,
+                reviews_per_submission=args.reviews_per_submission,
+                password_hash="!synthetic",
+                seed=args.seed,
+                bulk=True,
+            )
+        print(
+            f"dataset: students={len(course['student_ids'])} assignments={len(course['assignment_ids'])}"
+            f" reviews/submission={args.reviews_per_submission} ready in {time.perf_counter() - started:.1f}s"
+        )
+
+        rng = random.Random(args.seed)
+        users = rng.sample(course["student_ids"], min(args.users, len(course["student_ids"])))
+        tokens = [create_access_token({"sub": str(user_id)}) for user_id in users]
+        results, elapsed = asyncio.run(_run_load(args, course, tokens))
+        return _report(results, elapsed, args)
+    finally:
+        engine.dispose()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,160 @@
+"""SQLite での submit_review 同時実行スループットを計測する
+
+一時ファイルの SQLite に課題・提出物・レビュー割り当てを作成し、複数スレッドから submit_review を
+同時に呼び出す。チューニングなし（既定の接続設定）と、WAL・PRAGMA・単一ライターキューを有効にした
+構成を比較する。
+
+使い方:
+    uv run python scripts/bench_sqlite_submit.py [--reviews 200] [--concurrency 16] [--mode both|default|tuned]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Ensure project root (backend/) is on sys.path when running as a script
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _ensure_app_path() -> None:
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+
+
+def _build_engine(path: Path, *, tuned: bool):
+    from sqlalchemy import create_engine
+
+    from app.db.sqlite import configure_sqlite_engine
+
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        pool_size=32,
+        max_overflow=0,
+    )
+    if tuned:
+        configure_sqlite_engine(engine, serialize_writes=True)
+    return engine
+
+
+def _seed(session_factory, reviews: int) -> list[tuple]:
+    from app.models.assignment import Assignment
+    from app.models.review import ReviewAssignment
+    from app.models.submission import Submission
+    from app.models.user import User
+    from app.services.rubric import ensure_fixed_rubric
+
+    with session_factory() as db:
+        assignment = Assignment(title="bench", target_reviews_per_submission=1)
+        db.add(assignment)
+        db.flush()
+        criteria = ensure_fixed_rubric(db, assignment.id)
+        tasks: list[tuple] = []
+        for i in range(reviews):
+            author = User(email=f"author{i}@bench.local", name=f"Author{i}", password_hash="x")
+            reviewer = User(email=f"reviewer{i}@bench.local", name=f"Reviewer{i}", password_hash="x")
+            db.add_all([author, reviewer])
+            db.flush()
+            submission = Submission(
+                assignment_id=assignment.id,
+                author_id=author.id,
+                file_type="markdown",
+                original_filename="bench.md",
+                storage_path="/tmp/bench.md",
+                markdown_text="ベンチマーク用の提出物です。主張と根拠を述べています。",
+            )
+            db.add(submission)
+            db.flush()
+            review_assignment = ReviewAssignment(
+                assignment_id=assignment.id,
+                submission_id=submission.id,
+                reviewer_id=reviewer.id,
+            )
+            db.add(review_assignment)
+            db.flush()
+            tasks.append((review_assignment.id, reviewer.id))
+        db.commit()
+        return [(ra_id, reviewer_id, [c.id for c in criteria]) for ra_id, reviewer_id in tasks]
+
+
+def _run(*, tuned: bool, reviews: int, concurrency: int) -> dict:
+    from fastapi import HTTPException
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import sessionmaker
+
+    from app.api.routes.reviews import submit_review
+    from app.db.base import Base
+    from app.models.user import User
+    from app.schemas.review import ReviewSubmit
+    from app.schemas.review import RubricScore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _build_engine(Path(tmp) / "bench.db", tuned=tuned)
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        tasks = _seed(session_factory, reviews)
+
+        def _submit(task: tuple) -> str:
+            ra_id, reviewer_id, criterion_ids = task
+            payload = ReviewSubmit(
+                comment="論理の流れは明確ですが、根拠となるデータをもう少し具体的に示すとよいと思います。",
+                rubric_scores=[RubricScore(criterion_id=cid, score=4) for cid in criterion_ids],
+            )
+            with session_factory() as db:
+                reviewer = db.get(User, reviewer_id)
+                try:
+                    submit_review(ra_id, payload, db=db, current_user=reviewer)
+                except OperationalError as exc:
+                    db.rollback()
+                    return "locked" if "locked" in str(exc) else "error"
+                except HTTPException:
+                    db.rollback()
+                    return "error"
+            return "ok"
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(_submit, tasks))
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+
+    ok = outcomes.count("ok")
+    return {
+        "mode": "tuned" if tuned else "default",
+        "ok": ok,
+        "locked": outcomes.count("locked"),
+        "error": outcomes.count("error"),
+        "seconds": elapsed,
+        "reviews_per_second": ok / elapsed if elapsed else 0.0,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark concurrent submit_review throughput on SQLite")
+    parser.add_argument("--reviews", type=int, default=200, help="提出するレビュー数")
+    parser.add_argument("--concurrency", type=int, default=16, help="同時実行スレッド数")
+    parser.add_argument("--mode", choices=["both", "default", "tuned"], default="both")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    _ensure_app_path()
+
+    modes = [False, True] if args.mode == "both" else [args.mode == "tuned"]
+    for tuned in modes:
+        result = _run(tuned=tuned, reviews=args.reviews, concurrency=args.concurrency)
+        print(
+            f"{result['mode']:>7}: ok={result['ok']} locked={result['locked']} error={result['error']} "
+            f"elapsed={result['seconds']:.2f}s throughput={result['reviews_per_second']:.1f} reviews/s"
+        )
+
+    print("done: sqlite submit benchmark")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
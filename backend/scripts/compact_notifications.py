@@ -0,0 +1,58 @@
+"""保持期間を過ぎた通知履歴をアーカイブへ移す定期ジョブ
+
+既読で NOTIFICATION_RETENTION_DAYS 日より古い通知と、ユーザーごとに NOTIFICATION_KEEP_PER_USER 件を
+超えた古い通知を notification_history_archive へ移す。送信済み・失敗したアウトボックスの行も
+OUTBOX_RETENTION_DAYS 日で削除する。RETENTION_BATCH_SIZE 件ずつコミットするため、
+通知の追加や既読化を長くブロックしない。
+
+使い方:
+    uv run python scripts/compact_notifications.py                 # 1回だけ実行
+    uv run python scripts/compact_notifications.py --interval 3600  # 3600秒ごとに繰り返し実行
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Ensure project root (backend/) is on sys.path when running as a script
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _ensure_app_path() -> None:
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+
+
+def _compact_once():
+    from app.db.session import SessionLocal
+    from app.services.notification_retention import compact_notification_history
+
+    with SessionLocal() as db:
+        return compact_notification_history(db)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Archive notification history past the retention policy")
+    parser.add_argument("--interval", type=float, default=0, help="指定秒ごとに繰り返す（0で1回のみ）")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    _ensure_app_path()
+
+    while True:
+        result = _compact_once()
+        print(
+            f"done: archived notifications expired={result.expired} over_limit={result.over_limit}"
+            f" purged outbox={result.outbox_purged}",
+            flush=True,
+        )
+        if args.interval <= 0:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
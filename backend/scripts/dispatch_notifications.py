@@ -0,0 +1,73 @@
+"""通知アウトボックスのディスパッチャー
+
+notification_outbox の送信待ちの行をバッチで確保して Push 通知を送信し、結果を記録する。
+失敗した通知は指数バックオフで再試行する（OUTBOX_* の設定を参照）。
+複数プロセスで動かす場合は PostgreSQL を使うこと（SKIP LOCKED で同じ行を取り合わない）。
+API も既定でプロセス内で送信する（OUTBOX_DISPATCH_INTERVAL_SECONDS）。このスクリプトを専用プロセスとして
+常駐させる場合は、API 側を OUTBOX_DISPATCH_INTERVAL_SECONDS=0 にする。
+
+使い方:
+    uv run python scripts/dispatch_notifications.py                 # 送信待ちがなくなるまで 1 回実行
+    uv run python scripts/dispatch_notifications.py --interval 2    # 2秒ごとに繰り返し実行
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Ensure project root (backend/) is on sys.path when running as a script
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _ensure_app_path() -> None:
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+
+
+def _dispatch_until_empty(batch_size: int | None) -> tuple[int, int, int]:
+    from app.db.session import SessionLocal
+    from app.services.notification_outbox import dispatch_outbox_once
+
+    sent = retried = failed = 0
+    while True:
+        result = dispatch_outbox_once(SessionLocal, limit=batch_size)
+        sent += result.sent
+        retried += result.retried
+        failed += result.failed
+        if result.claimed == 0:
+            return sent, retried, failed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Deliver queued push notifications from the outbox")
+    parser.add_argument("--interval", type=float, default=0, help="指定秒ごとに繰り返す（0で1回のみ）")
+    parser.add_argument("--batch-size", type=int, default=None, help="1 回に確保する件数（既定は OUTBOX_BATCH_SIZE）")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    _ensure_app_path()
+
+    from app.services.events import events_are_process_local
+    from app.services.push_delivery import shutdown_push_delivery_pool
+
+    if events_are_process_local():
+        # このプロセスで作った通知は API の通知ストリームに届かない
+        print("warning: EVENT_BACKEND is process-local; set REDIS_URL to stream notifications live", file=sys.stderr)
+
+    try:
+        while True:
+            sent, retried, failed = _dispatch_until_empty(args.batch_size)
+            if sent or retried or failed or args.interval <= 0:
+                print(f"done: notifications sent={sent} retried={retried} failed={failed}", flush=True)
+            if args.interval <= 0:
+                return 0
+            time.sleep(args.interval)
+    finally:
+        shutdown_push_delivery_pool()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
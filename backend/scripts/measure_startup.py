@@ -0,0 +1,89 @@
+"""アプリの起動時間の計測
+
+新しいプロセスで次の 2 つを計測し、中央値を表示する。
+
+- import: ``import app.main`` にかかる時間
+- startup: lifespan の起動処理（マイグレーション確認と init_db）にかかる時間
+
+あわせて、起動後に Alembic / sqlmodel / pywebpush が読み込まれていないかを表示する
+（alembic/head.json がない、または DB が最新でない場合は Alembic が読み込まれる）。
+--import-budget-ms / --startup-budget-ms を超えた場合は終了コード 1 を返す。
+
+使い方:
+    uv run python scripts/measure_startup.py [--runs 5] [--import-budget-ms 1500] [--startup-budget-ms 100]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Ensure project root (backend/) is on sys.path when running as a script
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("alembic", "sqlmodel", "pywebpush")
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+import asyncio
+
+async def _startup():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(_startup())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+"""
+
+
+def _measure_once() -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE % (HEAVY_MODULES,)],
+        cwd=ROOT,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=None)
+    parser.add_argument("--startup-budget-ms", type=float, default=None)
+    args = parser.parse_args(argv)
+
+    load_dotenv(ROOT / ".env")
+    samples = [_measure_once() for _ in range(max(1, args.runs))]
+    import_ms = statistics.median(sample["import_ms"] for sample in samples)
+    startup_ms = statistics.median(sample["startup_ms"] for sample in samples)
+    loaded = sorted({name for sample in samples for name in sample["loaded"]})
+    print(f"runs={len(samples)} import={import_ms:.0f} ms startup={startup_ms:.0f} ms")
+    print(f"heavy modules loaded: {', '.join(loaded) or 'none'}")
+
+    failures: list[str] = []
+    if args.import_budget_ms is not None and import_ms > args.import_budget_ms:
+        failures.append(f"import {import_ms:.0f} ms > {args.import_budget_ms:.0f} ms")
+    if args.startup_budget_ms is not None and startup_ms > args.startup_budget_ms:
+        failures.append(f"startup {startup_ms:.0f} ms > {args.startup_budget_ms:.0f} ms")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("done: startup measured")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,57 @@
+"""リース期限切れのレビュー割り当てを回収する定期ジョブ
+
+使い方:
+    uv run python scripts/reap_review_leases.py            # 1回だけ実行
+    uv run python scripts/reap_review_leases.py --interval 60  # 60秒ごとに繰り返し実行
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Ensure project root (backend/) is on sys.path when running as a script
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _ensure_app_path() -> None:
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+
+
+def _reap_once() -> int:
+    from app.db.session import SessionLocal
+    from app.services.matching import reclaim_expired_review_assignments
+
+    total = 0
+    with SessionLocal() as db:
+        # バッチごとにコミットしてトランザクションを短く保つ
+        while True:
+            reclaimed = reclaim_expired_review_assignments(db)
+            db.commit()
+            total += reclaimed
+            if reclaimed == 0:
+                break
+    return total
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Reclaim review assignments whose lease has expired")
+    parser.add_argument("--interval", type=float, default=0, help="指定秒ごとに繰り返す（0で1回のみ）")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    _ensure_app_path()
+
+    while True:
+        reclaimed = _reap_once()
+        print(f"done: review assignments reclaimed={reclaimed}", flush=True)
+        if args.interval <= 0:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,48 @@
+"""レビュアースキル集計 (reviewer_skill_stats) を全レビューから再計算する
+
+差分更新の結果と一致するかの検証にも使う（--dry-run で差異のある件数だけ表示）。
+
+使い方:
+    uv run python scripts/rebuild_reviewer_skill_stats.py [--reviewer-id <UUID> ...] [--dry-run]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from uuid import UUID
+
+from dotenv import load_dotenv
+
+# Ensure project root (backend/) is on sys.path when running as a script
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _ensure_app_path() -> None:
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild incrementally maintained reviewer skill stats")
+    parser.add_argument("--reviewer-id", type=UUID, action="append", default=None, help="対象レビュアーを限定する")
+    parser.add_argument("--dry-run", action="store_true", help="差異のある件数だけ表示してロールバックする")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    _ensure_app_path()
+    from app.db.session import SessionLocal
+    from app.services.reviewer_skill import rebuild_reviewer_skill_stats
+
+    with SessionLocal() as db:
+        fixed = rebuild_reviewer_skill_stats(db, reviewer_ids=args.reviewer_id)
+        if args.dry_run:
+            db.rollback()
+        else:
+            db.commit()
+
+    print(f"done: reviewer skill stats fixed={fixed}{' (dry-run)' if args.dry_run else ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
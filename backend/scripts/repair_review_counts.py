@@ -0,0 +1,46 @@
+"""Submission のレビューカウンタ (assigned_count / submitted_count) を実データから修復する
+
+使い方:
+    uv run python scripts/repair_review_counts.py [--assignment-id <UUID>] [--dry-run]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from uuid import UUID
+
+from dotenv import load_dotenv
+
+# Ensure project root (backend/) is on sys.path when running as a script
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _ensure_app_path() -> None:
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Repair denormalized review counts on submissions")
+    parser.add_argument("--assignment-id", type=UUID, default=None, help="対象課題を限定する")
+    parser.add_argument("--dry-run", action="store_true", help="修正件数だけ表示してロールバックする")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    _ensure_app_path()
+    from app.db.session import SessionLocal
+    from app.services.matching import recalculate_review_counts
+
+    with SessionLocal() as db:
+        fixed = recalculate_review_counts(db, assignment_id=args.assignment_id)
+        if args.dry_run:
+            db.rollback()
+        else:
+            db.commit()
+
+    print(f"done: submissions fixed={fixed}{' (dry-run)' if args.dry_run else ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,5 +1,22 @@
+"""動作確認用のユーザー・コース・課題を作成する
+
+使い方:
+    uv run python scripts/seed_test_users.py
+    # 負荷試験用の大規模コース（学生 1,000 人 × 課題 20 件 × 提出物ごとにレビュー 5 件）
+    uv run python scripts/seed_test_users.py --synthetic --students 1000 --assignments 20 --reviews-per-submission 5
+    # 数十万行を数秒で入れる場合は --bulk（PostgreSQL では COPY を使う）
+    uv run python scripts/seed_test_users.py --synthetic --bulk --students 5000
+"""
+
+import argparse
+import enum
+import itertools
 import os
+import random
 import sys
+from collections.abc import Iterable
+from collections.abc import Iterator
+from datetime import UTC
 from datetime import datetime
 from datetime import timedelta
 from datetime import timezone
@@ -7,6 +24,8 @@ from pathlib import Path
 from typing import TYPE_CHECKING
 from typing import NotRequired
 from typing import TypedDict
+from uuid import UUID
+from uuid import uuid4
 
 from dotenv import load_dotenv
 
@@ -43,6 +62,17 @@ class CompletedAssignmentSeed(TypedDict):
     feedback: str
 
 
+class SyntheticCourse(TypedDict):
+    course_id: UUID
+    assignment_ids: list[UUID]
+    student_ids: list[UUID]
+    teacher_id: UUID
+
+
+SYNTHETIC_EMAIL_DOMAIN = "synthetic.example.com"
+BULK_CHUNK_SIZE = 5000
+
+
 # Ensure project root (backend/) is on sys.path when running as a script
 ROOT = Path(__file__).resolve().parent.parent
 
@@ -52,9 +82,298 @@ def _ensure_app_path() -> None:
         sys.path.insert(0, str(ROOT))
 
 
-def main() -> int:  # noqa: PLR0915
+def _copy_value(value):
+    # SQLAlchemy の Enum 型は列挙子の name を保存する
+    if isinstance(value, enum.Enum):
+        return value.name
+    return value
+
+
+def _copy_rows(db, table, rows: Iterator[dict]) -> int:
+    """PostgreSQL の COPY FROM STDIN で書き込む（psycopg 3 ドライバのみ）"""
+    first = next(rows, None)
+    if first is None:
+        return 0
+    columns = list(first)
+    quote = db.get_bind().dialect.identifier_preparer.quote
+    statement = f"COPY {quote(table.name)} ({', '.join(quote(column) for column in columns)}) FROM STDIN"
+    written = 0
+    driver_connection = db.connection().connection.driver_connection
+    with driver_connection.cursor() as cursor, cursor.copy(statement) as copy:
+        for row in itertools.chain([first], rows):
+            copy.write_row([_copy_value(row[column]) for column in columns])
+            written += 1
+    return written
+
+
+def _write_rows(db, model, rows: Iterable[dict], *, bulk: bool, chunk_size: int) -> int:
+    """行 (dict) を chunk_size 件ずつ書き込み、書き込んだ件数を返す"""
+    from sqlalchemy import insert
+
+    rows = iter(rows)
+    table = model.__table__
+    dialect = db.get_bind().dialect
+    if bulk and dialect.name == "postgresql" and dialect.driver == "psycopg":
+        return _copy_rows(db, table, rows)
+
+    written = 0
+    statement = insert(table)
+    for chunk in itertools.batched(rows, chunk_size):
+        if bulk:
+            # executemany 形式で渡すと、コンパイル済みの INSERT を使い回しつつ
+            # 複数行の VALUES にまとめて送られる (insertmanyvalues)
+            db.connection().execute(statement, list(chunk))
+        else:
+            db.add_all(model(**row) for row in chunk)
+            db.flush()
+        written += len(chunk)
+    return written
+
+
+def synthetic_student_email(prefix: str, index: int) -> str:
+    return f"{prefix}-student{index}@{SYNTHETIC_EMAIL_DOMAIN}"
+
+
+def seed_synthetic_course(  # noqa: PLR0915
+    db,
+    *,
+    prefix: str,
+    students: int,
+    assignments: int,
+    reviews_per_submission: int,
+    password_hash: str,
+    seed: int = 0,
+    bulk: bool = False,
+    chunk_size: int = BULK_CHUNK_SIZE,
+) -> SyntheticCourse:
+    """負荷試験用に、1 コース分の学生・課題・提出物・提出済みレビューを生成する
+
+    学生 i の提出物は学生 i+1 .. i+reviews_per_submission がレビュー済みの状態になる。
+    課題の目標レビュー数は reviews_per_submission + 1 とし、ベンチマーク中に
+    /reviews/next で新しい割り当てを取れる余地を残す。同じ prefix のコースが既にあれば作成せずに返す。
+
+    行はジェネレータで少しずつ生成して書き込む。``bulk=True`` では ORM を介さず
+    Core の ``insert()`` による複数行 INSERT（PostgreSQL + psycopg では COPY）で書き込む。
+    パスワードハッシュは全ユーザーで ``password_hash`` を共有する。
+    """
+    from app.models.assignment import Assignment
+    from app.models.course import Course
+    from app.models.course import CourseEnrollment
+    from app.models.review import Review
+    from app.models.review import ReviewAssignment
+    from app.models.review import ReviewAssignmentStatus
+    from app.models.review import ReviewRubricScore
+    from app.models.submission import Submission
+    from app.models.submission import SubmissionFileType
+    from app.models.submission import SubmissionRubricScore
+    from app.models.user import User
+    from app.models.user import UserRole
+    from app.services.rubric import ensure_fixed_rubric
+
+    if reviews_per_submission >= students:
+        raise ValueError("reviews_per_submission must be smaller than students")
+
+    course_title = f"[synthetic] {prefix}"
+    teacher_email = f"{prefix}-teacher@{SYNTHETIC_EMAIL_DOMAIN}"
+    existing = db.query(Course).filter(Course.title == course_title).first()
+    if existing is not None:
+        student_ids = [
+            user_id
+            for (user_id,) in db.query(User.id)
+            .filter(User.email.like(f"{prefix}-student%@{SYNTHETIC_EMAIL_DOMAIN}"))
+            .order_by(User.created_at.asc())
+            .all()
+        ]
+        assignment_ids = [
+            assignment_id
+            for (assignment_id,) in db.query(Assignment.id)
+            .filter(Assignment.course_id == existing.id)
+            .order_by(Assignment.title.asc())
+            .all()
+        ]
+        return {
+            "course_id": existing.id,
+            "assignment_ids": assignment_ids,
+            "student_ids": student_ids,
+            "teacher_id": existing.teacher_id,
+        }
+
+    rng = random.Random(seed)
+    teacher = User(email=teacher_email, name=f"{prefix} Teacher", role=UserRole.teacher, password_hash=password_hash)
+    db.add(teacher)
+    db.flush()
+    course = Course(title=course_title, description="負荷試験用の合成データ", teacher_id=teacher.id)
+    db.add(course)
+    db.flush()
+
+    now = datetime.now(UTC)
+    student_ids = [uuid4() for _ in range(students)]
+    _write_rows(
+        db,
+        User,
+        (
+            {
+                "id": student_id,
+                "email": synthetic_student_email(prefix, index),
+                "name": f"{prefix} Student {index}",
+                "role": UserRole.student,
+                "password_hash": password_hash,
+                "credits": rng.randint(0, 40),
+                "created_at": now,
+            }
+            for index, student_id in enumerate(student_ids)
+        ),
+        bulk=bulk,
+        chunk_size=chunk_size,
+    )
+    _write_rows(
+        db,
+        CourseEnrollment,
+        ({"id": uuid4(), "course_id": course.id, "user_id": user_id, "created_at": now} for user_id in student_ids),
+        bulk=bulk,
+        chunk_size=chunk_size,
+    )
+    db.commit()
+
+    body = "# Synthetic submission\n\n負荷試験用に自動生成された提出物です。"
+    assignment_ids: list[UUID] = []
+    for number in range(1, assignments + 1):
+        assignment = Assignment(
+            course_id=course.id,
+            title=f"{prefix} assignment {number:03d}",
+            description="負荷試験用の課題",
+            target_reviews_per_submission=reviews_per_submission + 1,
+        )
+        db.add(assignment)
+        db.flush()
+        criteria = [(criterion.id, criterion.max_score) for criterion in ensure_fixed_rubric(db, assignment.id)]
+        assignment_ids.append(assignment.id)
+        submission_ids = [uuid4() for _ in range(students)]
+        teacher_scores = [[rng.randint(1, max_score) for _, max_score in criteria] for _ in submission_ids]
+
+        _write_rows(
+            db,
+            Submission,
+            (
+                {
+                    "id": submission_id,
+                    "assignment_id": assignment.id,
+                    "author_id": author_id,
+                    "file_type": SubmissionFileType.markdown,
+                    "original_filename": "synthetic.md",
+                    "storage_path": f"synthetic/{submission_id}.md",
+                    "markdown_text": body,
+                    "submission_text": body,
+                    "teacher_total_score": sum(scores),
+                    "assigned_count": reviews_per_submission,
+                    "submitted_count": reviews_per_submission,
+                    "created_at": now,
+                }
+                for author_id, submission_id, scores in zip(student_ids, submission_ids, teacher_scores, strict=True)
+            ),
+            bulk=bulk,
+            chunk_size=chunk_size,
+        )
+        _write_rows(
+            db,
+            SubmissionRubricScore,
+            (
+                {"id": uuid4(), "submission_id": submission_id, "criterion_id": criterion_id, "score": score}
+                for submission_id, scores in zip(submission_ids, teacher_scores, strict=True)
+                for (criterion_id, _), score in zip(criteria, scores, strict=True)
+            ),
+            bulk=bulk,
+            chunk_size=chunk_size,
+        )
+
+        # (提出物の位置, レビュアーのずれ) ごとに ID を固定し、3 テーブルで同じ組み合わせを参照する
+        review_keys = [
+            (author_index, offset, uuid4(), uuid4())
+            for author_index in range(students)
+            for offset in range(1, reviews_per_submission + 1)
+        ]
+        _write_rows(
+            db,
+            ReviewAssignment,
+            (
+                {
+                    "id": review_assignment_id,
+                    "assignment_id": assignment.id,
+                    "submission_id": submission_ids[author_index],
+                    "reviewer_id": student_ids[(author_index + offset) % students],
+                    "status": ReviewAssignmentStatus.submitted,
+                    "assigned_at": now,
+                    "submitted_at": now,
+                }
+                for author_index, offset, review_assignment_id, _ in review_keys
+            ),
+            bulk=bulk,
+            chunk_size=chunk_size,
+        )
+        _write_rows(
+            db,
+            Review,
+            (
+                {
+                    "id": review_id,
+                    "review_assignment_id": review_assignment_id,
+                    "comment": f"合成レビュー {number}-{author_index}-{offset}: 論点は明確で、根拠を補足するとよい。",
+                    "created_at": now,
+                    "ai_quality_score": rng.randint(2, 5),
+                    "ai_logic": rng.randint(2, 5),
+                    "ai_specificity": rng.randint(2, 5),
+                    "ai_toxic": False,
+                    "credit_awarded": 1,
+                }
+                for author_index, offset, review_assignment_id, review_id in review_keys
+            ),
+            bulk=bulk,
+            chunk_size=chunk_size,
+        )
+        _write_rows(
+            db,
+            ReviewRubricScore,
+            (
+                {"id": uuid4(), "review_id": review_id, "criterion_id": criterion_id, "score": rng.randint(1, 5)}
+                for *_, review_id in review_keys
+                for criterion_id, _ in criteria
+            ),
+            bulk=bulk,
+            chunk_size=chunk_size,
+        )
+        db.commit()
+
+    return {
+        "course_id": course.id,
+        "assignment_ids": assignment_ids,
+        "student_ids": student_ids,
+        "teacher_id": teacher.id,
+    }
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", action="store_true", help="負荷試験用の大規模コースを生成する")
+    parser.add_argument("--prefix", default="loadtest", help="合成データのメール・コース名に付ける接頭辞")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--assignments", type=int, default=20)
+    parser.add_argument("--reviews-per-submission", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード（スコアの再現用）")
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="ORM を使わず複数行 INSERT（PostgreSQL では COPY）でまとめて書き込む",
+    )
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE, help="1 回に書き込む行数")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:  # noqa: PLR0915
+    args = _parse_args(argv)
     load_dotenv()
     _ensure_app_path()
+    if args.synthetic:
+        return _seed_synthetic(args)
     # JTC（日本標準時）を定義
     jst = timezone(timedelta(hours=9))
     from app.core.config import COURSE_TITLE_CANDIDATES
@@ -74,6 +393,7 @@ def main() -> int:  # noqa: PLR0915
     from app.models.submission import SubmissionRubricScore
     from app.models.user import User
     from app.models.user import UserRole
+    from app.services.matching import recalculate_review_counts
     from app.services.rubric import ensure_fixed_rubric
 
     password = os.getenv("TEST_USER_PASSWORD")
@@ -99,6 +419,8 @@ def main() -> int:  # noqa: PLR0915
     skipped_courses = 0
     created_assignments = 0
     skipped_assignments = 0
+    # bcrypt は意図的に遅いため、全ユーザー共通のパスワードは一度だけハッシュ化する
+    password_hash = get_password_hash(password)
     with SessionLocal() as db:
         for u in users:
             existing = db.query(User).filter_by(email=u["email"]).first()
@@ -115,7 +437,7 @@ def main() -> int:  # noqa: PLR0915
                     email=u["email"],
                     name=u["name"],
                     role=u["role"],
-                    password_hash=get_password_hash(password),
+                    password_hash=password_hash,
                     credits=user_credits,
                 )
             )
@@ -523,6 +845,9 @@ def main() -> int:  # noqa: PLR0915
                     )
                 )
 
+        # 直接作成したレビュー割り当てを提出物のカウンタへ反映
+        db.flush()
+        recalculate_review_counts(db)
         db.commit()
 
     print(
@@ -534,5 +859,35 @@ def main() -> int:  # noqa: PLR0915
     return 0
 
 
+def _seed_synthetic(args: argparse.Namespace) -> int:
+    import time
+
+    from app.core.security import get_password_hash
+    from app.db.session import SessionLocal
+
+    password = os.getenv("TEST_USER_PASSWORD")
+    assert password, "TEST_USER_PASSWORD is required"
+
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        course = seed_synthetic_course(
+            db,
+            prefix=args.prefix,
+            students=args.students,
+            assignments=args.assignments,
+            reviews_per_submission=args.reviews_per_submission,
+            password_hash=get_password_hash(password),
+            seed=args.seed,
+            bulk=args.bulk,
+            chunk_size=args.chunk_size,
+        )
+    print(
+        "done:"
+        f" course={course['course_id']} students={len(course['student_ids'])}"
+        f" assignments={len(course['assignment_ids'])} elapsed={time.perf_counter() - started:.1f}s"
+    )
+    return 0
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
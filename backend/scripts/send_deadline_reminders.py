@@ -0,0 +1,64 @@
+"""締め切りが近い課題の未提出者にリマインダーを送る定期ジョブ
+
+DEADLINE_REMINDER_HOURS（既定 24）で指定した時間前を過ぎた課題について、未提出の受講者へ
+SUBMISSION_DUE の通知を送る。送信済みの記録を残すため、何度実行しても・複数ノードで同時に
+実行しても 1 人に 1 回だけ届く。
+
+使い方:
+    uv run python scripts/send_deadline_reminders.py              # 1回だけ実行
+    uv run python scripts/send_deadline_reminders.py --interval 300  # 300秒ごとに繰り返し実行
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Ensure project root (backend/) is on sys.path when running as a script
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _ensure_app_path() -> None:
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+
+
+def _send_once() -> tuple[int, int]:
+    from app.db.session import SessionLocal
+    from app.services.deadline_reminders import send_deadline_reminders
+
+    with SessionLocal() as db:
+        result = send_deadline_reminders(db)
+    return result.claimed, result.sent
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Send deadline reminders to students without a submission")
+    parser.add_argument("--interval", type=float, default=0, help="指定秒ごとに繰り返す（0で1回のみ）")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    _ensure_app_path()
+
+    from app.services.events import events_are_process_local
+    from app.services.push_delivery import shutdown_push_delivery_pool
+
+    if events_are_process_local():
+        # このプロセスで作った通知は API の通知ストリームに届かない
+        print("warning: EVENT_BACKEND is process-local; set REDIS_URL to stream notifications live", file=sys.stderr)
+
+    try:
+        while True:
+            reminded, sent = _send_once()
+            print(f"done: deadline reminders users={reminded} pushes sent={sent}", flush=True)
+            if args.interval <= 0:
+                return 0
+            time.sleep(args.interval)
+    finally:
+        shutdown_push_delivery_pool()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
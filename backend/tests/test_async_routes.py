@@ -0,0 +1,121 @@
+import asyncio
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes.notifications import get_notification_history
+from app.api.routes.reviews import next_review_task
+from app.api.routes.users import RankingPeriod
+from app.api.routes.users import user_ranking
+from app.core.security import create_access_token
+from app.db.base import Base
+from app.db.session import async_database_url
+from app.models.assignment import Assignment
+from app.models.submission import Submission
+from app.models.user import User
+from app.schemas.notification import NotificationType
+from app.services import user_cache
+from app.services.auth import get_current_user_async
+from app.services.cache import MemoryCache
+from app.services.notification_service import create_notification_history
+
+
+def test_async_database_url_uses_async_drivers():
+    assert async_database_url("sqlite:///./dev.db") == "sqlite+aiosqlite:///./dev.db"
+    assert async_database_url("postgresql://u:p@h/db") == "postgresql+psycopg://u:p@h/db"
+    assert async_database_url("postgresql+psycopg://u:p@h/db") == "postgresql+psycopg://u:p@h/db"
+
+
+def test_async_routes_run_on_async_session(tmp_path):
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(sync_engine)
+    with sessionmaker(bind=sync_engine)() as db:
+        assignment = Assignment(title="A1")
+        author = User(email="author@example.com", name="Author", password_hash="x", credits=30)
+        reviewer = User(email="rev@example.com", name="Rev", password_hash="y")
+        db.add_all([assignment, author, reviewer])
+        db.flush()
+        db.add(
+            Submission(
+                assignment_id=assignment.id,
+                author_id=author.id,
+                file_type="markdown",
+                original_filename="f.md",
+                storage_path="/tmp/f",
+            )
+        )
+        db.commit()
+        create_notification_history(db, reviewer.id, NotificationType.REVIEW_RECEIVED, title="t", body="b")
+        assignment_id, author_id, reviewer_id = assignment.id, author.id, reviewer.id
+
+    async def _run():
+        async_engine = create_async_engine(async_database_url(url))
+        try:
+            async with async_sessionmaker(bind=async_engine, expire_on_commit=False)() as db:
+                token = create_access_token({"sub": str(reviewer_id)})
+                current_user = await get_current_user_async(token=token, db=db)
+                task = await next_review_task(assignment_id=assignment_id, db=db, current_user=current_user)
+                history = await get_notification_history(db=db, current_user=current_user, limit=50, cursor=None)
+                ranking = await user_ranking(limit=5, period=RankingPeriod.total, db=db)
+                return task, history, ranking
+        finally:
+            await async_engine.dispose()
+
+    task, history, ranking = asyncio.run(_run())
+    assert task is not None
+    assert task.author_alias
+    assert history.total_count == 1
+    assert [entry.id for entry in ranking] == [author_id]
+
+
+class _SharedCache:
+    """共有バックエンドの代わり（呼ばれたスレッドを記録する）"""
+
+    def __init__(self) -> None:
+        self._entries = MemoryCache(max_entries=10, ttl_seconds=60)
+        self.threads: list[int] = []
+
+    def get(self, key):
+        self.threads.append(threading.get_ident())
+        return self._entries.get(key)
+
+    def set(self, key, value, *, ttl_seconds=None):
+        self.threads.append(threading.get_ident())
+        self._entries.set(key, value, ttl_seconds=ttl_seconds)
+
+
+def test_async_auth_keeps_shared_cache_calls_off_the_event_loop(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'auth.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(sync_engine)
+    with sessionmaker(bind=sync_engine)() as db:
+        user = User(email="cache@example.com", name="Cache", password_hash="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+    cache = _SharedCache()
+    monkeypatch.setattr(user_cache, "get_user_cache", lambda: cache)
+    monkeypatch.setattr(user_cache.settings, "user_cache_ttl_seconds", 60)
+
+    async def _run():
+        loop_thread = threading.get_ident()
+        async_engine = create_async_engine(async_database_url(url))
+        try:
+            token = create_access_token({"sub": str(user_id)})
+            names = []
+            # 1 回目は DB から読んでキャッシュし、2 回目はキャッシュから復元する
+            for _ in range(2):
+                async with async_sessionmaker(bind=async_engine, expire_on_commit=False)() as db:
+                    names.append((await get_current_user_async(token=token, db=db)).name)
+            return loop_thread, names
+        finally:
+            await async_engine.dispose()
+
+    loop_thread, names = asyncio.run(_run())
+    assert names == ["Cache", "Cache"]
+    assert len(cache.threads) == 3  # get (miss) -> set -> get (hit)
+    assert loop_thread not in cache.threads
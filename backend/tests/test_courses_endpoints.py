@@ -2,15 +2,22 @@
 授業エンドポイントのテスト
 """
 
+from datetime import UTC
+from datetime import datetime
 from uuid import uuid4
 
 import pytest
 from fastapi import HTTPException
+from fastapi import Request
+from fastapi import Response
 from sqlalchemy import create_engine
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 from sqlalchemy.orm import sessionmaker
 
+from app.api.routes.courses import enroll_course
 from app.api.routes.courses import get_course_detail
+from app.api.routes.courses import list_courses
 from app.api.routes.courses import unenroll_course
 from app.db.base import Base
 from app.models.assignment import Assignment
@@ -21,6 +28,13 @@ from app.models.submission import Submission
 from app.models.submission import SubmissionFileType
 from app.models.user import User
 from app.models.user import UserRole
+from app.services.course_catalog import get_course_catalog_cache
+
+
+def _request(headers: dict[str, str] | None = None) -> Request:
+    """ルート関数を直接呼ぶためのリクエスト"""
+    raw = [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/courses", "headers": raw})
 
 
 def _make_session() -> Session:
@@ -316,3 +330,139 @@ class TestUnenrollCourse:
 
         assert exc_info.value.status_code == 400
         assert "未完了のレビュー割り当てが残っています" in exc_info.value.detail
+
+
+def test_list_courses_uses_one_query_with_counts_and_enrollment(db_session: Session, teacher: User, student: User):
+    """講義一覧は講師名・受講生数・登録状況を 1 クエリで返し、キーセットでページングできる"""
+    courses = [
+        Course(title=f"講義{i}", teacher_id=teacher.id, created_at=datetime(2026, 4, 1 + i, tzinfo=UTC))
+        for i in range(3)
+    ]
+    db_session.add_all(courses)
+    db_session.commit()
+    db_session.add(CourseEnrollment(course_id=courses[0].id, user_id=student.id))
+    db_session.commit()
+    db_session.expire_all()
+    assert student.role == UserRole.student
+
+    statements: list[str] = []
+    engine = db_session.get_bind()
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        first = list_courses(_request(), Response(), q=None, limit=10, cursor=None, db=db_session, current_user=student)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert len(statements) == 1
+    assert [c.title for c in first] == ["講義2", "講義1", "講義0"]
+    assert [c.teacher_name for c in first] == ["先生 太郎"] * 3
+    assert [(c.student_count, c.is_enrolled) for c in first] == [(0, False), (0, False), (1, True)]
+
+    response = Response()
+    page = list_courses(_request(), response, q=None, limit=2, cursor=None, db=db_session, current_user=student)
+    assert [c.title for c in page] == ["講義2", "講義1"]
+    rest = list_courses(
+        _request(),
+        Response(),
+        q=None,
+        limit=2,
+        cursor=response.headers["X-Next-Cursor"],
+        db=db_session,
+        current_user=student,
+    )
+    assert [c.title for c in rest] == ["講義0"]
+
+    assert [
+        c.title
+        for c in list_courses(
+            _request(), Response(), q="義1", limit=None, cursor=None, db=db_session, current_user=student
+        )
+    ] == ["講義1"]
+    assert (
+        len(
+            list_courses(_request(), Response(), q="先生", limit=None, cursor=None, db=db_session, current_user=student)
+        )
+        == 3
+    )
+    with pytest.raises(HTTPException) as exc_info:
+        list_courses(_request(), Response(), q=None, limit=2, cursor="broken", db=db_session, current_user=student)
+    assert exc_info.value.status_code == 400
+
+
+def test_course_catalog_is_cached_and_revalidated_with_etag(db_session: Session, teacher: User, student: User):
+    """学生の講義一覧はキャッシュ済みカタログに受講登録を重ね、変更がなければ 304 を返す"""
+    get_course_catalog_cache().clear()
+    course = Course(title="講義A", teacher_id=teacher.id)
+    db_session.add(course)
+    db_session.commit()
+    course_id = course.id
+
+    response = Response()
+    first = list_courses(
+        _request(),
+        response,
+        q=None,
+        limit=None,
+        cursor=None,
+        db=db_session,
+        primary_db=db_session,
+        current_user=student,
+    )
+    etag = response.headers["ETag"]
+    assert [(c.title, c.teacher_name, c.student_count, c.is_enrolled) for c in first] == [
+        ("講義A", "先生 太郎", 0, False)
+    ]
+
+    # 変更がなければ同じ ETag で 304
+    not_modified = list_courses(
+        _request({"If-None-Match": etag}),
+        Response(),
+        q=None,
+        limit=None,
+        cursor=None,
+        db=db_session,
+        primary_db=db_session,
+        current_user=student,
+    )
+    assert isinstance(not_modified, Response)
+    assert not_modified.status_code == 304
+
+    # 受講登録でカタログが無効化され、受講生数と登録状況が反映される
+    enroll_course(course_id, db=db_session, current_user=student)
+    response = Response()
+    after = list_courses(
+        _request({"If-None-Match": etag}),
+        response,
+        q=None,
+        limit=None,
+        cursor=None,
+        db=db_session,
+        primary_db=db_session,
+        current_user=student,
+    )
+    assert [(c.student_count, c.is_enrolled) for c in after] == [(1, True)]
+    assert response.headers["ETag"] != etag
+    get_course_catalog_cache().clear()
+
+
+def test_course_catalog_is_built_from_primary_not_replica(db_session: Session, teacher: User, student: User):
+    """レプリカが遅れていても、共有キャッシュにはプライマリの内容を載せる"""
+    get_course_catalog_cache().clear()
+    db_session.add(Course(title="講義A", teacher_id=teacher.id))
+    db_session.commit()
+    # まだ講義が複製されていないレプリカ（学生は受講登録の読み取りに使う）
+    stale_replica = _make_session()
+
+    courses = list_courses(
+        _request(),
+        Response(),
+        q=None,
+        limit=None,
+        cursor=None,
+        db=stale_replica,
+        primary_db=db_session,
+        current_user=student,
+    )
+    assert [(c.title, c.is_enrolled) for c in courses] == [("講義A", False)]
+    get_course_catalog_cache().clear()
+    stale_replica.close()
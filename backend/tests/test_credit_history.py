@@ -0,0 +1,82 @@
+import asyncio
+import csv
+import io
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi import Response
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes.users import export_my_credit_history
+from app.api.routes.users import my_credit_history
+from app.db.base import Base
+from app.models.credit_history import CreditHistory
+from app.models.user import User
+from app.services import credits as credit_service
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'credits.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def user(db):
+    user = User(email="credits@example.com", name="単位 太郎", password_hash="hash")
+    db.add(user)
+    db.commit()
+    start = datetime(2026, 10, 1, tzinfo=UTC)
+    # 同じ時刻の行も含め、ページをまたいで重複・欠落がないことを確かめる
+    db.add_all(
+        CreditHistory(
+            user_id=user.id,
+            delta=1,
+            total_credits=i + 1,
+            reason="review_submitted",
+            created_at=start + timedelta(hours=i // 2),
+        )
+        for i in range(7)
+    )
+    db.commit()
+    return user
+
+
+def test_credit_history_pages_with_cursor_header(db, user):
+    seen = []
+    cursor = None
+    while True:
+        response = Response()
+        page = my_credit_history(response, limit=3, cursor=cursor, current_user=user, db=db)
+        seen.extend(history.total_credits for history in page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert sorted(seen, reverse=True) == list(range(7, 0, -1))
+    assert len(seen) == 7
+
+    with pytest.raises(HTTPException) as exc_info:
+        my_credit_history(Response(), limit=3, cursor="not-a-cursor", current_user=user, db=db)
+    assert exc_info.value.status_code == 400
+
+
+def test_credit_history_csv_export_streams_every_row(db, user, monkeypatch):
+    monkeypatch.setattr(credit_service, "CREDIT_HISTORY_EXPORT_PAGE_SIZE", 2)
+    response = export_my_credit_history(current_user=user, db=db)
+    assert response.media_type.startswith("text/csv")
+
+    async def _collect():
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    rows = list(csv.DictReader(io.StringIO(asyncio.run(_collect()))))
+    assert len(rows) == 7
+    assert [row["total_credits"] for row in rows][-1] in {"1", "2"}
+    assert sorted(int(row["total_credits"]) for row in rows) == list(range(1, 8))
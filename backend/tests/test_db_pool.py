@@ -0,0 +1,44 @@
+from sqlalchemy import create_engine
+from sqlalchemy import text
+
+from app.api.routes.health import db_pool_health
+from app.core.metrics import Histogram
+from app.db.pool import InstrumentedQueuePool
+from app.db.pool import pool_metrics_snapshot
+from app.db.pool import register_pool_metrics
+
+
+def test_pool_metrics_track_checkouts_and_usage(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=2,
+        max_overflow=1,
+        pool_logging_name="test-pool",
+    )
+    register_pool_metrics(engine)
+
+    with engine.connect() as first, engine.connect() as second:
+        first.execute(text("SELECT 1"))
+        second.execute(text("SELECT 1"))
+        in_use = pool_metrics_snapshot()["test-pool"]
+        assert in_use["status"]["checked_out"] == 2
+        assert in_use["status"]["size"] == 2
+
+    idle = db_pool_health()["pools"]["test-pool"]
+    assert idle["pool_class"] == "InstrumentedQueuePool"
+    assert idle["status"]["checked_out"] == 0
+    assert idle["checkout_count"] >= 2
+    assert idle["checkout_seconds_p95"] is not None
+    engine.dispose()
+
+
+def test_histogram_quantile_uses_bucket_upper_bounds():
+    histogram = Histogram("latency", "test", buckets=(0.1, 0.5, 1.0))
+    for value in (0.05, 0.05, 0.3, 0.8, 2.0):
+        histogram.observe(value, route="/x")
+
+    assert histogram.quantile(0.4, route="/x") == 0.1
+    assert histogram.quantile(0.6, route="/x") == 0.5
+    assert histogram.quantile(1.0, route="/x") == 2.0
+    assert histogram.quantile(0.5, route="/missing") is None
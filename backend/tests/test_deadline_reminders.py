@@ -0,0 +1,102 @@
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db.base import Base
+from app.models.assignment import Assignment
+from app.models.course import Course
+from app.models.course import CourseEnrollment
+from app.models.notification import DeadlineReminder
+from app.models.notification import NotificationHistory
+from app.models.submission import Submission
+from app.models.submission import SubmissionFileType
+from app.models.user import User
+from app.models.user import UserRole
+from app.services.deadline_reminders import claim_reminders
+from app.services.deadline_reminders import send_deadline_reminders
+
+NOW = datetime(2026, 10, 18, 9, 0, tzinfo=UTC)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reminders.db'}")
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(settings, "deadline_reminder_hours", "72,24")
+    monkeypatch.setattr(settings, "reminder_batch_size", 2)
+    monkeypatch.setattr(settings, "vapid_private_key", "")
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def course_with_students(db):
+    teacher = User(email="teacher@example.com", name="先生", password_hash="hash", role=UserRole.teacher)
+    db.add(teacher)
+    db.flush()
+    course = Course(title="データ構造", teacher_id=teacher.id)
+    db.add(course)
+    db.flush()
+    students = [
+        User(email=f"student{i}@example.com", name=f"学生{i}", password_hash="hash", role=UserRole.student)
+        for i in range(3)
+    ]
+    db.add_all(students)
+    db.flush()
+    db.add_all(CourseEnrollment(course_id=course.id, user_id=student.id) for student in students)
+    db.commit()
+    return course, students
+
+
+def _assignment(db, course, due_in: timedelta) -> Assignment:
+    assignment = Assignment(course_id=course.id, title="レポート", due_at=NOW + due_in)
+    db.add(assignment)
+    db.commit()
+    return assignment
+
+
+def test_reminds_students_without_submission_once_per_window(db, course_with_students):
+    course, students = course_with_students
+    assignment = _assignment(db, course, timedelta(hours=30))
+    _assignment(db, course, timedelta(days=10))  # まだ対象外
+    db.add(
+        Submission(
+            assignment_id=assignment.id,
+            author_id=students[0].id,
+            file_type=SubmissionFileType.markdown,
+            original_filename="report.md",
+            storage_path="report.md",
+        )
+    )
+    db.commit()
+
+    result = send_deadline_reminders(db, now=NOW)
+    assert (result.candidates, result.claimed) == (2, 2)
+    history = db.query(NotificationHistory).all()
+    assert {row.user_id for row in history} == {students[1].id, students[2].id}
+    assert history[0].body == "あと2日で提出締め切りです。"
+
+    # 同じ時間帯では再送しない
+    assert send_deadline_reminders(db, now=NOW + timedelta(hours=1)).claimed == 0
+    # 24 時間前を過ぎたら次のリマインダー
+    assert send_deadline_reminders(db, now=NOW + timedelta(hours=7)).claimed == 2
+    assert db.query(DeadlineReminder).count() == 4
+    # 締め切り後は送らない
+    assert send_deadline_reminders(db, now=NOW + timedelta(hours=31)).candidates == 0
+
+
+def test_claim_skips_reminders_recorded_by_another_node(db, course_with_students):
+    course, students = course_with_students
+    assignment = _assignment(db, course, timedelta(hours=5))
+    user_ids = [student.id for student in students]
+
+    assert claim_reminders(db, assignment.id, user_ids[:2], "24h") == user_ids[:2]
+    db.commit()
+    assert claim_reminders(db, assignment.id, user_ids, "24h") == user_ids[2:]
@@ -0,0 +1,188 @@
+import asyncio
+import threading
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes import notifications
+from app.api.routes.notifications import _event_stream
+from app.core.security import create_access_token
+from app.core.security import create_stream_token
+from app.core.security import decode_access_token_subject
+from app.core.security import decode_stream_token_subject
+from app.db.base import Base
+from app.models.user import User
+from app.schemas.notification import NotificationType
+from app.services import events
+from app.services import notification_service
+from app.services.events import MemoryBroker
+from app.services.events import RedisBroker
+from app.services.events import user_channel
+from app.services.notification_outbox import enqueue_notification
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = MemoryBroker(max_queue=2)
+    monkeypatch.setattr(events, "get_event_broker", lambda: broker)
+    monkeypatch.setattr(notifications, "get_event_broker", lambda: broker)
+    return broker
+
+
+class _FakeRequest:
+    def __init__(self) -> None:
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+def test_memory_broker_delivers_across_threads_and_drops_when_full(broker):
+    async def _run():
+        async with broker.subscribe("user:1") as queue:
+            assert broker.subscriber_count("user:1") == 1
+            thread = threading.Thread(target=lambda: [broker.publish("user:1", {"n": n}) for n in range(3)])
+            thread.start()
+            thread.join()
+            await asyncio.sleep(0)
+            # キューの上限 (2) を超えた分は捨てられる
+            received = [queue.get_nowait() for _ in range(queue.qsize())]
+        return received
+
+    assert asyncio.run(_run()) == [{"n": 0}, {"n": 1}]
+    assert broker.subscriber_count("user:1") == 0
+
+
+def test_notification_is_published_to_stream(tmp_path, monkeypatch, broker):
+    engine = create_engine(f"sqlite:///{tmp_path / 'events.db'}")
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(notification_service.settings, "vapid_private_key", "")
+    db = sessionmaker(bind=engine)()
+    user = User(email="events@example.com", name="通知 太郎", password_hash="hash")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+
+    async def _run():
+        request = _FakeRequest()
+        stream = _event_stream(request, user_id)
+        assert (await anext(stream)).startswith("retry: ")
+        assert broker.subscriber_count(user_channel(user_id)) == 1
+
+        notification_service.create_notification_history(
+            db, user_id, NotificationType.SYSTEM_INFO, title="お知らせ", body="本文"
+        )
+        message = await anext(stream)
+        request.disconnected = True
+        await stream.aclose()
+        return message
+
+    message = asyncio.run(_run())
+    assert message.startswith("event: notification\ndata: ")
+    assert '"title": "お知らせ"' in message
+    assert broker.subscriber_count(user_channel(user_id)) == 0
+    db.close()
+    engine.dispose()
+
+
+def test_notification_enqueued_with_outbox_is_published_after_commit(tmp_path, broker):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox_events.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    user = User(email="outbox-events@example.com", name="通知 花子", password_hash="hash")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+
+    async def _run():
+        async with broker.subscribe(user_channel(user_id)) as queue:
+            enqueue_notification(db, user_id, NotificationType.REVIEW_RECEIVED, {"assignment_title": "課題"})
+            db.flush()
+            await asyncio.sleep(0)
+            # commit 前には配信しない
+            assert queue.empty()
+            db.commit()
+            return await asyncio.wait_for(queue.get(), timeout=1)
+
+    event = asyncio.run(_run())
+    assert event["type"] == "notification"
+    assert event["data"]["notification_type"] == NotificationType.REVIEW_RECEIVED.value
+
+    # ロールバックした通知は配信しない
+    async def _run_rollback():
+        async with broker.subscribe(user_channel(user_id)) as queue:
+            enqueue_notification(db, user_id, NotificationType.REVIEW_RECEIVED, {"assignment_title": "取り消し"})
+            db.rollback()
+            await asyncio.sleep(0)
+            return queue.empty()
+
+    assert asyncio.run(_run_rollback())
+    db.close()
+    engine.dispose()
+
+
+def test_stream_token_is_scoped_and_not_an_access_token():
+    user_id = uuid4()
+    stream_token = create_stream_token(user_id)
+    access_token = create_access_token({"sub": str(user_id)})
+
+    assert decode_stream_token_subject(stream_token) == user_id
+    # ストリーム用トークンでは API を呼べず、アクセストークンはクエリで受け付けない
+    assert decode_access_token_subject(stream_token) is None
+    assert decode_stream_token_subject(access_token) is None
+    assert decode_access_token_subject(access_token) == user_id
+
+
+class _FakePubSub:
+    def __init__(self, messages, error: Exception | None) -> None:
+        self.messages = messages
+        self.error = error
+        self.closed = False
+
+    def psubscribe(self, _pattern: str) -> None:
+        pass
+
+    def listen(self):
+        if self.error is not None:
+            raise self.error
+        yield from self.messages
+        threading.Event().wait()  # 接続中のまま待つ
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class _FakeRedis:
+    def __init__(self, pubsubs) -> None:
+        self.pubsubs = list(pubsubs)
+
+    def pubsub(self, **_kwargs):
+        return self.pubsubs.pop(0)
+
+
+def test_redis_listener_reconnects_after_connection_error(monkeypatch):
+    monkeypatch.setattr(events, "LISTENER_RETRY_MIN_SECONDS", 0.01)
+    message = {"channel": b"events:user:1", "data": b'{"type": "notification"}'}
+    broken = _FakePubSub([], ConnectionError("connection reset"))
+    healthy = _FakePubSub([message], None)
+    received = threading.Event()
+    delivered: list[tuple[str, dict]] = []
+
+    class _Local:
+        def publish(self, channel, event):
+            delivered.append((channel, event))
+            received.set()
+
+    broker = RedisBroker.__new__(RedisBroker)
+    broker._client = _FakeRedis([broken, healthy])
+    broker.namespace = "events"
+    broker._local = _Local()
+    broker._listener = None
+    broker._listener_lock = threading.Lock()
+
+    broker._ensure_listener()
+    assert received.wait(timeout=2)
+    assert delivered == [("user:1", {"type": "notification"})]
+    assert broken.closed
@@ -0,0 +1,87 @@
+from datetime import UTC
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes.notifications import _notification_history
+from app.db.base import Base
+from app.models.notification import NotificationHistory
+from app.models.user import User
+from app.schemas.notification import NotificationType
+from app.services import notification_service
+from app.services.pagination import InvalidCursorError
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(notification_service.settings, "vapid_private_key", "")
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def user_id(db):
+    user = User(email="history@example.com", name="履歴 太郎", password_hash="hash")
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+def test_counters_follow_create_read_and_broadcast(db, user_id):
+    for i in range(3):
+        notification_service.create_notification_history(
+            db, user_id, NotificationType.SYSTEM_INFO, title=f"お知らせ{i}", body="本文"
+        )
+    notification_service.broadcast_notification(db, [user_id], NotificationType.SYSTEM_INFO, {})
+    assert notification_service.get_notification_counts(db, user_id) == (4, 4)
+
+    first = db.query(NotificationHistory).first()
+    assert notification_service.mark_as_read(db, first.id, user_id)
+    # 既読済みを再度既読にしても数は変わらない
+    assert notification_service.mark_as_read(db, first.id, user_id)
+    assert notification_service.get_notification_counts(db, user_id) == (3, 4)
+
+    assert notification_service.mark_all_as_read(db, user_id) == 3
+    assert notification_service.get_notification_counts(db, user_id) == (0, 4)
+
+
+def test_history_pages_with_keyset_cursor(db, user_id):
+    same_time = datetime(2026, 10, 18, 9, 0, tzinfo=UTC)
+    # created_at が同じ行も id で順序が決まり、ページ間で重複・欠落しない
+    db.add_all(
+        NotificationHistory(
+            user_id=user_id,
+            notification_type="system_info",
+            title=f"通知{i}",
+            body="本文",
+            created_at=same_time if i < 3 else datetime(2026, 10, 18, 10, i, tzinfo=UTC),
+        )
+        for i in range(5)
+    )
+    db.commit()
+    notification_service.bump_notification_counters(db, [user_id], unread=5, total=5)
+    db.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        page = _notification_history(db, user_id, 2, cursor)
+        assert (page.unread_count, page.total_count) == (5, 5)
+        seen.extend(page.notifications)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert len(seen) == 5
+    assert len({n.id for n in seen}) == 5
+    assert [n.title for n in seen[:2]] == ["通知4", "通知3"]
+    assert [n.created_at for n in seen] == sorted((n.created_at for n in seen), reverse=True)
+
+    with pytest.raises(InvalidCursorError):
+        _notification_history(db, user_id, 2, "not-a-cursor")
@@ -0,0 +1,156 @@
+import time
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
+from uuid import UUID
+
+import pytest
+import pywebpush
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db.base import Base
+from app.models.notification import NotificationHistory
+from app.models.notification import NotificationOutbox
+from app.models.notification import PushSubscription
+from app.models.user import User
+from app.models.user import UserRole
+from app.schemas.notification import NotificationType
+from app.services import push_delivery
+from app.services.notification_outbox import OutboxDispatcher
+from app.services.notification_outbox import backoff_seconds
+from app.services.notification_outbox import claim_outbox_batch
+from app.services.notification_outbox import dispatch_outbox_once
+from app.services.notification_outbox import enqueue_notification
+from app.services.notification_outbox import process_outbox_entry
+
+
+class _Response:
+    def __init__(self, status_code: int) -> None:
+        self.status_code = status_code
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(settings, "vapid_private_key", "private")
+    monkeypatch.setattr(settings, "vapid_public_key", "public")
+    monkeypatch.setattr(settings, "outbox_max_attempts", 2)
+    push_delivery.shutdown_push_delivery_pool()
+    yield sessionmaker(bind=engine, expire_on_commit=False)
+    push_delivery.shutdown_push_delivery_pool()
+    engine.dispose()
+
+
+@pytest.fixture
+def user_id(session_factory) -> UUID:
+    with session_factory() as db:
+        user = User(email="outbox@example.com", name="通知 花子", password_hash="hash", role=UserRole.student)
+        db.add(user)
+        db.flush()
+        db.add(PushSubscription(user_id=user.id, endpoint="https://push.example/1", p256dh_key="k", auth_key="a"))
+        enqueue_notification(db, user.id, NotificationType.REVIEW_RECEIVED, {"assignment_title": "課題"})
+        db.commit()
+        return user.id
+
+
+def _fail_webpush(**_kwargs):
+    raise pywebpush.WebPushException("unavailable", response=_Response(503))
+
+
+def _make_due(session_factory) -> None:
+    with session_factory() as db:
+        entry = db.query(NotificationOutbox).one()
+        entry.next_attempt_at = datetime.now(UTC) - timedelta(seconds=1)
+        db.commit()
+
+
+def test_failed_delivery_is_retried_with_backoff_and_history_is_written_once(session_factory, user_id, monkeypatch):
+    monkeypatch.setattr(pywebpush, "webpush", _fail_webpush)
+    result = dispatch_outbox_once(session_factory)
+    assert (result.claimed, result.retried) == (1, 1)
+
+    with session_factory() as db:
+        entry = db.query(NotificationOutbox).one()
+        assert entry.status == "pending"
+        assert entry.attempts == 1
+        assert entry.next_attempt_at.replace(tzinfo=UTC) > datetime.now(UTC)
+    # バックオフ中は確保されない
+    assert dispatch_outbox_once(session_factory).claimed == 0
+
+    _make_due(session_factory)
+    monkeypatch.setattr(pywebpush, "webpush", lambda **_kwargs: _Response(201))
+    assert dispatch_outbox_once(session_factory).sent == 1
+
+    with session_factory() as db:
+        entry = db.query(NotificationOutbox).one()
+        assert (entry.status, entry.attempts, entry.delivered_count) == ("sent", 2, 1)
+        assert db.query(NotificationHistory).filter(NotificationHistory.user_id == user_id).count() == 1
+
+
+def test_entry_fails_after_max_attempts(session_factory, user_id, monkeypatch):
+    monkeypatch.setattr(pywebpush, "webpush", _fail_webpush)
+    dispatch_outbox_once(session_factory)
+    _make_due(session_factory)
+    assert dispatch_outbox_once(session_factory).failed == 1
+
+    with session_factory() as db:
+        entry = db.query(NotificationOutbox).one()
+        assert entry.status == "failed"
+        assert entry.last_error == "all 1 deliveries failed"
+
+
+def test_expired_lease_is_reclaimed(session_factory, user_id, monkeypatch):
+    with session_factory() as db:
+        entry = db.query(NotificationOutbox).one()
+        # 送信中にディスパッチャーが落ちた状態
+        entry.status = "sending"
+        entry.claimed_until = datetime.now(UTC) - timedelta(seconds=1)
+        db.commit()
+
+    monkeypatch.setattr(pywebpush, "webpush", lambda **_kwargs: _Response(201))
+    assert dispatch_outbox_once(session_factory).sent == 1
+
+
+def test_entry_reclaimed_by_another_dispatcher_is_not_sent_twice(session_factory, user_id, monkeypatch):
+    sent: list[dict] = []
+    monkeypatch.setattr(pywebpush, "webpush", lambda **kwargs: sent.append(kwargs) or _Response(201))
+
+    with session_factory() as first, session_factory() as second:
+        (stale,) = claim_outbox_batch(first, limit=10)
+        # 1 つ目のディスパッチャーのリースが切れ、2 つ目が同じ行を取り直した
+        (current,) = claim_outbox_batch(second, limit=10, now=stale.claimed_until + timedelta(seconds=1))
+
+        assert process_outbox_entry(first, stale) is None
+        assert sent == []
+        assert process_outbox_entry(second, current) == "sent"
+
+    assert len(sent) == 1
+    with session_factory() as db:
+        assert db.query(NotificationHistory).filter(NotificationHistory.user_id == user_id).count() == 1
+
+
+def test_backoff_grows_exponentially_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(settings, "outbox_backoff_base_seconds", 10.0)
+    monkeypatch.setattr(settings, "outbox_backoff_max_seconds", 60.0)
+    assert 8.0 <= backoff_seconds(1) <= 12.0
+    assert 32.0 <= backoff_seconds(3) <= 48.0
+    assert backoff_seconds(10) <= 72.0
+
+
+def test_in_process_dispatcher_sends_queued_entries(session_factory, user_id, monkeypatch):
+    monkeypatch.setattr(pywebpush, "webpush", lambda **_kwargs: _Response(201))
+    dispatcher = OutboxDispatcher(session_factory, interval=0.05)
+    dispatcher.start()
+    try:
+        deadline = time.monotonic() + 5
+        status = "pending"
+        while status != "sent" and time.monotonic() < deadline:
+            time.sleep(0.05)
+            with session_factory() as db:
+                status = db.query(NotificationOutbox).one().status
+    finally:
+        dispatcher.stop(timeout=5)
+    assert status == "sent"
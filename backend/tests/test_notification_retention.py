@@ -0,0 +1,103 @@
+from datetime import UTC
+from datetime import datetime
+from datetime import timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.notification import NotificationHistory
+from app.models.notification import NotificationHistoryArchive
+from app.models.notification import NotificationOutbox
+from app.models.user import User
+from app.services import notification_retention
+from app.services import notification_service
+from app.services.notification_retention import compact_notification_history
+
+NOW = datetime(2026, 10, 19, 3, 0, tzinfo=UTC)
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'retention.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _add_history(db, user_id, *, days_ago: int, is_read: bool, title: str) -> None:
+    db.add(
+        NotificationHistory(
+            user_id=user_id,
+            notification_type="system_info",
+            title=title,
+            body="本文",
+            is_read=is_read,
+            created_at=NOW - timedelta(days=days_ago),
+        )
+    )
+    notification_service.bump_notification_counters(db, [user_id], unread=0 if is_read else 1, total=1)
+    db.commit()
+
+
+def test_compaction_archives_expired_and_over_limit_rows(db, monkeypatch):
+    monkeypatch.setattr(notification_retention.settings, "notification_retention_days", 30)
+    monkeypatch.setattr(notification_retention.settings, "notification_keep_per_user", 3)
+    monkeypatch.setattr(notification_retention.settings, "retention_batch_size", 1)
+    user = User(email="retention@example.com", name="保持 太郎", password_hash="hash")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+
+    _add_history(db, user_id, days_ago=1, is_read=False, title="new-unread")
+    _add_history(db, user_id, days_ago=2, is_read=True, title="new-read")
+    _add_history(db, user_id, days_ago=40, is_read=False, title="old-unread")
+    _add_history(db, user_id, days_ago=50, is_read=True, title="old-read")
+    _add_history(db, user_id, days_ago=60, is_read=False, title="oldest-unread")
+
+    result = compact_notification_history(db, now=NOW)
+
+    # 既読の古い 1 件が期限切れ、残り 4 件のうち最も古い 1 件が保持件数の超過
+    assert (result.expired, result.over_limit) == (1, 1)
+    remaining = db.scalars(select(NotificationHistory.title).order_by(NotificationHistory.created_at.desc())).all()
+    assert remaining == ["new-unread", "new-read", "old-unread"]
+    archived = set(db.scalars(select(NotificationHistoryArchive.title)))
+    assert archived == {"old-read", "oldest-unread"}
+    assert notification_service.get_notification_counts(db, user_id) == (2, 3)
+
+    # 2 回目は何もしない
+    assert compact_notification_history(db, now=NOW).archived == 0
+
+
+def test_compaction_purges_finished_outbox_rows(db, monkeypatch):
+    monkeypatch.setattr(notification_retention.settings, "outbox_retention_days", 7)
+    monkeypatch.setattr(notification_retention.settings, "retention_batch_size", 1)
+    user = User(email="outbox-retention@example.com", name="保持 花子", password_hash="hash")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    for status, days_ago in [("sent", 10), ("failed", 8), ("sent", 1), ("pending", 30), ("sending", 30)]:
+        db.add(
+            NotificationOutbox(
+                user_id=user_id,
+                notification_type="system_info",
+                context={},
+                status=status,
+                notification_id=uuid4(),
+                created_at=NOW - timedelta(days=days_ago),
+            )
+        )
+    db.commit()
+
+    result = compact_notification_history(db, now=NOW)
+
+    # 送信待ち・送信中の行は古くても残す
+    assert result.outbox_purged == 2
+    assert result.archived == 0
+    remaining = db.scalars(select(NotificationOutbox.status).order_by(NotificationOutbox.status)).all()
+    assert remaining == ["pending", "sending", "sent"]
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.middleware import ProfilingMiddleware
+from app.api.routes.admin import arm_profiling
+from app.api.routes.admin import profiling_status
+from app.core import profiling
+from app.core.config import settings
+from app.schemas.admin import ProfilingArm
+
+
+@pytest.fixture(autouse=True)
+def _profiling_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "profiling_enabled", True)
+    monkeypatch.setattr(settings, "profiling_dir", str(tmp_path / "profiles"))
+    monkeypatch.setattr(settings, "profiling_interval_seconds", 0.001)
+    monkeypatch.setattr(settings, "profiling_token", "secret")
+    profiling.toggle.reset()
+    yield
+    profiling.toggle.reset()
+
+
+def _busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@profiling.profiled("test_busy_service")
+def _busy_service(seconds: float) -> str:
+    _busy(seconds)
+    return "ok"
+
+
+def test_profiled_function_is_captured_only_when_armed():
+    assert _busy_service(0.01) == "ok"
+    assert profiling.list_profiles() == []
+    assert profiling.SERVICE_CALL_SECONDS.samples()[(("function", "test_busy_service"),)].count >= 1
+
+    arm_profiling(ProfilingArm(target="function", function="test_busy_service"), _admin=None)
+    assert _busy_service(0.05) == "ok"
+    assert _busy_service(0.01) == "ok"
+
+    profiles = profiling.list_profiles()
+    assert [profile.label for profile in profiles] == ["function test_busy_service"]
+    content = profiling.profile_path(profiles[0].id).read_text(encoding="utf-8")
+    assert "tests.test_profiling:_busy:" in content
+
+
+def test_middleware_profiles_requests_with_token_or_reservation():
+    async def app(_scope, _receive, send):
+        _busy(0.03)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = ProfilingMiddleware(app)
+
+    async def _call(path: str, headers: list[tuple[bytes, bytes]]) -> list[tuple[bytes, bytes]]:
+        sent: list[dict] = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            sent.append(message)
+
+        await middleware({"type": "http", "method": "GET", "path": path, "headers": headers}, receive, send)
+        return sent[0]["headers"]
+
+    assert asyncio.run(_call("/reviews", [(b"x-profile", b"wrong")])) == []
+
+    headers = dict(asyncio.run(_call("/reviews", [(b"x-profile", b"secret")])))
+    profile_id = headers[b"x-profile-id"].decode()
+    assert "tests.test_profiling:_busy:" in profiling.profile_path(profile_id).read_text(encoding="utf-8")
+
+    arm_profiling(ProfilingArm(target="request", count=1, path_prefix="/users"), _admin=None)
+    assert asyncio.run(_call("/reviews", [])) == []
+    assert b"x-profile-id" in dict(asyncio.run(_call("/users/ranking", [])))
+    assert asyncio.run(_call("/users/ranking", [])) == []
+
+    status = profiling_status(_admin=None)
+    assert status.armed_requests == 0
+    assert len(status.profiles) == 2
+
+
+def test_arm_profiling_requires_enabled_setting(monkeypatch):
+    monkeypatch.setattr(settings, "profiling_enabled", False)
+    with pytest.raises(HTTPException) as exc:
+        arm_profiling(ProfilingArm(target="request"), _admin=None)
+    assert exc.value.status_code == 409
+    assert profiling.profile_path("../../etc/passwd") is None
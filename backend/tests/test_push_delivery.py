@@ -0,0 +1,166 @@
+import threading
+import time
+from uuid import UUID
+
+import pytest
+import pywebpush
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db import session as db_session
+from app.db.base import Base
+from app.db.query_stats import install_query_instrumentation
+from app.db.query_stats import track_queries
+from app.models.course import Course
+from app.models.course import CourseEnrollment
+from app.models.notification import NotificationHistory
+from app.models.notification import PushSubscription
+from app.models.user import User
+from app.models.user import UserRole
+from app.schemas.notification import NotificationType
+from app.services import push_delivery
+from app.services.notification_service import broadcast_to_course
+from app.services.notification_service import schedule_push_notification
+from app.services.notification_service import send_push_notification
+
+
+class _Response:
+    def __init__(self, status_code: int) -> None:
+        self.status_code = status_code
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'push.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(db_session, "SessionLocal", factory)
+    monkeypatch.setattr(settings, "vapid_private_key", "private")
+    monkeypatch.setattr(settings, "vapid_public_key", "public")
+    monkeypatch.setattr(settings, "push_delivery_workers", 4)
+    monkeypatch.setattr(settings, "push_timeout_seconds", 3.0)
+    install_query_instrumentation()
+    push_delivery.shutdown_push_delivery_pool()
+    yield factory
+    push_delivery.shutdown_push_delivery_pool()
+    engine.dispose()
+
+
+def _user_with_subscriptions(db: Session, endpoints: list[str]) -> UUID:
+    user = User(email="push@example.com", name="通知 太郎", password_hash="hash", role=UserRole.student)
+    db.add(user)
+    db.flush()
+    db.add_all(
+        PushSubscription(user_id=user.id, endpoint=endpoint, p256dh_key="p256dh", auth_key="auth")
+        for endpoint in endpoints
+    )
+    db.commit()
+    return user.id
+
+
+def test_fan_out_is_concurrent_and_removes_gone_subscriptions(session_factory, monkeypatch):
+    endpoints = [
+        "https://push.example/ok-1",
+        "https://push.example/ok-2",
+        "https://push.example/gone",
+        "https://push.example/missing",
+    ]
+    with session_factory() as db:
+        user_id = _user_with_subscriptions(db, endpoints)
+
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+    timeouts: list[float] = []
+
+    def fake_webpush(*, subscription_info, timeout, **_kwargs):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+            timeouts.append(timeout)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        if subscription_info["endpoint"].endswith("/gone"):
+            raise pywebpush.WebPushException("gone", response=_Response(410))
+        if subscription_info["endpoint"].endswith("/missing"):
+            raise pywebpush.WebPushException("missing", response=_Response(404))
+        return _Response(201)
+
+    monkeypatch.setattr(pywebpush, "webpush", fake_webpush)
+
+    sent = send_push_notification(user_id, NotificationType.REVIEW_RECEIVED, {"assignment_title": "課題"})
+
+    assert sent == 2
+    assert peak > 1
+    assert timeouts == [3.0] * len(endpoints)
+    with session_factory() as db:
+        remaining = sorted(subscription.endpoint for subscription in db.query(PushSubscription).all())
+        assert remaining == endpoints[:2]
+
+
+def test_schedule_returns_without_waiting_for_delivery(session_factory, monkeypatch):
+    with session_factory() as db:
+        user_id = _user_with_subscriptions(db, ["https://push.example/slow"])
+
+    release = threading.Event()
+
+    def fake_webpush(**_kwargs):
+        release.wait(5)
+        return _Response(201)
+
+    monkeypatch.setattr(pywebpush, "webpush", fake_webpush)
+
+    started = time.perf_counter()
+    schedule_push_notification(user_id, NotificationType.REVIEW_RECEIVED, {"assignment_title": "課題"})
+    assert time.perf_counter() - started < 0.5
+
+    release.set()
+    push_delivery.shutdown_push_delivery_pool()
+    with session_factory() as db:
+        assert db.query(NotificationHistory).filter(NotificationHistory.user_id == user_id).count() == 1
+
+
+def test_broadcast_to_course_batches_history_and_subscription_queries(session_factory, monkeypatch):
+    with session_factory() as db:
+        teacher = User(email="teacher@example.com", name="先生", password_hash="hash", role=UserRole.teacher)
+        db.add(teacher)
+        db.flush()
+        course = Course(title="データ構造", teacher_id=teacher.id)
+        db.add(course)
+        db.flush()
+        students = [
+            User(email=f"student{i}@example.com", name=f"学生{i}", password_hash="hash", role=UserRole.student)
+            for i in range(30)
+        ]
+        db.add_all(students)
+        db.flush()
+        db.add_all(CourseEnrollment(course_id=course.id, user_id=student.id) for student in students)
+        db.add_all(
+            PushSubscription(user_id=student.id, endpoint=f"https://push.example/{i}", p256dh_key="k", auth_key="a")
+            for i, student in enumerate(students[:10])
+        )
+        db.commit()
+        course_id = course.id
+
+    def fake_webpush(*, subscription_info, **_kwargs):
+        if subscription_info["endpoint"].endswith("/0"):
+            raise pywebpush.WebPushException("gone", response=_Response(410))
+        return _Response(201)
+
+    monkeypatch.setattr(pywebpush, "webpush", fake_webpush)
+
+    with session_factory() as db, track_queries() as stats:
+        result = broadcast_to_course(
+            db, course_id, NotificationType.SUBMISSION_DUE, {"days_left": 1, "assignment_id": "a1"}
+        )
+
+    assert (result.recipients, result.subscriptions, result.sent, result.removed) == (30, 10, 9, 1)
+    # 受講者 1 + 履歴 INSERT 1 + 通知数の UPSERT 1 + サブスクリプション 1 + 失効削除 1
+    assert stats.count == 5
+    with session_factory() as db:
+        assert db.query(NotificationHistory).count() == 30
+        assert db.query(PushSubscription).count() == 9
@@ -0,0 +1,97 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.api.middleware import DB_QUERIES_PER_REQUEST
+from app.api.middleware import QueryInstrumentationMiddleware
+from app.core.metrics import Counter
+from app.core.metrics import Histogram
+from app.core.metrics import MetricsRegistry
+from app.core.metrics import render_prometheus
+from app.db.query_stats import install_query_instrumentation
+from app.db.query_stats import track_queries
+
+
+def test_track_queries_counts_only_inside_block(tmp_path):
+    install_query_instrumentation()
+    engine = create_engine(f"sqlite:///{tmp_path / 'q.db'}")
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        with track_queries() as stats:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+        connection.execute(text("SELECT 3"))
+
+    assert stats.count == 2
+    assert stats.total_seconds >= stats.slowest_seconds > 0
+    assert stats.slowest_statement in {"SELECT 1", "SELECT 2"}
+    engine.dispose()
+
+
+def test_middleware_records_sync_and_async_routes(tmp_path):
+    install_query_instrumentation()
+    url = tmp_path / "app.db"
+    engine = create_engine(f"sqlite:///{url}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{url}")
+
+    api = FastAPI()
+
+    @api.get("/items/{item_id}")
+    def sync_route(item_id: int) -> dict:
+        with engine.connect() as connection:
+            for _ in range(3):
+                connection.execute(text("SELECT 1"))
+        return {"id": item_id}
+
+    @api.get("/async")
+    async def async_route() -> dict:
+        async with async_engine.connect() as connection:
+            await connection.run_sync(lambda conn: conn.execute(text("SELECT 1")))
+            await connection.execute(text("SELECT 2"))
+        return {}
+
+    app = QueryInstrumentationMiddleware(api, server_timing=True)
+
+    async def _run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.get("/items/1")
+            await client.get("/items/2")
+            second = await client.get("/async")
+        await async_engine.dispose()
+        return first, second
+
+    sync_response, async_response = asyncio.run(_run())
+
+    assert 'desc="3 queries"' in sync_response.headers["server-timing"]
+    assert 'desc="2 queries"' in async_response.headers["server-timing"]
+    # 実パスではなくルートのテンプレートごとに集計される
+    sample = DB_QUERIES_PER_REQUEST.samples()[(("method", "GET"), ("route", "/items/{item_id}"))]
+    assert sample.count >= 2
+    assert "db_queries_per_request_count" in render_prometheus()
+    engine.dispose()
+
+
+def test_render_prometheus_text_format():
+    target = MetricsRegistry()
+    counter = target.counter("jobs_total", "Jobs")
+    assert isinstance(counter, Counter)
+    counter.inc(2, queue='a"b')
+    histogram = target.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    assert isinstance(histogram, Histogram)
+    histogram.observe(0.05, route="/x")
+    histogram.observe(3.0, route="/x")
+
+    lines = render_prometheus(target).splitlines()
+
+    assert "# TYPE jobs_total counter" in lines
+    assert 'jobs_total{queue="a\\"b"} 2' in lines
+    assert 'latency_seconds_bucket{route="/x",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/x",le="1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/x",le="+Inf"} 2' in lines
+    assert 'latency_seconds_count{route="/x"} 2' in lines
+    assert 'latency_seconds_sum{route="/x"} 3.05' in lines
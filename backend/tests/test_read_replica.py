@@ -0,0 +1,121 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from app.api.middleware import ReadAfterWriteMiddleware
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db import replica
+from app.db import session as db_session
+
+
+@pytest.fixture(autouse=True)
+def _reset_replica_state():
+    replica.reset_replica_lag_samples()
+    replica.get_primary_pin_cache.cache_clear()
+    yield
+    replica.reset_replica_lag_samples()
+    replica.get_primary_pin_cache.cache_clear()
+
+
+@pytest.fixture
+def engines(tmp_path, monkeypatch):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}", pool_logging_name="test-primary")
+    replica_engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}", pool_logging_name="test-replica")
+    monkeypatch.setattr(db_session, "SessionLocal", sessionmaker(bind=primary))
+    monkeypatch.setattr(db_session, "replica_engine", replica_engine)
+    monkeypatch.setattr(db_session, "ReplicaSessionLocal", sessionmaker(bind=replica_engine))
+    yield primary, replica_engine
+    primary.dispose()
+    replica_engine.dispose()
+
+
+def _request(method: str = "GET", token: str | None = None) -> Request:
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    return Request({"type": "http", "method": method, "path": "/", "headers": headers, "query_string": b""})
+
+
+def _bound_engine(request: Request):
+    dependency = db_session.get_read_db(request)
+    db = next(dependency)
+    try:
+        return db.get_bind()
+    finally:
+        dependency.close()
+
+
+def test_read_db_uses_replica_until_user_writes(engines):
+    primary, replica_engine = engines
+    user_id = uuid.uuid4()
+    token = create_access_token({"sub": str(user_id)})
+
+    assert _bound_engine(_request(token=token)) is replica_engine
+    # 書き込み系のメソッドは常にプライマリ
+    assert _bound_engine(_request("POST", token=token)) is primary
+
+    replica.pin_to_primary(user_id)
+    assert _bound_engine(_request(token=token)) is primary
+    # 他のユーザーや未認証の読み取りは引き続きレプリカ
+    assert _bound_engine(_request(token=create_access_token({"sub": str(uuid.uuid4())}))) is replica_engine
+    assert _bound_engine(_request()) is replica_engine
+
+
+def test_read_db_falls_back_to_primary_when_replica_lags(engines, monkeypatch):
+    primary, replica_engine = engines
+    monkeypatch.setattr(settings, "replica_max_lag_seconds", 5.0)
+    monkeypatch.setattr(replica, "_measure_lag", lambda _connection: 12.0)
+
+    assert _bound_engine(_request()) is primary
+
+    # 計測結果は間隔内で再利用され、期限が切れると測り直す
+    monkeypatch.setattr(replica, "_measure_lag", lambda _connection: 0.5)
+    assert _bound_engine(_request()) is primary
+    replica.reset_replica_lag_samples()
+    assert _bound_engine(_request()) is replica_engine
+
+
+def test_read_db_uses_primary_without_replica(engines, monkeypatch):
+    primary, _ = engines
+    monkeypatch.setattr(db_session, "replica_engine", None)
+    monkeypatch.setattr(db_session, "ReplicaSessionLocal", None)
+
+    assert _bound_engine(_request()) is primary
+
+
+def test_middleware_pins_user_after_successful_write():
+    user_id = uuid.uuid4()
+    token = create_access_token({"sub": str(user_id)})
+
+    def _app_returning(status: int):
+        async def app(_scope, _receive, send):
+            await send({"type": "http.response.start", "status": status, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        return ReadAfterWriteMiddleware(app)
+
+    async def _call(app, method: str):
+        scope = {
+            "type": "http",
+            "method": method,
+            "path": "/",
+            "headers": [(b"authorization", f"Bearer {token}".encode())],
+        }
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(_message):
+            return None
+
+        await app(scope, receive, send)
+
+    asyncio.run(_call(_app_returning(200), "GET"))
+    asyncio.run(_call(_app_returning(422), "POST"))
+    assert not replica.is_pinned_to_primary(user_id)
+
+    asyncio.run(_call(_app_returning(201), "POST"))
+    assert replica.is_pinned_to_primary(user_id)
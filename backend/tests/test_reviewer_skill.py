@@ -0,0 +1,233 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes.courses import list_course_student_reviewer_skills
+from app.api.routes.reviews import submit_review
+from app.api.routes.submissions import set_teacher_grade
+from app.core.config import REVIEWER_SKILL_TEMPLATE
+from app.db.base import Base
+from app.models.assignment import Assignment
+from app.models.assignment import RubricCriterion
+from app.models.course import Course
+from app.models.course import CourseEnrollment
+from app.models.review import Review
+from app.models.review import ReviewAssignment
+from app.models.review import ReviewAssignmentStatus
+from app.models.review import ReviewRubricScore
+from app.models.reviewer_skill_stat import ReviewerSkillStat
+from app.models.submission import Submission
+from app.models.submission import SubmissionRubricScore
+from app.models.user import User
+from app.models.user import UserRole
+from app.schemas.review import ReviewSubmit
+from app.schemas.review import RubricScore
+from app.schemas.submission import TeacherGradeSubmit
+from app.schemas.submission import TeacherRubricScore
+from app.services.reviewer_skill import apply_reviewer_skill_contributions
+from app.services.reviewer_skill import calculate_reviewer_skill
+from app.services.reviewer_skill import calculate_reviewer_skills
+from app.services.reviewer_skill import get_reviewer_skill_from_stats
+from app.services.reviewer_skill import rebuild_reviewer_skill_stats
+from app.services.reviewer_skill import reviewer_skill_contributions
+from app.services.rubric import ensure_fixed_rubric
+
+
+def _make_session():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(bind=engine)()
+
+
+def _seed(db, reviewer_scores: list[int]):
+    teacher = User(email="teacher@example.com", name="Teacher", password_hash="t")
+    author = User(email="author@example.com", name="Author", password_hash="x")
+    db.add_all([teacher, author])
+    db.flush()
+    course = Course(title="C1", teacher_id=teacher.id)
+    db.add(course)
+    db.flush()
+    assignment = Assignment(title="A1", course_id=course.id)
+    db.add(assignment)
+    db.flush()
+    criteria = [
+        RubricCriterion(assignment_id=assignment.id, name=item["name"], max_score=5, order_index=i)
+        for i, item in enumerate(REVIEWER_SKILL_TEMPLATE)
+    ]
+    db.add_all(criteria)
+    submission = Submission(
+        assignment_id=assignment.id,
+        author_id=author.id,
+        file_type="markdown",
+        original_filename="f.md",
+        storage_path="/tmp/f",
+    )
+    db.add(submission)
+    db.flush()
+    db.add_all(SubmissionRubricScore(submission_id=submission.id, criterion_id=c.id, score=5) for c in criteria)
+
+    reviewers: list[User] = []
+    for i, score in enumerate(reviewer_scores):
+        reviewer = User(email=f"rev{i}@example.com", name=f"Rev{i}", password_hash="y")
+        db.add(reviewer)
+        db.flush()
+        ra = ReviewAssignment(
+            assignment_id=assignment.id,
+            submission_id=submission.id,
+            reviewer_id=reviewer.id,
+            status=ReviewAssignmentStatus.submitted,
+        )
+        db.add(ra)
+        db.flush()
+        review = Review(review_assignment_id=ra.id, comment="ok")
+        db.add(review)
+        db.flush()
+        db.add_all(ReviewRubricScore(review_id=review.id, criterion_id=c.id, score=score) for c in criteria)
+        reviewers.append(reviewer)
+    db.commit()
+    return course, assignment, reviewers
+
+
+def test_batch_skills_match_single_reviewer_computation():
+    _, db = _make_session()
+    course, assignment, reviewers = _seed(db, [5, 3, 1])
+    reviewers[2].reviewer_skill_override_logic = 4.5
+    db.commit()
+
+    skills = calculate_reviewer_skills(db, course_id=course.id)
+
+    assert set(skills) == {r.id for r in reviewers}
+    assert skills[reviewers[0].id].overall == pytest.approx(5.0)
+    assert skills[reviewers[1].id].logic == pytest.approx(1.0 + 4.0 * 0.6)
+    assert skills[reviewers[2].id].logic == pytest.approx(4.5)
+    for reviewer in reviewers:
+        assert skills[reviewer.id] == calculate_reviewer_skill(db, reviewer_id=reviewer.id)
+        assert calculate_reviewer_skills(db, assignment_id=assignment.id)[reviewer.id] == skills[reviewer.id]
+
+
+def test_batch_skills_use_fixed_number_of_queries():
+    def _count(reviewer_count: int) -> int:
+        engine, db = _make_session()
+        course, _, _ = _seed(db, [4] * reviewer_count)
+        statements: list[str] = []
+
+        def _before_cursor_execute(conn, cursor, statement, *_args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        calculate_reviewer_skills(db, course_id=course.id)
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+        return len(statements)
+
+    assert _count(1) == _count(8)
+
+
+def test_course_student_reviewer_skills_lists_every_enrolled_student():
+    _, db = _make_session()
+    course, _, reviewers = _seed(db, [5, 1])
+    newcomer = User(email="new@example.com", name="New", password_hash="z")
+    db.add(newcomer)
+    db.flush()
+    db.add_all(CourseEnrollment(course_id=course.id, user_id=user.id) for user in [*reviewers, newcomer])
+    db.commit()
+
+    rows = list_course_student_reviewer_skills(course.id, db=db, current_user=course.teacher)
+
+    skills = calculate_reviewer_skills(db, course_id=course.id)
+    assert [row.name for row in rows] == ["Rev0", "Rev1", "New"]
+    assert [row.reviewer_skill for row in rows[:2]] == [skills[reviewers[0].id], skills[reviewers[1].id]]
+    # まだレビューしていない受講生も、未評価のスキルとして含める
+    assert rows[2].reviewer_skill == calculate_reviewer_skill(db, reviewer_id=newcomer.id)
+
+
+def test_unknown_reviewer_gets_zero_skill():
+    _, db = _make_session()
+    _seed(db, [])
+    user = User(email="new@example.com", name="New", password_hash="n")
+    db.add(user)
+    db.commit()
+
+    skill = calculate_reviewer_skill(db, reviewer_id=user.id)
+    assert skill.overall == 0.0
+    assert skill.logic == 0.0
+
+
+def test_skill_stats_follow_review_submission_and_teacher_regrade():
+    _, db = _make_session()
+    teacher = User(email="teacher@example.com", name="Teacher", password_hash="t", role=UserRole.teacher)
+    author = User(email="author@example.com", name="Author", password_hash="x")
+    reviewer = User(email="rev@example.com", name="Rev", password_hash="y")
+    db.add_all([teacher, author, reviewer])
+    db.flush()
+    assignment = Assignment(title="A1")
+    db.add(assignment)
+    db.flush()
+    submission = Submission(
+        assignment_id=assignment.id,
+        author_id=author.id,
+        file_type="markdown",
+        original_filename="f.md",
+        storage_path="/tmp/f",
+    )
+    db.add(submission)
+    db.flush()
+    criteria = ensure_fixed_rubric(db, assignment.id)
+    ra = ReviewAssignment(assignment_id=assignment.id, submission_id=submission.id, reviewer_id=reviewer.id)
+    db.add(ra)
+    db.commit()
+
+    def _grade(score: int) -> None:
+        set_teacher_grade(
+            submission.id,
+            TeacherGradeSubmit(
+                teacher_total_score=score * 4,
+                rubric_scores=[TeacherRubricScore(criterion_id=c.id, score=score) for c in criteria],
+            ),
+            db=db,
+            _teacher=teacher,
+        )
+
+    _grade(5)
+    submit_review(
+        ra.id,
+        ReviewSubmit(comment="Nice job", rubric_scores=[RubricScore(criterion_id=c.id, score=4) for c in criteria]),
+        db=db,
+        current_user=reviewer,
+    )
+    stat = db.query(ReviewerSkillStat).filter(ReviewerSkillStat.reviewer_id == reviewer.id).one()
+    assert stat.logic_count == 1
+    assert stat.logic_sum == pytest.approx(0.8)
+    assert get_reviewer_skill_from_stats(db, reviewer) == calculate_reviewer_skill(db, reviewer_id=reviewer.id)
+
+    _grade(2)
+    db.refresh(stat)
+    assert stat.logic_count == 1
+    assert stat.logic_sum == pytest.approx(0.6)
+    assert get_reviewer_skill_from_stats(db, reviewer) == calculate_reviewer_skill(db, reviewer_id=reviewer.id)
+    assert rebuild_reviewer_skill_stats(db) == 0
+
+    stat.evidence_sum = 0.0
+    db.commit()
+    assert rebuild_reviewer_skill_stats(db) == 1
+    assert rebuild_reviewer_skill_stats(db) == 0
+
+
+def test_skill_stats_are_read_without_writes_and_created_idempotently():
+    _, db = _make_session()
+    _, _, reviewers = _seed(db, [4])
+    reviewer = reviewers[0]
+
+    # GET 用の読み取りは集計行を作らない
+    assert get_reviewer_skill_from_stats(db, reviewer) == calculate_reviewer_skill(db, reviewer_id=reviewer.id)
+    assert not db.new
+    assert db.query(ReviewerSkillStat).count() == 0
+
+    contributions = reviewer_skill_contributions(db, submission_id=db.query(Submission.id).scalar())
+    apply_reviewer_skill_contributions(db, contributions)
+    # 行が既にあれば作成は ON CONFLICT で何もせず（主キー違反にしない）、差分の加減算だけを行う
+    apply_reviewer_skill_contributions(db, contributions, sign=-1)
+    apply_reviewer_skill_contributions(db, contributions)
+    db.commit()
+    assert db.query(ReviewerSkillStat).count() == 1
+    assert rebuild_reviewer_skill_stats(db) == 0
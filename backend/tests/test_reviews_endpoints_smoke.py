@@ -1,12 +1,12 @@
-from fastapi import BackgroundTasks
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-from app.api.routes.reviews import received_reviews
+from app.api.routes.reviews import _received_reviews
 from app.api.routes.reviews import submit_review
 from app.db.base import Base
 from app.models.assignment import Assignment
 from app.models.assignment import RubricCriterion
+from app.models.notification import NotificationOutbox
 from app.models.review import ReviewAssignment
 from app.models.submission import Submission
 from app.models.submission import SubmissionRubricScore
@@ -67,14 +67,16 @@ def test_submit_and_receive_review_smoke():
     rubric_scores = [RubricScore(criterion_id=c.id, score=4) for c in criteria]
     payload = ReviewSubmit(comment="Nice job", rubric_scores=rubric_scores)
 
-    # BackgroundTasksをモックしてsubmit_reviewを直接呼び出し
-    background_tasks = BackgroundTasks()
-    review = submit_review(ra.id, payload, background_tasks=background_tasks, db=db, current_user=reviewer)
+    review = submit_review(ra.id, payload, db=db, current_user=reviewer)
 
     assert review.comment == "Nice job"
+    # 提出者への通知はレビューと同じコミットでアウトボックスに積まれる
+    outbox = db.query(NotificationOutbox).one()
+    assert outbox.user_id == author.id
+    assert outbox.status == "pending"
 
-    # Call received_reviews for the author
-    received = received_reviews(assignment_id=assignment.id, db=db, current_user=author)
+    # Call received reviews for the author
+    received = _received_reviews(db, assignment.id, author)
     assert isinstance(received, list)
     assert len(received) == 1
     r = received[0]
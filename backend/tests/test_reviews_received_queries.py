@@ -0,0 +1,118 @@
+from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.api.routes.reviews import _received_reviews
+from app.api.routes.reviews import list_reviews_for_submission
+from app.db.base import Base
+from app.models.assignment import Assignment
+from app.models.assignment import RubricCriterion
+from app.models.review import MetaReview
+from app.models.review import Review
+from app.models.review import ReviewAssignment
+from app.models.review import ReviewAssignmentStatus
+from app.models.review import ReviewRubricScore
+from app.models.submission import Submission
+from app.models.submission import SubmissionRubricScore
+from app.models.user import User
+from app.models.user import UserRole
+
+
+def _make_session():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(bind=engine)()
+
+
+def _seed(db, review_count: int):
+    assignment = Assignment(title="A1", target_reviews_per_submission=review_count)
+    db.add(assignment)
+    db.flush()
+    criteria = [
+        RubricCriterion(assignment_id=assignment.id, name=f"C{i}", max_score=5, order_index=i) for i in range(4)
+    ]
+    author = User(email="author@example.com", name="Author", password_hash="x")
+    teacher = User(email="teacher@example.com", name="Teacher", password_hash="t", role=UserRole.teacher)
+    db.add_all([*criteria, author, teacher])
+    db.flush()
+    submission = Submission(
+        assignment_id=assignment.id,
+        author_id=author.id,
+        file_type="markdown",
+        original_filename="f.md",
+        storage_path="/tmp/f",
+    )
+    db.add(submission)
+    db.flush()
+    db.add_all(SubmissionRubricScore(submission_id=submission.id, criterion_id=c.id, score=4) for c in criteria)
+
+    for i in range(review_count):
+        reviewer = User(email=f"rev{i}@example.com", name=f"Rev{i}", password_hash="y")
+        db.add(reviewer)
+        db.flush()
+        ra = ReviewAssignment(
+            assignment_id=assignment.id,
+            submission_id=submission.id,
+            reviewer_id=reviewer.id,
+            status=ReviewAssignmentStatus.submitted,
+        )
+        db.add(ra)
+        db.flush()
+        review = Review(review_assignment_id=ra.id, comment=f"comment {i}")
+        db.add(review)
+        db.flush()
+        db.add_all(ReviewRubricScore(review_id=review.id, criterion_id=c.id, score=3) for c in criteria)
+        db.add(MetaReview(review_id=review.id, rater_id=author.id, helpfulness=4))
+    db.commit()
+    return assignment, submission, author, teacher
+
+
+def _count_queries(engine, fn) -> int:
+    statements: list[str] = []
+
+    def _before_cursor_execute(conn, cursor, statement, *_args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+    return len(statements)
+
+
+def _measure(review_count: int) -> tuple[int, int]:
+    engine, db = _make_session()
+    assignment, submission, author, teacher = _seed(db, review_count)
+
+    db.expire_all()
+    received_queries = _count_queries(
+        engine,
+        lambda: _received_reviews(db, assignment.id, author),
+    )
+    db.expire_all()
+    teacher_queries = _count_queries(
+        engine,
+        lambda: list_reviews_for_submission(submission_id=submission.id, db=db, _teacher=teacher),
+    )
+    return received_queries, teacher_queries
+
+
+def test_received_reviews_query_count_does_not_grow_with_reviews():
+    assert _measure(1) == _measure(6)
+
+
+def test_received_reviews_returns_preloaded_scores_and_credit():
+    _, db = _make_session()
+    assignment, submission, author, teacher = _seed(db, 3)
+    db.expire_all()
+
+    received = _received_reviews(db, assignment.id, author)
+    assert len(received) == 3
+    for r in received:
+        assert len(r.rubric_scores) == 4
+        assert r.meta_review is not None
+        assert r.rubric_alignment_score is not None
+
+    listed = list_reviews_for_submission(submission_id=submission.id, db=db, _teacher=teacher)
+    assert [r.id for r in listed] == [r.id for r in received]
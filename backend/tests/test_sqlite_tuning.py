@@ -0,0 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.sqlite import configure_sqlite_engine
+from app.models.user import User
+
+
+def _make_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tuned.db'}", connect_args={"check_same_thread": False})
+    configure_sqlite_engine(engine, serialize_writes=True)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def test_sqlite_pragmas_are_applied_per_connection(tmp_path):
+    engine = _make_engine(tmp_path)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    engine.dispose()
+
+
+def test_concurrent_writers_are_serialized_without_lock_errors(tmp_path):
+    engine = _make_engine(tmp_path)
+    session_factory = sessionmaker(bind=engine)
+
+    def _write(i: int) -> None:
+        with session_factory() as db:
+            db.add(User(email=f"u{i}@example.com", name=f"U{i}", password_hash="x"))
+            db.flush()
+            db.query(User).filter(User.email == f"u{i}@example.com").update({User.credits: i})
+            db.commit()
+            assert "sqlite_write_lock_held" not in db.info
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(_write, range(40)))
+
+    with session_factory() as db:
+        assert db.query(User).count() == 40
+        # 読み取りだけのセッションはロックを取らない
+        assert "sqlite_write_lock_held" not in db.info
+    engine.dispose()
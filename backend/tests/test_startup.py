@@ -0,0 +1,67 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db import migrations
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def _engine_at_revision(tmp_path, revision: str):
+    engine = create_engine(f"sqlite:///{tmp_path / 'startup.db'}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL PRIMARY KEY)"))
+        connection.execute(text("INSERT INTO alembic_version (version_num) VALUES (:revision)"), {"revision": revision})
+    return engine
+
+
+def test_import_app_main_does_not_load_alembic_or_webpush():
+    code = "import sys, app.main; print(sorted(m for m in ('alembic', 'sqlmodel', 'pywebpush') if m in sys.modules))"
+    completed = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    assert completed.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_run_migrations_uses_cached_head_without_alembic(tmp_path, monkeypatch):
+    cache_path = tmp_path / "head.json"
+    heads = migrations.write_head_cache(cache_path)
+    assert migrations.read_cached_heads(cache_path) == heads
+
+    monkeypatch.setattr(migrations, "HEAD_CACHE_PATH", cache_path)
+    monkeypatch.setattr(settings, "run_migrations_on_startup", True)
+
+    def _fail() -> set[str]:
+        raise AssertionError("Alembic should not be consulted when the cached head matches")
+
+    monkeypatch.setattr(migrations, "script_heads", _fail)
+    engine = _engine_at_revision(tmp_path, next(iter(heads)))
+    try:
+        migrations.run_migrations(engine)
+    finally:
+        engine.dispose()
+
+
+def test_cached_head_is_ignored_when_versions_change(tmp_path):
+    versions_dir = tmp_path / "versions"
+    versions_dir.mkdir()
+    (versions_dir / "0001_initial.py").write_text("revision = '0001'\n", encoding="utf-8")
+    cache_path = tmp_path / "head.json"
+    cache_path.write_text(
+        f'{{"heads": ["0001"], "fingerprint": "{migrations.versions_fingerprint(versions_dir)}"}}', encoding="utf-8"
+    )
+    assert migrations.read_cached_heads(cache_path, versions_dir) == {"0001"}
+
+    # サイズが同じままの書き換えも検出する
+    (versions_dir / "0001_initial.py").write_text("revision = '0009'\n", encoding="utf-8")
+    assert migrations.read_cached_heads(cache_path, versions_dir) is None
+    (versions_dir / "0001_initial.py").write_text("revision = '0001'\n", encoding="utf-8")
+    assert migrations.read_cached_heads(cache_path, versions_dir) == {"0001"}
+
+    (versions_dir / "0002_next.py").write_text("revision = '0002'\n", encoding="utf-8")
+    assert migrations.read_cached_heads(cache_path, versions_dir) is None
+    assert migrations.read_cached_heads(tmp_path / "missing.json", versions_dir) is None
@@ -0,0 +1,83 @@
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.security import create_access_token
+from app.db.base import Base
+from app.models.user import User
+from app.models.user import UserRole
+from app.services.auth import get_current_user
+from app.services.cache import MemoryCache
+from app.services.credits import CREDIT_REASON_ADMIN_ADJUSTMENT
+from app.services.credits import record_credit_history
+from app.services.user_cache import get_user_cache
+
+
+def _make_session():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(bind=engine, expire_on_commit=False)
+
+
+def _count_queries(engine, fn):
+    statements: list[str] = []
+
+    def _before_cursor_execute(conn, cursor, statement, *_args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+    return result, len(statements)
+
+
+def test_current_user_is_served_from_cache_until_invalidated():
+    engine, session_factory = _make_session()
+    with session_factory() as db:
+        user = User(email="u@example.com", name="U", password_hash="hash", role=UserRole.teacher, credits=3)
+        db.add(user)
+        db.commit()
+        user_id = user.id
+    token = create_access_token({"sub": str(user_id)})
+    get_user_cache().delete(str(user_id))
+
+    with session_factory() as db:
+        _, first_queries = _count_queries(engine, lambda: get_current_user(token=token, db=db))
+    assert first_queries == 1
+
+    with session_factory() as db:
+        cached, cached_queries = _count_queries(engine, lambda: get_current_user(token=token, db=db))
+        assert cached_queries == 0
+        assert cached.id == user_id
+        assert cached.role == UserRole.teacher
+        assert cached.credits == 3
+        # キャッシュに含めないカラムは必要になった時点で読み込まれる
+        assert cached.password_hash == "hash"
+
+        cached.credits = 10
+        record_credit_history(db, user=cached, delta=7, total_credits=10, reason=CREDIT_REASON_ADMIN_ADJUSTMENT)
+        db.commit()
+
+    with session_factory() as db:
+        fresh, fresh_queries = _count_queries(engine, lambda: get_current_user(token=token, db=db))
+    assert fresh_queries == 1
+    assert fresh.credits == 10
+
+
+def test_memory_cache_evicts_least_recently_used_and_expired_entries():
+    cache = MemoryCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+    cache.set("short", 4, ttl_seconds=0.01)
+    time.sleep(0.02)
+    assert cache.get("short") is None
@@ -62,6 +62,7 @@ import type {
   UserPublic,
   RephraseResponse,
 } from "@/lib/types";
+import { subscribeNotificationStream } from "@/lib/notifications";
 import { REVIEWER_SKILL_AXES } from "@/lib/reviewerSkill";
 import { ErrorMessages } from "@/components/ErrorMessages";
 import { RadarSkillChart } from "@/components/RadarSkillChart";
@@ -862,6 +863,18 @@ export default function AssignmentDetailPage() {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [token, user, assignmentId]);
 
+  useEffect(() => {
+    if (!token || !user || user.role === "teacher") return;
+    // この課題へのレビューが届いたら、受け取ったレビュー一覧を取り直す
+    return subscribeNotificationStream({
+      onReviewReceived: (event) => {
+        if (event.assignment_id === assignmentId) void loadReceived();
+      },
+    });
+    // NOTE: loadReceived は毎回作り直されるため、接続し直さないよう dependency から外しています。
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [token, user, assignmentId]);
+
   useEffect(() => {
     if (!token || user?.role !== "teacher" || !assignment?.course_id) return;
     void loadCourseStudents();
@@ -5,6 +5,7 @@ import { Bell, Loader2, ChevronRight } from 'lucide-react';
 import Link from 'next/link';
 import {
     getNotificationHistory,
+    subscribeNotificationStream,
     type NotificationItem,
 } from '@/lib/notifications';
 
@@ -50,6 +51,16 @@ export function RecentNotifications() {
         fetchNotifications();
     }, [fetchNotifications]);
 
+    useEffect(() => {
+        // 新しい通知を先頭に追加する
+        return subscribeNotificationStream({
+            onNotification: (notification) => {
+                setNotifications((prev) => [notification, ...prev.filter((n) => n.id !== notification.id)].slice(0, 5));
+                setUnreadCount((prev) => prev + 1);
+            },
+        });
+    }, []);
+
     if (isLoading) {
         return (
             <div className="flex items-center justify-center py-8 text-slate-400">
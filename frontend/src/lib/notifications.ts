@@ -194,12 +194,13 @@ export type NotificationHistoryResponse = {
     notifications: NotificationItem[];
     unread_count: number;
     total_count: number;
+    next_cursor: string | null;
 };
 
 /**
  * 通知履歴を取得する
  */
-export async function getNotificationHistory(limit = 50, offset = 0): Promise<NotificationHistoryResponse | null> {
+export async function getNotificationHistory(limit = 50, cursor?: string | null): Promise<NotificationHistoryResponse | null> {
     try {
         const token = localStorage.getItem('pure-review-token') ?? sessionStorage.getItem('pure-review-token');
         if (!token) {
@@ -207,8 +208,12 @@ export async function getNotificationHistory(limit = 50, offset = 0): Promise<No
             return null;
         }
 
+        const params = new URLSearchParams({ limit: String(limit) });
+        if (cursor) {
+            params.set('cursor', cursor);
+        }
         const response = await fetch(
-            `${API_BASE_URL}/notifications/history?limit=${limit}&offset=${offset}`,
+            `${API_BASE_URL}/notifications/history?${params.toString()}`,
             {
                 method: 'GET',
                 headers: {
@@ -228,6 +233,104 @@ export async function getNotificationHistory(limit = 50, offset = 0): Promise<No
     }
 }
 
+export type ReviewReceivedEvent = {
+    assignment_id: string;
+    review_id: string;
+};
+
+export type NotificationStreamHandlers = {
+    onNotification?: (notification: NotificationItem) => void;
+    onReviewReceived?: (event: ReviewReceivedEvent) => void;
+};
+
+const STREAM_RECONNECT_DELAY_MS = 5000;
+
+/**
+ * ストリーム接続用の短命トークンを取得する
+ */
+async function fetchStreamToken(token: string): Promise<string | null> {
+    const response = await fetch(`${API_BASE_URL}/notifications/stream-token`, {
+        method: 'POST',
+        headers: {
+            'Authorization': `Bearer ${token}`
+        }
+    });
+    if (!response.ok) {
+        throw new Error(`Failed to fetch stream token: ${response.status}`);
+    }
+    const data = await response.json();
+    return data.token ?? null;
+}
+
+/**
+ * 新しい通知・レビューの到着をサーバーから受け取り続ける（Server-Sent Events）
+ *
+ * EventSource はヘッダーを付けられないため、ログイン用のトークンではなく
+ * POST /notifications/stream-token で受け取った短命のトークンをクエリで渡す。
+ * トークンは接続時にだけ検証されるので、切断したら新しいトークンを取り直して再接続する。
+ * 戻り値の関数で購読を終了する。
+ */
+export function subscribeNotificationStream(handlers: NotificationStreamHandlers): () => void {
+    const token = localStorage.getItem('pure-review-token') ?? sessionStorage.getItem('pure-review-token');
+    if (!token || typeof EventSource === 'undefined') {
+        return () => {};
+    }
+
+    let source: EventSource | null = null;
+    let retryTimer: ReturnType<typeof setTimeout> | null = null;
+    let closed = false;
+
+    const scheduleReconnect = () => {
+        if (closed || retryTimer !== null) return;
+        retryTimer = setTimeout(() => {
+            retryTimer = null;
+            void connect();
+        }, STREAM_RECONNECT_DELAY_MS);
+    };
+
+    const listen = <T>(target: EventSource, name: string, handler?: (data: T) => void) => {
+        if (!handler) return;
+        target.addEventListener(name, (event) => {
+            try {
+                handler(JSON.parse((event as MessageEvent).data));
+            } catch (error) {
+                console.error(`Failed to parse ${name} event:`, error);
+            }
+        });
+    };
+
+    const connect = async () => {
+        let streamToken: string | null = null;
+        try {
+            streamToken = await fetchStreamToken(token);
+        } catch (error) {
+            console.error('Failed to open notification stream:', error);
+        }
+        if (closed) return;
+        if (!streamToken) {
+            scheduleReconnect();
+            return;
+        }
+
+        const next = new EventSource(`${API_BASE_URL}/notifications/stream?token=${encodeURIComponent(streamToken)}`);
+        listen(next, 'notification', handlers.onNotification);
+        listen(next, 'review_received', handlers.onReviewReceived);
+        next.onerror = () => {
+            // ブラウザの自動再接続は期限切れのトークンを使い続けるため、自分で閉じて取り直す
+            next.close();
+            scheduleReconnect();
+        };
+        source = next;
+    };
+
+    void connect();
+    return () => {
+        closed = true;
+        if (retryTimer !== null) clearTimeout(retryTimer);
+        source?.close();
+    };
+}
+
 /**
  * 通知を既読にする
  */